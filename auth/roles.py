@@ -2,7 +2,8 @@ import bcrypt
 import re
 from datetime import datetime
 import getpass
-from config import CITIES
+from config import CITIES, BCRYPT_ROUNDS
+from database.blind_index import blind_index_values
 
 def validate_username(username):
     pattern = r'^[a-zA-Z_][a-zA-Z0-9_\'\.]{7,9}$'
@@ -32,13 +33,17 @@ def create_user(conn, encryption, username, password, role, first_name, last_nam
     if not validate_password_complexity(password):
         raise ValueError("Ongeldig wachtwoord")
 
-    hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
     email_encrypted = encryption.encrypt(email)
     license_encrypted = encryption.encrypt(license_number)
 
+    bidx = blind_index_values(encryption, "users", {"email": email, "license_number": license_number})
+
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO users (username, password_hash, role, first_name, last_name, email, license_number, registration_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (username, hashed_pw, role, first_name, last_name, email_encrypted, license_encrypted, datetime.now()))
+        INSERT INTO users (username, password_hash, role, first_name, last_name, email, license_number,
+                           email_bidx, license_number_bidx, registration_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (username, hashed_pw, role, first_name, last_name, email_encrypted, license_encrypted,
+          bidx["email_bidx"], bidx["license_number_bidx"], datetime.now()))
     conn.commit()
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import BCRYPT_ROUNDS, AUTH_WORKERS, AUTH_MAX_PENDING, AUTH_LATENCY_SAMPLES
+from database.connection import get_pool
+
+
+def hash_rounds(hashed):
+    # bcrypt hash formaat: $2b$<kosten>$<salt+hash>
+    try:
+        return int(hashed.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class LatencyStats:
+    """Houdt de laatste N metingen per operatie bij voor percentielen."""
+
+    def __init__(self, samples=AUTH_LATENCY_SAMPLES):
+        self.samples = samples
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds):
+        with self._lock:
+            self._data.setdefault(operation, deque(maxlen=self.samples)).append(seconds)
+
+    def percentiles(self, operation, points=(50, 95, 99)):
+        with self._lock:
+            values = sorted(self._data.get(operation, ()))
+        if not values:
+            return {}
+        result = {"count": len(values)}
+        for p in points:
+            index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+            result[f"p{p}"] = values[index] * 1000
+        return result
+
+    def report(self):
+        with self._lock:
+            operations = list(self._data)
+        return {operation: self.percentiles(operation) for operation in operations}
+
+
+class AuthService:
+    """Voert bcrypt uit in een begrensde worker pool zodat aanroepers niet blokkeren.
+
+    Alle publieke methodes geven een concurrent.futures.Future terug; de
+    `a*` varianten zijn awaitable voor asyncio code.
+    """
+
+    def __init__(self, db_name, rounds=BCRYPT_ROUNDS, workers=AUTH_WORKERS, max_pending=AUTH_MAX_PENDING):
+        self.db_name = db_name
+        self.rounds = rounds
+        self.stats = LatencyStats()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._dummy_hash = None
+
+    def _submit(self, operation, fn, *args):
+        # Blokkeer de aanroeper als er al te veel bcrypt werk in de wachtrij staat
+        self._slots.acquire()
+        started = time.perf_counter()
+
+        def run():
+            try:
+                return fn(*args)
+            finally:
+                self.stats.record(operation, time.perf_counter() - started)
+                self._slots.release()
+
+        try:
+            return self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds))
+
+    def _verify(self, password, hashed):
+        return bcrypt.checkpw(password.encode(), hashed)
+
+    def _login(self, username, password):
+        pool = get_pool(self.db_name)
+        with pool.connection() as conn:
+            result = conn.execute(
+                "SELECT id, password_hash, role FROM users WHERE username = ?", (username,)
+            ).fetchone()
+
+        if not result:
+            # Vergelijk ook bij onbekende gebruikers met een hash, zodat de
+            # responstijd niet verraadt of een gebruikersnaam bestaat
+            if self._dummy_hash is None:
+                self._dummy_hash = self._hash("dummy-password")
+            bcrypt.checkpw(password.encode(), self._dummy_hash)
+            return None, None
+
+        user_id, password_hash, role = result
+        hashed = password_hash.encode()
+        if not bcrypt.checkpw(password.encode(), hashed):
+            return None, None
+
+        # Kostenfactor gewijzigd: wachtwoord opnieuw hashen nu we het kennen
+        if hash_rounds(hashed) != self.rounds:
+            try:
+                new_hash = self._hash(password).decode()
+                with pool.transaction() as conn:
+                    conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user_id))
+                logging.info(f"Wachtwoord opnieuw gehasht voor {username} (kosten {self.rounds})")
+            except Exception as e:
+                logging.error(f"Rehash fout voor {username}: {e}")
+
+        return user_id, role
+
+    def hash_password(self, password):
+        return self._submit("hash", self._hash, password)
+
+    def verify_password(self, password, hashed):
+        return self._submit("verify", self._verify, password, hashed)
+
+    def login(self, username, password):
+        """Future met (user_id, role), of (None, None) bij ongeldige gegevens."""
+        return self._submit("login", self._login, username, password)
+
+    async def ahash_password(self, password):
+        import asyncio
+        return await asyncio.wrap_future(self.hash_password(password))
+
+    async def averify_password(self, password, hashed):
+        import asyncio
+        return await asyncio.wrap_future(self.verify_password(password, hashed))
+
+    async def alogin(self, username, password):
+        import asyncio
+        return await asyncio.wrap_future(self.login(username, password))
+
+    def latency_report(self):
+        return self.stats.report()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,506 @@
+"""Headless uitvoering van beheeroperaties, zonder de input() menu's.
+
+    python batch.py operaties.jsonl --username super_admin --report resultaat.jsonl
+
+Invoer is JSONL (één object per regel) of een script met één operatie per
+regel en velden als key=value (shell quoting, # is commentaar):
+
+    {"op": "add_scooter", "brand": "Segway", "model": "GT2", "serial_number": "SN1"}
+    edit_scooter id=12 soc=80 mileage=1520
+    backup
+
+Het wachtwoord komt uit SCOOTER_BATCH_PASSWORD of wordt gevraagd. Operaties
+worden per transactie van --transaction-size gebundeld; elke operatie heeft
+een eigen savepoint, zodat één fout alleen die operatie terugdraait.
+"""
+import argparse
+import getpass
+import json
+import logging
+import os
+import re
+import shlex
+import sys
+import time
+from datetime import datetime
+
+from config import BATCH_TRANSACTION_SIZE
+from auth.roles import validate_username, validate_password_complexity
+from auth.service import AuthService
+from database.backup import create_backup
+from database.blind_index import blind_index_values, exists
+from database.connection import get_pool, close_all_pools
+from database.encryption import EncryptionManager
+from database.journal import acting_as, compact
+from database.migrations import migrate
+from management.scooters import ScooterManager
+from management.travellers import normalize_traveller, LICENSE_NUMBER_PATTERN, PHONE_NUMBER_PATTERN
+from utils.logging import SecureLogger
+
+ADMINS = ('superadmin', 'sysadmin')
+TRAVELLER_FIELDS = ('first_name', 'last_name', 'birthday', 'gender', 'street_name', 'house_number',
+                    'zip_code', 'city', 'email', 'license_number', 'phone_number')
+SCOOTER_FIELDS = ('brand', 'model', 'serial_number', 'top_speed', 'battery_capacity', 'soc',
+                  'target_range_min', 'target_range_max', 'latitude', 'longitude', 'mileage')
+# Script waarden zijn tekst; deze scooter velden worden eerst omgezet
+SCOOTER_NUMBERS = {
+    'top_speed': int, 'battery_capacity': int, 'soc': int, 'target_range_min': int,
+    'target_range_max': int, 'latitude': float, 'longitude': float, 'mileage': int, 'out_of_service': int,
+}
+
+
+class BatchError(Exception):
+    """Fout in één operatie; de batch gaat door met de volgende."""
+
+
+class BatchContext:
+    def __init__(self, db_name, username, role, encryption, auth, backup_dir, audit_log, user_id=None,
+                 source="batch"):
+        self.db_name = db_name
+        self.source = source
+        self.username = username
+        self.user_id = user_id
+        self.role = role
+        self.encryption = encryption
+        self.auth = auth
+        self.backup_dir = backup_dir
+        self.audit_log = audit_log
+        self._audit = []
+
+    def audit(self, action, description):
+        """Audit regel voor een schrijfactie; gaat pas na de commit naar de log."""
+        self._audit.append((action, self.username, f"{description} via {self.source}"))
+
+    def commit_audit(self):
+        """Schrijft de regels van gecommitte operaties naar de audit log."""
+        entries, self._audit = self._audit, []
+        for entry in entries:
+            self.audit_log.log(*entry)
+
+    def discard_audit(self, keep=0):
+        """Vergeet de regels vanaf `keep`: die operaties zijn teruggedraaid."""
+        del self._audit[keep:]
+
+
+def _require(args, *fields):
+    missing = [field for field in fields if args.get(field) in (None, "")]
+    if missing:
+        raise BatchError(f"Ontbrekende velden: {', '.join(missing)}")
+
+
+def _int_id(args, field="id"):
+    _require(args, field)
+    try:
+        return int(args[field])
+    except (TypeError, ValueError):
+        raise BatchError(f"Ongeldig {field}: {args[field]}")
+
+
+# 👥 Travellers
+
+def add_traveller(ctx, conn, args):
+    try:
+        data = normalize_traveller({field: args.get(field) for field in TRAVELLER_FIELDS})
+    except ValueError as e:
+        raise BatchError(str(e))
+    if exists(conn, ctx.encryption, "travellers", "license_number", data['license_number']):
+        raise BatchError("Rijbewijsnummer bestaat al")
+
+    bidx = blind_index_values(ctx.encryption, "travellers", data)
+    cursor = conn.execute(f"""
+        INSERT INTO travellers ({', '.join(TRAVELLER_FIELDS)}, email_bidx, license_number_bidx)
+        VALUES ({', '.join('?' for _ in TRAVELLER_FIELDS)}, ?, ?)
+    """, [data.get(field) for field in TRAVELLER_FIELDS] + [bidx["email_bidx"], bidx["license_number_bidx"]])
+    return f"Traveller {cursor.lastrowid} geregistreerd"
+
+
+def edit_traveller(ctx, conn, args):
+    traveller_id = _int_id(args)
+    row = conn.execute("SELECT license_number, phone_number FROM travellers WHERE id = ?",
+                       (traveller_id,)).fetchone()
+    if not row:
+        raise BatchError("Traveller niet gevonden")
+
+    updates = {}
+    for field in ('first_name', 'last_name'):
+        if field in args:
+            if not str(args[field]).strip():
+                raise BatchError("Naam mag niet leeg zijn")
+            updates[field] = str(args[field]).strip()
+    if 'license_number' in args:
+        license_number = str(args['license_number']).upper().replace(" ", "")
+        if not re.match(LICENSE_NUMBER_PATTERN, license_number):
+            raise BatchError("Ongeldig rijbewijsnummer formaat")
+        if exists(conn, ctx.encryption, "travellers", "license_number", license_number, exclude_id=traveller_id):
+            raise BatchError("Rijbewijsnummer bestaat al")
+        updates['license_number'] = license_number
+        updates['license_number_bidx'] = ctx.encryption.blind_index("license_number", license_number)
+    if 'phone_number' in args:
+        phone_number = str(args['phone_number']).replace(" ", "")
+        if not re.match(PHONE_NUMBER_PATTERN, phone_number):
+            raise BatchError("Ongeldig telefoonnummer")
+        updates['phone_number'] = phone_number
+    if not updates:
+        raise BatchError("Geen te wijzigen velden (first_name, last_name, license_number, phone_number)")
+
+    conn.execute(f"UPDATE travellers SET {', '.join(f'{field} = ?' for field in updates)} WHERE id = ?",
+                 [*updates.values(), traveller_id])
+    if 'license_number' in updates:
+        ctx.encryption.invalidate(row[0])
+    if 'phone_number' in updates:
+        ctx.encryption.invalidate(row[1])
+    return f"Traveller {traveller_id} bijgewerkt"
+
+
+def delete_traveller(ctx, conn, args):
+    traveller_id = _int_id(args)
+    if conn.execute("DELETE FROM travellers WHERE id = ?", (traveller_id,)).rowcount == 0:
+        raise BatchError("Traveller niet gevonden")
+    return f"Traveller {traveller_id} verwijderd"
+
+
+# 🛵 Scooters
+
+def _scooter_values(args):
+    values = {}
+    for field, value in args.items():
+        convert = SCOOTER_NUMBERS.get(field)
+        if convert is not None and value not in (None, ""):
+            try:
+                value = convert(value)
+            except (TypeError, ValueError):
+                raise BatchError(f"Ongeldige numerieke waarde voor {field}: {value}")
+        values[field] = value
+    return values
+
+
+def _serial_exists(conn, serial_number):
+    return conn.execute("SELECT 1 FROM scooters WHERE serial_number = ?", (serial_number,)).fetchone() is not None
+
+
+def add_scooter(ctx, conn, args):
+    _require(args, 'brand', 'model', 'serial_number')
+    if len(str(args['serial_number'])) > 17:
+        raise BatchError("Serienummer mag maximaal 17 tekens zijn")
+    args = _scooter_values(args)
+    values = {field: args[field] for field in SCOOTER_FIELDS if args.get(field) not in (None, "")}
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    values['in_service_date'] = now
+    values['last_updated'] = now
+    if _serial_exists(conn, values['serial_number']):
+        raise BatchError("Serienummer bestaat al")
+    cursor = conn.execute(
+        f"INSERT INTO scooters ({', '.join(values)}) VALUES ({', '.join('?' for _ in values)})",
+        list(values.values()),
+    )
+    return f"Scooter {cursor.lastrowid} toegevoegd"
+
+
+def edit_scooter(ctx, conn, args):
+    scooter_id = _int_id(args)
+    updates = _scooter_values({field: value for field, value in args.items() if field != 'id'})
+    try:
+        found = ScooterManager(conn).update_scooter(scooter_id, updates, ctx.role, commit=False)
+    except ValueError as e:
+        raise BatchError(str(e))
+    if not found:
+        raise BatchError("Scooter niet gevonden of geen velden die deze rol mag wijzigen")
+    return f"Scooter {scooter_id} bijgewerkt"
+
+
+def delete_scooter(ctx, conn, args):
+    scooter_id = _int_id(args)
+    if conn.execute("DELETE FROM scooters WHERE id = ?", (scooter_id,)).rowcount == 0:
+        raise BatchError("Scooter niet gevonden")
+    return f"Scooter {scooter_id} verwijderd"
+
+
+# 👤 Gebruikers
+
+def _check_user_role(ctx, role):
+    # Sysadmins beheren alleen service engineers, net als in het menu
+    allowed = ('sysadmin', 'engineer') if ctx.role == 'superadmin' else ('engineer',)
+    if role not in allowed:
+        raise BatchError(f"Rol moet een van {', '.join(allowed)} zijn")
+
+
+def _target_user(ctx, conn, args):
+    user_id = _int_id(args)
+    row = conn.execute("SELECT username, role FROM users WHERE id = ?", (user_id,)).fetchone()
+    if not row:
+        raise BatchError("Gebruiker niet gevonden")
+    if row[1] == 'superadmin':
+        raise BatchError("Superadmin kan niet gewijzigd of verwijderd worden")
+    _check_user_role(ctx, row[1])
+    return user_id, row[0]
+
+
+def add_user(ctx, conn, args):
+    _require(args, 'username', 'password', 'role')
+    role = str(args['role']).lower()
+    _check_user_role(ctx, role)
+    if not validate_username(args['username']):
+        raise BatchError("Ongeldige gebruikersnaam")
+    if not validate_password_complexity(args['password']):
+        raise BatchError("Wachtwoord voldoet niet aan de eisen")
+    if conn.execute("SELECT 1 FROM users WHERE username = ?", (args['username'],)).fetchone():
+        raise BatchError("Gebruikersnaam bestaat al")
+
+    # Hash is al parallel berekend tijdens het inlezen (zie prepare_operations)
+    password_hash = args['_hash'].result().decode()
+    cursor = conn.execute("""
+        INSERT INTO users (username, password_hash, role, first_name, last_name)
+        VALUES (?, ?, ?, ?, ?)
+    """, (args['username'], password_hash, role, args.get('first_name'), args.get('last_name')))
+    ctx.audit("Gebruiker toegevoegd", f"{args['username']} ({role})")
+    return f"Gebruiker {cursor.lastrowid} ({args['username']}) toegevoegd als {role}"
+
+
+def delete_user(ctx, conn, args):
+    user_id, username = _target_user(ctx, conn, args)
+    conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    ctx.audit("Gebruiker verwijderd", f"ID: {user_id} ({username})")
+    return f"Gebruiker {user_id} verwijderd"
+
+
+def change_role(ctx, conn, args):
+    _require(args, 'role')
+    new_role = str(args['role']).lower()
+    _check_user_role(ctx, new_role)
+    user_id, username = _target_user(ctx, conn, args)
+    conn.execute("UPDATE users SET role = ? WHERE id = ?", (new_role, user_id))
+    ctx.audit("Rol gewijzigd", f"Gebruiker {user_id} -> {new_role}")
+    return f"Gebruiker {user_id} heeft nu rol {new_role}"
+
+
+# 📂 Backup (buiten een transactie, zodat alles ervoor al gecommit is)
+
+def backup(ctx, conn, args):
+    backup_file = create_backup(ctx.db_name, ctx.backup_dir)
+    return f"Backup gemaakt: {backup_file}"
+
+
+def compact_journal(ctx, conn, args):
+    deleted = compact(ctx.db_name)
+    return f"{deleted} journaalrecords opgeruimd"
+
+
+# naam -> (toegestane rollen, functie, eigen transactie nodig)
+OPERATIONS = {
+    'add_traveller': (ADMINS, add_traveller, True),
+    'edit_traveller': (ADMINS, edit_traveller, True),
+    'delete_traveller': (ADMINS, delete_traveller, True),
+    'add_scooter': (ADMINS, add_scooter, True),
+    'edit_scooter': (ADMINS + ('engineer',), edit_scooter, True),
+    'delete_scooter': (ADMINS, delete_scooter, True),
+    'add_user': (ADMINS, add_user, True),
+    'delete_user': (ADMINS, delete_user, True),
+    'change_role': (ADMINS, change_role, True),
+    'backup': (ADMINS, backup, False),
+    'compact_journal': (ADMINS, compact_journal, False),
+}
+
+
+def parse_operations(lines):
+    """Leest JSONL of script regels; geeft (regelnummer, operatie dict) terug."""
+    operations = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            try:
+                op = json.loads(line)
+            except ValueError as e:
+                op = {'op': None, '_error': f"Ongeldige JSON: {e}"}
+        else:
+            try:
+                parts = shlex.split(line)
+            except ValueError as e:
+                parts, op = [], {'op': None, '_error': f"Ongeldige regel: {e}"}
+            if parts:
+                op = {'op': parts[0]}
+                for part in parts[1:]:
+                    key, sep, value = part.partition('=')
+                    if not sep:
+                        op = {'op': parts[0], '_error': f"Verwacht key=value, kreeg '{part}'"}
+                        break
+                    op[key] = value
+        operations.append((number, op))
+    return operations
+
+
+def prepare_operations(operations, auth):
+    # bcrypt is de duurste stap: alle nieuwe wachtwoorden vooraf parallel hashen
+    for _, op in operations:
+        if op.get('op') == 'add_user' and op.get('password') and validate_password_complexity(op['password']):
+            op['_hash'] = auth.hash_password(op['password'])
+
+
+def run_operation(ctx, conn, name, args):
+    """Voert één operatie uit op `conn`; geeft (geslaagd, bericht).
+
+    Transactionele operaties lopen in een savepoint binnen de (zo nodig
+    gestarte) transactie van `conn`; de aanroeper commit en roept daarna
+    ctx.commit_audit() aan. Voor de overige operaties wordt eerst gecommit.
+    """
+    entry = OPERATIONS.get(name)
+    if entry is None:
+        return False, f"Onbekende operatie: {name}"
+    roles, handler, transactional = entry
+    if ctx.role not in roles:
+        return False, f"Rol {ctx.role} mag {name} niet uitvoeren"
+
+    if not transactional:
+        if conn.in_transaction:
+            conn.commit()
+            ctx.commit_audit()
+        try:
+            return True, handler(ctx, conn, args)
+        except Exception as e:
+            return False, _error_message(e)
+        finally:
+            ctx.commit_audit()
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    conn.execute("SAVEPOINT batch_op")
+    audited = len(ctx._audit)
+    try:
+        with acting_as(conn, ctx.user_id):
+            message = handler(ctx, conn, args)
+        conn.execute("RELEASE batch_op")
+        return True, message
+    except Exception as e:
+        conn.execute("ROLLBACK TO batch_op")
+        conn.execute("RELEASE batch_op")
+        ctx.discard_audit(audited)
+        return False, _error_message(e)
+
+
+def _error_message(e):
+    return str(e) if isinstance(e, BatchError) else f"{type(e).__name__}: {e}"
+
+
+def run_batch(ctx, operations, transaction_size=BATCH_TRANSACTION_SIZE, stop_on_error=False):
+    """Voert de operaties uit; geeft per operatie een resultaat dict terug."""
+    results = []
+    pool = get_pool(ctx.db_name)
+    conn = pool.acquire()
+    pending = 0
+    try:
+        for number, op in operations:
+            name = op.get('op')
+            started = time.perf_counter()
+            result = {'line': number, 'op': name, 'ok': False, 'message': ''}
+
+            if op.get('_error'):
+                result['message'] = op['_error']
+            else:
+                args = {key: value for key, value in op.items() if key != 'op'}
+                result['ok'], result['message'] = run_operation(ctx, conn, name, args)
+                if conn.in_transaction:
+                    pending += 1
+                    if pending >= transaction_size:
+                        conn.commit()
+                        ctx.commit_audit()
+                        pending = 0
+                else:
+                    pending = 0
+
+            result['ms'] = round((time.perf_counter() - started) * 1000, 3)
+            results.append(result)
+            if stop_on_error and not result['ok']:
+                break
+        if conn.in_transaction:
+            conn.commit()
+        ctx.commit_audit()
+    finally:
+        # Niet gecommit (fout halverwege): release draait terug, de audit regels vervallen
+        ctx.discard_audit()
+        pool.release(conn)
+    return results
+
+
+def summarize(results):
+    per_op = {}
+    for result in results:
+        stats = per_op.setdefault(result['op'] or '?', {'count': 0, 'failed': 0, 'ms': 0.0})
+        stats['count'] += 1
+        stats['failed'] += not result['ok']
+        stats['ms'] += result['ms']
+    return per_op
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voer beheeroperaties uit zonder interactieve menu's")
+    parser.add_argument("input", help="JSONL of script bestand ('-' = stdin)")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--db", default="scooter_management.db")
+    parser.add_argument("--backup-dir", default="backups")
+    parser.add_argument("--transaction-size", type=int, default=BATCH_TRANSACTION_SIZE)
+    parser.add_argument("--stop-on-error", action="store_true")
+    parser.add_argument("--report", help="schrijf alle resultaten als JSONL naar dit bestand")
+    parser.add_argument("--verbose", action="store_true", help="toon ook geslaagde operaties")
+    options = parser.parse_args(argv)
+
+    logging.basicConfig(filename="app.log", level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s", filemode='a')
+
+    password = os.environ.get("SCOOTER_BATCH_PASSWORD") or getpass.getpass("Wachtwoord: ")
+    encryption = EncryptionManager()
+    auth = AuthService(options.db)
+    audit_log = SecureLogger(encryption.key)
+    try:
+        with get_pool(options.db).connection() as conn:
+            migrate(conn, encryption)
+
+        user_id, role = auth.login(options.username, password).result()
+        if not user_id:
+            audit_log.log("Login mislukt", options.username, "Batch login mislukt", suspicious=True)
+            print("❌ Ongeldige gebruikersnaam of wachtwoord")
+            return 2
+
+        if options.input == "-":
+            operations = parse_operations(sys.stdin)
+        else:
+            with open(options.input, encoding="utf-8") as f:
+                operations = parse_operations(f)
+
+        ctx = BatchContext(options.db, options.username, role, encryption, auth, options.backup_dir, audit_log,
+                           user_id)
+        started = time.perf_counter()
+        prepare_operations(operations, auth)
+        results = run_batch(ctx, operations, options.transaction_size, options.stop_on_error)
+        elapsed = time.perf_counter() - started
+    finally:
+        auth.close()
+
+    failed = [result for result in results if not result['ok']]
+    for result in results:
+        if options.verbose or not result['ok']:
+            status = "✅" if result['ok'] else "❌"
+            print(f"{status} regel {result['line']}: {result['op']} ({result['ms']:.1f} ms) {result['message']}")
+
+    print(f"\n{len(results) - len(failed)} van {len(results)} operaties geslaagd in {elapsed:.2f}s")
+    print(f"{'Operatie':<18} | {'Aantal':>7} | {'Mislukt':>7} | {'Totaal ms':>10} | {'Gem. ms':>8}")
+    for name, stats in sorted(summarize(results).items()):
+        print(f"{name:<18} | {stats['count']:>7} | {stats['failed']:>7} | "
+              f"{stats['ms']:>10.1f} | {stats['ms'] / stats['count']:>8.2f}")
+
+    if options.report:
+        with open(options.report, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    logging.info(f"Batch {options.input} door {options.username}: {len(results) - len(failed)}/{len(results)} geslaagd")
+    audit_log.log("Batch", options.username,
+                  f"{options.input}: {len(results) - len(failed)}/{len(results)} geslaagd", suspicious=bool(failed))
+    audit_log.close()
+    encryption.close()
+    close_all_pools()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
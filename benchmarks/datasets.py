@@ -0,0 +1,138 @@
+import random
+import string
+from datetime import datetime, timedelta
+
+import bcrypt
+
+from config import CITIES
+from database.blind_index import blind_index_values
+from management.scooters import ROTTERDAM_BOUNDS
+
+FIRST_NAMES = ["Jan", "Piet", "Kees", "Anna", "Sanne", "Fatima", "Mohammed", "Lisa", "Daan", "Emma",
+               "Noah", "Julia", "Sem", "Tess", "Finn", "Sara", "Liam", "Zoë", "Milan", "Eva"]
+LAST_NAMES = ["de Jong", "Jansen", "de Vries", "van den Berg", "van Dijk", "Bakker", "Janssen",
+              "Visser", "Smit", "Meijer", "de Boer", "Mulder", "de Groot", "Bos", "Vos", "Peters",
+              "Hendriks", "van Leeuwen", "Dekker", "Brouwer", "Yilmaz", "El Amrani"]
+STREETS = ["Coolsingel", "Witte de Withstraat", "Nieuwe Binnenweg", "Meent", "Lijnbaan", "Kruiskade",
+           "Oude Binnenweg", "Mathenesserlaan", "Westersingel", "Boompjes"]
+BRANDS = {
+    "Segway": ["Ninebot Max", "GT2", "P100"],
+    "Xiaomi": ["Pro 2", "4 Ultra", "Essential"],
+    "NIU": ["KQi3", "KQi2"],
+    "Unagi": ["Model One"],
+    "Bird": ["Three", "Air"],
+}
+ROLES = ["superadmin", "sysadmin", "engineer"]
+
+# Lage bcrypt kosten: een dataset van 1M gebruikers met echte kosten zou uren duren
+DATASET_BCRYPT_ROUNDS = 4
+
+
+def _date(rng, start_year, end_year):
+    start = datetime(start_year, 1, 1)
+    days = (datetime(end_year, 12, 31) - start).days
+    return (start + timedelta(days=rng.randrange(days))).strftime("%Y-%m-%d")
+
+
+def generate_travellers(count, seed=1):
+    """Synthetische travellers die door dezelfde validatie als register_traveller komen."""
+    rng = random.Random(seed)
+    for i in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        yield {
+            "first_name": first_name,
+            "last_name": last_name,
+            "birthday": _date(rng, 1950, 2006),
+            "gender": rng.choice("MVX"),
+            "street_name": rng.choice(STREETS),
+            "house_number": str(rng.randint(1, 300)),
+            "zip_code": f"{rng.randint(1000, 9999)}{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}",
+            "city": rng.choice(CITIES),
+            "email": f"{first_name.lower()}.{i}@example.nl",
+            # Uniek per rij: 4 cijfers + 2 letters + 4 cijfers
+            "license_number": f"{i // 10000 % 10000:04d}{string.ascii_uppercase[i // 260000 % 26]}"
+                              f"{string.ascii_uppercase[i // 10000 % 26]}{i % 10000:04d}",
+            "phone_number": f"06{rng.randint(0, 99999999):08d}",
+        }
+
+
+def generate_scooters(count, seed=2):
+    rng = random.Random(seed)
+    for i in range(count):
+        brand = rng.choice(list(BRANDS))
+        battery_capacity = rng.randint(40, 100)
+        yield {
+            "brand": brand,
+            "model": rng.choice(BRANDS[brand]),
+            "serial_number": f"SQ{i:012d}",
+            "top_speed": rng.choice([20, 25, 30, 45]),
+            "battery_capacity": battery_capacity,
+            "soc": rng.randint(0, 100),
+            "target_range_min": battery_capacity // 3,
+            "target_range_max": battery_capacity // 2,
+            "latitude": round(rng.uniform(ROTTERDAM_BOUNDS['min_lat'], ROTTERDAM_BOUNDS['max_lat']), 5),
+            "longitude": round(rng.uniform(ROTTERDAM_BOUNDS['min_lon'], ROTTERDAM_BOUNDS['max_lon']), 5),
+            "out_of_service": 1 if rng.random() < 0.08 else 0,
+            "mileage": rng.randint(0, 25000),
+            "last_maintenance": _date(rng, 2022, 2025) if rng.random() < 0.95 else None,
+        }
+
+
+def generate_users(count, seed=3, password="Bench_Passw0rd!"):
+    """Gebruikers van elke rol; alle gebruikers delen één hash per rol."""
+    rng = random.Random(seed)
+    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(DATASET_BCRYPT_ROUNDS)).decode()
+    for i in range(count):
+        yield {
+            "username": f"bench_{i:07d}",
+            "password_hash": password_hash,
+            "role": ROLES[i % len(ROLES)],
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+        }
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_dataset(conn, encryption, size, chunk_size=5000):
+    """Vult een lege database met `size` travellers en scooters en size/10 gebruikers."""
+    for chunk in _chunks(generate_travellers(size), chunk_size):
+        conn.executemany("""
+            INSERT INTO travellers (
+                first_name, last_name, birthday, gender, street_name, house_number,
+                zip_code, city, email, license_number, phone_number,
+                email_bidx, license_number_bidx
+            ) VALUES (:first_name, :last_name, :birthday, :gender, :street_name, :house_number,
+                      :zip_code, :city, :email, :license_number, :phone_number,
+                      :email_bidx, :license_number_bidx)
+        """, [dict(row, **blind_index_values(encryption, "travellers", row)) for row in chunk])
+        conn.commit()
+
+    for chunk in _chunks(generate_scooters(size), chunk_size):
+        conn.executemany("""
+            INSERT INTO scooters (
+                brand, model, serial_number, top_speed, battery_capacity, soc,
+                target_range_min, target_range_max, latitude, longitude,
+                out_of_service, mileage, last_maintenance
+            ) VALUES (:brand, :model, :serial_number, :top_speed, :battery_capacity, :soc,
+                      :target_range_min, :target_range_max, :latitude, :longitude,
+                      :out_of_service, :mileage, :last_maintenance)
+        """, chunk)
+        conn.commit()
+
+    for chunk in _chunks(generate_users(max(len(ROLES), size // 10)), chunk_size):
+        conn.executemany("""
+            INSERT INTO users (username, password_hash, role, first_name, last_name)
+            VALUES (:username, :password_hash, :role, :first_name, :last_name)
+        """, chunk)
+        conn.commit()
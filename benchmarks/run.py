@@ -0,0 +1,309 @@
+"""Benchmark suite voor de kernoperaties van de scooter administratie.
+
+Gebruik (vanuit de projectmap):
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --json bench.json
+
+Per datasetgrootte wordt een verse database gevuld met synthetische data en
+wordt elke operatie getimed. De resultaten worden als tabel geprint en
+optioneel als JSON weggeschreven zodat releases vergeleken kunnen worden.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import bcrypt
+
+import main as app
+from auth.service import AuthService
+from benchmarks.datasets import load_dataset, generate_travellers
+from config import BCRYPT_ROUNDS
+from database.backup import create_backup
+from database.blind_index import blind_index_values, exists
+from database.connection import get_pool, close_all_pools
+from database.encryption import EncryptionManager
+from database.pagination import KeysetPager
+from database.replica import Replica
+from database.restore import restore_backup
+from management.search import TravellerSearch
+from management.fleet import FleetCache
+from management.write_behind import ScooterWriteBehind
+from management.analytics import FleetSnapshot
+
+DEFAULT_SIZES = [1000, 10000]
+
+
+class Timer:
+    def __init__(self, results, size, operation, operations=1):
+        self.results = results
+        self.size = size
+        self.operation = operation
+        self.operations = operations
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return False
+        seconds = time.perf_counter() - self.started
+        self.results.append({
+            "size": self.size,
+            "operation": self.operation,
+            "operations": self.operations,
+            "seconds": round(seconds, 6),
+            "ops_per_second": round(self.operations / seconds, 1) if seconds else None,
+        })
+        return False
+
+
+def bench_registration(conn, encryption, size, results, count):
+    rows = list(generate_travellers(size + count))[size:]
+    with Timer(results, size, "registration (1 rij + commit)", count):
+        for row in rows:
+            # Zelfde stappen als register_traveller: duplicaatcheck en insert met blind index
+            if exists(conn, encryption, "travellers", "license_number", row["license_number"]):
+                continue
+            row = dict(row, **blind_index_values(encryption, "travellers", row))
+            conn.execute("""
+                INSERT INTO travellers (
+                    first_name, last_name, birthday, gender, street_name, house_number,
+                    zip_code, city, email, license_number, phone_number,
+                    email_bidx, license_number_bidx
+                ) VALUES (:first_name, :last_name, :birthday, :gender, :street_name, :house_number,
+                          :zip_code, :city, :email, :license_number, :phone_number,
+                          :email_bidx, :license_number_bidx)
+            """, row)
+            conn.commit()
+
+
+def bench_listing(db_name, size, results, pages):
+    pagers = {
+        "travellers": KeysetPager(db_name, "travellers",
+                                  ["id", "first_name", "last_name", "email", "phone_number", "registration_date"],
+                                  ["last_name", "id"]),
+        "scooters": KeysetPager(db_name, "scooters",
+                                ["id", "brand", "model", "serial_number", "soc", "out_of_service", "last_updated"],
+                                ["brand", "model", "id"]),
+        "onderhoud": KeysetPager(db_name, "scooters",
+                                 ["id", "brand", "model", "last_maintenance", "mileage", "out_of_service"],
+                                 ["COALESCE(last_maintenance, '')", "id"]),
+    }
+    for name, pager in pagers.items():
+        with Timer(results, size, f"listing {name} ({pages} pagina's)", pages):
+            page = pager.first_page()
+            for _ in range(pages - 1):
+                page = pager.next_page(page)
+        with Timer(results, size, f"listing {name} (alles streamen)", size):
+            for _ in pager.iter_rows(batch_size=1000):
+                pass
+
+
+def bench_search(db_name, size, results):
+    search = TravellerSearch(db_name)
+    queries = {"exact": ["jansen", "de vries", "coolsingel", "rotterdam"],
+               "fuzzy": ["jnassen", "bakkr", "rottrdam", "coolsingle"]}
+    for kind, terms in queries.items():
+        with Timer(results, size, f"traveller zoeken ({kind})", len(terms)):
+            for term in terms:
+                search.search(term)
+
+
+def bench_fleet_cache(conn, db_name, size, results, count):
+    rng = random.Random(5)
+    ids = [rng.randint(1, size) for _ in range(count)]
+    with Timer(results, size, "scooter ophalen (SELECT)", count):
+        for scooter_id in ids:
+            conn.execute("SELECT * FROM scooters WHERE id = ?", (scooter_id,)).fetchone()
+    fleet = FleetCache(db_name)
+    try:
+        with Timer(results, size, "vlootcache laden"):
+            fleet.get(1)
+        with Timer(results, size, "scooter ophalen (vlootcache)", count):
+            for scooter_id in ids:
+                fleet.get(scooter_id)
+    finally:
+        fleet.close()
+
+
+def bench_analytics(db_name, size, results):
+    with Timer(results, size, "vlootstatistieken snapshot laden"):
+        snapshot = FleetSnapshot.load(db_name)
+    with Timer(results, size, "vlootstatistieken (samenvatting + groepen)"):
+        snapshot.summary()
+        for key in ("brand", "model", "zone"):
+            snapshot.group_by(key)
+
+
+def bench_edit_scooter(conn, size, results, count):
+    rng = random.Random(4)
+    with Timer(results, size, "edit_scooter (1 update + commit)", count):
+        for _ in range(count):
+            # Zelfde statement als edit_scooter
+            conn.execute("""
+                UPDATE scooters
+                SET soc = ?, last_updated = ?
+                WHERE id = ?
+            """, (rng.randint(0, 100), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), rng.randint(1, size)))
+            conn.commit()
+
+
+def bench_write_behind(db_name, size, results, count, threads=8):
+    rng = random.Random(4)
+    updates = [(rng.randint(1, size), {"soc": rng.randint(0, 100),
+                                       "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+               for _ in range(count)]
+    writer = ScooterWriteBehind(db_name)
+    try:
+        with Timer(results, size, "edit_scooter (write-behind, buffered)", count):
+            for scooter_id, changes in updates:
+                writer.update(scooter_id, changes, durability="buffered")
+            writer.flush()
+
+        # Wachtende aanroepers ("committed") delen een commit
+        def edit(part):
+            for scooter_id, changes in part:
+                writer.update(scooter_id, changes, durability="committed")
+
+        with Timer(results, size, f"edit_scooter (write-behind, {threads} threads)", count):
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(edit, [updates[i::threads] for i in range(threads)]))
+    finally:
+        writer.close()
+
+
+def bench_login(conn, db_name, size, results, count):
+    password = "Bench_Passw0rd!"
+    conn.execute(
+        "INSERT OR REPLACE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+        ("bench_login", bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode(), "engineer"),
+    )
+    conn.commit()
+    service = AuthService(db_name)
+    try:
+        with Timer(results, size, f"login (parallel, bcrypt kosten {BCRYPT_ROUNDS})", count):
+            futures = [service.login("bench_login", password) for _ in range(count)]
+            assert all(future.result()[0] for future in futures)
+    finally:
+        service.close()
+
+
+def bench_backup_restore(db_name, workdir, size, results, encryption):
+    backup_dir = os.path.join(workdir, "backups")
+    with Timer(results, size, "backup (online backup API)"):
+        backup_file = create_backup(db_name, backup_dir)
+    with Timer(results, size, "restore (staging, controle, wissel)"):
+        restore_backup(db_name, backup_file, encryption=encryption)
+
+
+def bench_replica(conn, db_name, size, results, count):
+    replica = Replica(db_name)
+    try:
+        with Timer(results, size, "replica (volledige kopie)"):
+            replica.refresh()
+        for scooter_id in range(1, count + 1):
+            conn.execute("UPDATE scooters SET soc = ? WHERE id = ?", (scooter_id % 100, scooter_id))
+        conn.commit()
+        with Timer(results, size, "replica bijwerken (journaal)", count):
+            replica.refresh()
+    finally:
+        replica.close()
+
+
+def bench_encryption(encryption, size, results, count):
+    values = [f"gebruiker{i}@example.nl" for i in range(count)]
+    with Timer(results, size, "encrypt", count):
+        tokens = [encryption.encrypt(value) for value in values]
+    encryption.cache.clear()
+    with Timer(results, size, "decrypt_many (koud)", count):
+        encryption.decrypt_many(tokens)
+    with Timer(results, size, "decrypt_many (cache)", count):
+        encryption.decrypt_many(tokens)
+
+
+def run_size(size, workdir, options):
+    db_name = os.path.join(workdir, "bench.db")
+    app.DB_NAME = db_name
+    app.BACKUP_DIR = os.path.join(workdir, "backups")
+    encryption = EncryptionManager(key_file=os.path.join(workdir, "bench.key"))
+    results = []
+
+    app.initialize_database()
+    pool = get_pool(db_name)
+    with pool.connection() as conn:
+        with Timer(results, size, "dataset laden (bulk)", size * 2 + size // 10):
+            load_dataset(conn, encryption, size)
+        # Kleine aantallen houden de suite draaibaar op 1M rijen
+        bench_registration(conn, encryption, size, results, min(size, options.operations))
+        bench_edit_scooter(conn, size, results, min(size, options.operations))
+        bench_write_behind(db_name, size, results, min(size, options.operations))
+        bench_fleet_cache(conn, db_name, size, results, options.operations)
+        bench_login(conn, db_name, size, results, options.logins)
+        bench_replica(conn, db_name, size, results, min(size, options.operations))
+
+    bench_listing(db_name, size, results, options.pages)
+    bench_search(db_name, size, results)
+    bench_analytics(db_name, size, results)
+    bench_backup_restore(db_name, workdir, size, results, encryption)
+    bench_encryption(encryption, size, results, min(size, options.operations))
+    encryption.close()
+    close_all_pools()
+    return results
+
+
+def print_table(results):
+    print(f"\n{'Grootte':>9} | {'Operatie':<45} | {'Aantal':>8} | {'Seconden':>10} | {'Ops/s':>12}")
+    print("-" * 97)
+    for r in results:
+        ops = f"{r['ops_per_second']:.1f}" if r["ops_per_second"] else "-"
+        print(f"{r['size']:>9} | {r['operation']:<45} | {r['operations']:>8} | {r['seconds']:>10.4f} | {ops:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de kernoperaties met synthetische data")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="komma-gescheiden datasetgroottes, bijv. 1000,10000,1000000")
+    parser.add_argument("--operations", type=int, default=1000,
+                        help="aantal losse registraties/updates/encryptions per grootte")
+    parser.add_argument("--logins", type=int, default=8, help="aantal parallelle logins per grootte")
+    parser.add_argument("--pages", type=int, default=10, help="aantal pagina's per listing")
+    parser.add_argument("--json", help="schrijf resultaten ook als JSON naar dit bestand")
+    parser.add_argument("--keep", action="store_true", help="bewaar de benchmark databases")
+    options = parser.parse_args()
+
+    results = []
+    for size in (int(s) for s in options.sizes.split(",") if s.strip()):
+        workdir = tempfile.mkdtemp(prefix=f"bench_{size}_")
+        try:
+            print(f"⏳ Benchmark met {size} rijen...")
+            results.extend(run_size(size, workdir, options))
+        finally:
+            if not options.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+
+    if options.json:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "results": results,
+        }
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Resultaten geschreven naar {options.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Dunne client voor server.py: menu's in de terminal, al het werk op de server.
+
+    python main.py --server 127.0.0.1:8765
+    python main.py --server unix:scooter.sock
+
+De server bepaalt welke operaties (en velden) de ingelogde rol mag
+gebruiken; de client bouwt daar zijn menu uit op.
+"""
+import getpass
+import json
+import socket
+from functools import partial
+
+from config import SERVER_ADDRESS
+
+# Menunamen voor de operaties van de server; onbekende operaties tonen hun eigen naam
+LABELS = {
+    "list_travellers": "Travellers bekijken",
+    "search_travellers": "Traveller zoeken op naam of adres",
+    "find_traveller": "Traveller zoeken op rijbewijs of e-mail",
+    "add_traveller": "Traveller registreren",
+    "edit_traveller": "Traveller bewerken",
+    "delete_traveller": "Traveller verwijderen",
+    "list_scooters": "Scooters bekijken",
+    "nearest_scooters": "Dichtstbijzijnde scooters",
+    "scooters_in_box": "Scooters in gebied",
+    "scooters_within_radius": "Beschikbare scooters binnen straal",
+    "scooter_maintenance": "Scooter onderhoud bekijken",
+    "maintenance_plan": "Onderhoudsplanning",
+    "add_scooter": "Scooter toevoegen",
+    "edit_scooter": "Scooter bewerken",
+    "delete_scooter": "Scooter verwijderen",
+    "fleet_statistics": "Vlootstatistieken",
+    "list_users": "Gebruikers bekijken",
+    "my_details": "Mijn gegevens",
+    "view_logs": "Logs bekijken",
+    "list_backups": "Backups bekijken",
+    "add_user": "Gebruiker toevoegen",
+    "delete_user": "Gebruiker verwijderen",
+    "change_role": "Gebruikersrol wijzigen",
+    "backup": "Backup maken",
+    "compact_journal": "Wijzigingsjournaal opruimen",
+    "restore": "Backup terugzetten",
+    "create_restore_code": "Restore code aanmaken",
+}
+
+LOCATION_HEADER = "ID | Merk | Model | Latitude | Longitude | SOC"
+
+
+class ServerError(Exception):
+    pass
+
+
+def parse_address(address):
+    """"unix:/pad" -> ("unix", pad); "host:poort" -> ("tcp", (host, poort))."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"Ongeldig serveradres: {address} (verwacht host:poort of unix:/pad)")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class ServerClient:
+    def __init__(self, address=SERVER_ADDRESS, timeout=None):
+        kind, target = parse_address(address)
+        if kind == "unix":
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(target)
+        else:
+            self._sock = socket.create_connection(target, timeout=timeout)
+        self._file = self._sock.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, op, **args):
+        """Stuurt één operatie en wacht op het antwoord; ServerError bij een fout."""
+        self._next_id += 1
+        self._file.write((json.dumps({"id": self._next_id, "op": op, "args": args}) + "\n").encode())
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ServerError("Verbinding met de server verbroken")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise ServerError(response.get("error") or "Onbekende fout")
+        return response.get("result")
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self._sock.close()
+
+
+# 🖥️ Menu's
+
+def _print_rows(header, rows):
+    print(f"\n{header}")
+    print("-" * 80)
+    for row in rows:
+        print(" | ".join("" if value is None else str(value) for value in row))
+
+
+def _browse(client, op, header, **args):
+    after = None
+    while True:
+        result = client.request(op, after=after, **args)
+        if not result["rows"]:
+            print("\nGeen (verdere) resultaten")
+            return
+        _print_rows(header, result["rows"])
+        if result["next"] is None or input("\n[n] volgende pagina, [Enter] stoppen: ").strip().lower() != "n":
+            return
+        after = result["next"]
+
+
+def _fleet_statistics(client):
+    group = {"1": "brand", "2": "model", "3": "zone"}.get(
+        input("Groeperen op: 1. Merk  2. Merk en model  3. Zone (Enter = merk): ").strip() or "1", "brand")
+    result = client.request("fleet_statistics", group=group)
+    summary = result["summary"]
+    print(f"\nScooters: {summary['scooters']}")
+    print(f"Gemiddelde SOC: {summary['mean_soc']}")
+    print(f"Buiten gebruik: {summary['out_of_service_ratio']}")
+    _print_rows("Groep | Aantal | Gem. SOC | Gem. km-stand",
+                [(name, stats["scooters"], stats["mean_soc"], stats["mean_mileage"])
+                 for name, stats in result["groups"].items()])
+
+
+def _read(client, op):
+    if op == "list_travellers":
+        _browse(client, op, "ID | Voornaam | Achternaam | E-mail | Telefoon | Registratiedatum",
+                last_name=input("Filter op achternaam (leeg = alles): ").strip())
+    elif op == "list_scooters":
+        _browse(client, op, "ID | Merk | Model | Serienummer | SOC | Buiten gebruik | Laatste update",
+                brand=input("Filter op merk (leeg = alles): ").strip())
+    elif op == "list_users":
+        _browse(client, op, "ID | Gebruikersnaam | Rol | Voornaam | Achternaam | Registratiedatum")
+    elif op == "search_travellers":
+        result = client.request(op, query=input("Zoekterm: ").strip())
+        if result["fuzzy"]:
+            print("\nGeen exacte match, bedoelde u:")
+        _print_rows("ID | Voornaam | Achternaam | Straat | Nr | Postcode | Woonplaats | E-mail | Telefoon",
+                    result["rows"])
+    elif op == "find_traveller":
+        _print_rows("ID | Voornaam | Achternaam | E-mail | Telefoon | Registratiedatum",
+                    client.request(op, value=input("Rijbewijsnummer of e-mail: ").strip()))
+    elif op == "nearest_scooters":
+        result = client.request(op, latitude=float(input("Latitude: ")), longitude=float(input("Longitude: ")),
+                                count=int(input("Aantal scooters (standaard 10): ") or 10))
+        _print_rows("Afstand (m) | " + LOCATION_HEADER, [[round(distance)] + row for distance, row in result])
+    elif op == "scooters_in_box":
+        _print_rows(LOCATION_HEADER, client.request(
+            op, min_lat=float(input("Minimale latitude: ")), min_lon=float(input("Minimale longitude: ")),
+            max_lat=float(input("Maximale latitude: ")), max_lon=float(input("Maximale longitude: "))))
+    elif op == "scooters_within_radius":
+        result = client.request(op, latitude=float(input("Latitude: ")), longitude=float(input("Longitude: ")),
+                                radius=float(input("Straal in meters: ")),
+                                min_soc=int(input("Minimale SOC % (standaard 0): ") or 0))
+        _print_rows("Afstand (m) | " + LOCATION_HEADER, [[round(distance)] + row for distance, row in result])
+    elif op == "scooter_maintenance":
+        _browse(client, op, "ID | Merk | Model | Laatste onderhoud | Kilometerstand | Buiten gebruik",
+                out_of_service_only=input("Alleen scooters buiten gebruik tonen? (j/n): ").strip().lower() == "j")
+    elif op == "maintenance_plan":
+        _print_rows("Score | ID | Merk | Model | Laatste onderhoud | Km sinds onderhoud | SOC | Buiten gebruik",
+                    client.request(op, count=int(input("Aantal scooters (standaard 10): ") or 10)))
+    elif op == "fleet_statistics":
+        _fleet_statistics(client)
+    elif op == "my_details":
+        details = client.request(op)
+        print("\n=== Mijn gegevens ===")
+        print(f"Gebruikersnaam: {details['username']}")
+        print(f"Rol: {details['role']}")
+        print(f"Naam: {details['first_name']} {details['last_name']}")
+        print(f"Registratiedatum: {details['registration_date']}")
+        if details["email"]:
+            print(f"E-mail: {details['email']}")
+        if details["license_number"]:
+            print(f"Rijbewijsnummer: {details['license_number']}")
+    elif op == "view_logs":
+        entries = client.request(
+            op, start=input("Vanaf (DD-MM-YYYY, leeg = begin): ").strip(),
+            end=input("Tot en met (DD-MM-YYYY, leeg = nu): ").strip(),
+            username=input("Gebruikersnaam (leeg = iedereen): ").strip(),
+            action=input("Actie (leeg = alle): ").strip(),
+            suspicious_only=input("Alleen verdachte activiteit? (j/n): ").strip().lower() == "j")
+        _print_rows("Tijdstip | Gebruiker | Actie | Omschrijving | Status",
+                    [(entry["timestamp"], entry["username"], entry["action"], entry["description"],
+                      "⚠️ VERDACHT" if entry["suspicious"] else "Normaal") for entry in entries])
+    elif op == "list_backups":
+        _print_rows("Backup | Tijdstip", client.request(op))
+
+
+def _choose_backup(client):
+    backups = client.request("list_backups")
+    if not backups:
+        print("\nGeen backups beschikbaar")
+        return None
+    for number, (name, taken_at) in enumerate(backups, 1):
+        print(f"{number}. {name} ({taken_at})")
+    choice = int(input("Kies backup (0 om te annuleren): "))
+    if choice == 0:
+        return None
+    if not 1 <= choice <= len(backups):
+        raise ValueError(choice)
+    return backups[choice - 1][0]
+
+
+def _action(client, op, role):
+    if op == "create_restore_code":
+        backup = _choose_backup(client)
+        if backup is None:
+            return
+        result = client.request(op, backup=backup,
+                                username=input("Gebruikersnaam van de systeembeheerder: ").strip())
+        print(f"\n✅ Restore code: {result['code']}")
+        print(f"   Eenmalig te gebruiken, {result['hours']} uur geldig")
+        return
+
+    # Superadmin kiest een backup; een systeembeheerder gebruikt een restore code
+    if role == "superadmin":
+        args = {"backup": _choose_backup(client)}
+        if args["backup"] is None:
+            return
+    else:
+        args = {"code": input("Restore code: ").strip()}
+    print("\nTot welk moment herstellen?")
+    print("Leeg = precies de stand van de backup")
+    print("'nu' = backup plus alle wijzigingen daarna (uit het journaal)")
+    print("Of een tijdstip: DD-MM-YYYY HH:MM[:SS]")
+    args["until"] = input("Tijdstip: ").strip()
+    if input("De huidige database wordt vervangen. Doorgaan? (j/n): ").strip().lower() != "j":
+        return
+    result = client.request(op, **args)
+    print(f"\n✅ Database hersteld van {result['backup']} in {result['seconds']}s")
+    if result["replayed"]:
+        print(f"   {result['replayed']} wijzigingen opnieuw toegepast")
+    print(f"   Vorige stand bewaard in {result['safety_backup']}")
+
+
+def _write(client, op, fields):
+    args = {}
+    for field in fields:
+        prompt = f"{field} (leeg = overslaan): "
+        value = getpass.getpass(prompt) if field == "password" else input(prompt).strip()
+        if value:
+            args[field] = value
+    if op.startswith("delete_") and input("Weet je het zeker? (j/n): ").strip().lower() != "j":
+        return
+    print(f"\n✅ {client.request(op, **args)}")
+
+
+def _session(client, username, role):
+    operations = client.request("describe")
+    entries = ([(op, partial(_read, client, op)) for op in operations["reads"]]
+               + [(op, partial(_write, client, op, fields)) for op, fields in operations["writes"].items()]
+               + [(op, partial(_action, client, op, role)) for op in operations.get("actions", ())])
+    while True:
+        print(f"\n=== Hoofdmenu ({role.upper()}, {username}) ===")
+        for number, (op, _) in enumerate(entries, 1):
+            print(f"{number}. {LABELS.get(op, op)}")
+        print("0. Uitloggen")
+        choice = input("\nKeuze: ").strip()
+        if choice == "0":
+            client.request("logout")
+            return
+        if not choice.isdigit() or not 1 <= int(choice) <= len(entries):
+            print("\n❌ Ongeldige keuze")
+            continue
+        _, run = entries[int(choice) - 1]
+        try:
+            run()
+        except ServerError as e:
+            print(f"\n❌ {e}")
+        except ValueError:
+            print("\n❌ Ongeldige waarde")
+
+
+def run_client(address=SERVER_ADDRESS):
+    try:
+        client = ServerClient(address)
+    except (OSError, ValueError) as e:
+        print(f"❌ Kan geen verbinding maken met de server op {address}: {e}")
+        return 1
+    try:
+        while True:
+            print("\n=== Startmenu (server) ===")
+            print("1. Inloggen")
+            print("0. Stoppen")
+            choice = input("\nKeuze: ").strip()
+            if choice == "0":
+                print("\nTot ziens!")
+                return 0
+            if choice != "1":
+                print("\n❌ Ongeldige keuze")
+                continue
+            username = input("Gebruikersnaam: ")
+            try:
+                result = client.request("login", username=username, password=getpass.getpass("Wachtwoord: "))
+            except ServerError as e:
+                print(f"\n❌ {e}")
+                continue
+            print(f"\n✅ Ingelogd als {username} ({result['role']})")
+            _session(client, username, result["role"])
+    except (ServerError, OSError) as e:
+        print(f"\n❌ Verbinding met de server verbroken: {e}")
+        return 1
+    finally:
+        client.close()
@@ -21,4 +21,99 @@ CITIES = [
     "Maassluis", "Capelle aan den IJssel",
     "Spijkenisse", "Hoogvliet", "Pernis",
     "Rozenburg", "Hoek van Holland"
-]
\ No newline at end of file
+]
+
+# Database connectie pool
+POOL_SIZE = 5
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+# Online backups
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0.005
+
+# Telemetrie
+TELEMETRY_BATCH_SIZE = 500
+
+# Overzichten
+PAGE_SIZE = 25
+
+# Decryptie cache
+DECRYPT_CACHE_SIZE = 10000
+DECRYPT_WORKERS = 4
+DECRYPT_PARALLEL_THRESHOLD = 64
+
+# Authenticatie
+BCRYPT_ROUNDS = 12
+AUTH_WORKERS = 4
+AUTH_MAX_PENDING = 64
+AUTH_LATENCY_SAMPLES = 1000
+
+# Versleutelde audit log
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 0.5
+LOG_QUEUE_SIZE = 10000
+LOG_MAX_BYTES = 10 * 1024 * 1024
+# Aantal geroteerde bestanden (samen max. ~110 MB); 0 = alles bewaren, maar
+# dan hernoemt elke rotatie alle oude bestanden en groeit de map onbeperkt
+LOG_BACKUP_COUNT = 10
+LOG_ROTATE_SECONDS = 0  # ook op leeftijd roteren (bijv. 24 * 60 * 60); 0 = alleen op grootte
+LOG_FSYNC = "interval"
+
+# Log zoeken
+LOG_INDEX_CHUNK_LINES = 1000
+LOG_SEARCH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Traveller zoeken (FTS5)
+SEARCH_LIMIT = 25
+SEARCH_CANDIDATES = 250
+SEARCH_MIN_SIMILARITY = 0.6
+
+# Vloot analytics
+ANALYTICS_SOC_BINS = 10
+ANALYTICS_ZONE_GRID = 4
+ANALYTICS_PERCENTILES = (50, 90, 99)
+
+# Onderhoudsplanning (punten per eenheid)
+MAINTENANCE_POINTS_PER_DAY = 1.0
+MAINTENANCE_POINTS_PER_KM = 0.05
+MAINTENANCE_OUT_OF_SERVICE_POINTS = 200
+MAINTENANCE_LOW_SOC = 20
+MAINTENANCE_LOW_SOC_POINTS = 30
+MAINTENANCE_UNKNOWN_DAYS = 365
+
+# Batch runner
+BATCH_TRANSACTION_SIZE = 500
+
+# Bulk import van travellers
+IMPORT_CHUNK_SIZE = 2000
+IMPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Export
+EXPORT_BATCH_SIZE = 5000
+
+# Restore
+RESTORE_INTEGRITY_CHECK = "quick"  # "quick" (quick_check) of "full" (integrity_check)
+RESTORE_CODES_DB = "restore_codes.db"
+RESTORE_CODE_TTL_HOURS = 24
+
+# Wijzigingsjournaal (CDC)
+JOURNAL_BATCH_SIZE = 1000
+JOURNAL_COMPACT_BATCH = 5000
+
+# Alleen-lezen replica voor overzichten en rapportages
+REPLICA_ENABLED = True
+REPLICA_MAX_STALENESS = 5.0  # seconden; oudere replica -> lezen van de primaire database
+REPLICA_REFRESH_INTERVAL = 1.0
+
+# Server voor meerdere operators tegelijk
+SERVER_ADDRESS = "127.0.0.1:8765"  # of "unix:/pad/naar/scooter.sock"
+SERVER_READ_THREADS = 8
+SERVER_WRITE_BATCH = 200  # maximaal aantal schrijfacties per transactie
+SERVER_MAX_REQUEST_BYTES = 64 * 1024
+
+# Write-behind voor scooter updates (group commit)
+SCOOTER_WRITE_BATCH = 200  # commit zodra zoveel scooters wachten
+SCOOTER_WRITE_INTERVAL = 0.05  # of na zoveel seconden
+SCOOTER_WRITE_QUEUE = 10000  # update() blokkeert boven dit aantal wachtende scooters
+SCOOTER_WRITE_DURABILITY = "committed"  # "buffered", "committed" of "durable"
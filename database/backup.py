@@ -0,0 +1,99 @@
+import os
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from config import BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP
+from .connection import get_pool
+from .journal import has_journal, last_seq, record_backup
+
+
+def backup_filename(db_name, backup_dir):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base = os.path.join(backup_dir, f"{os.path.basename(str(db_name))}.backup_{timestamp}")
+    # Twee backups in dezelfde seconde (bijv. de veiligheidsbackup bij een
+    # restore) mogen elkaar niet overschrijven
+    backup_file = base
+    number = 1
+    while os.path.exists(backup_file):
+        number += 1
+        backup_file = f"{base}_{number}"
+    return backup_file
+
+
+def create_backup(db_name, backup_dir, progress=None,
+                  pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP):
+    """Maakt een online backup via de SQLite backup API.
+
+    De bron wordt in batches van `pages` pagina's gekopieerd terwijl andere
+    verbindingen gewoon blijven schrijven. `progress(copied, total)` wordt
+    na elke batch aangeroepen. Geeft het pad van de backup terug.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    backup_file = backup_filename(db_name, backup_dir)
+    # Schrijf eerst naar een verborgen bestand zodat restore nooit een halve backup ziet
+    partial_file = os.path.join(backup_dir, f".{os.path.basename(backup_file)}.partial")
+
+    def _progress(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+
+    with get_pool(db_name).connection() as src:
+        dst = sqlite3.connect(partial_file)
+        try:
+            # Houd één leestransactie open: in WAL-modus zien we zo een vaste
+            # snapshot en hoeft de backup niet opnieuw te starten bij writes.
+            src.execute("BEGIN")
+            src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+            src.backup(dst, pages=pages, progress=_progress, sleep=sleep)
+            journal_seq = last_seq(dst) if has_journal(dst) else None
+        except Exception:
+            dst.close()
+            if os.path.exists(partial_file):
+                os.remove(partial_file)
+            raise
+        finally:
+            if src.in_transaction:
+                src.rollback()
+        dst.close()
+
+    os.replace(partial_file, backup_file)
+    if journal_seq is not None:
+        # Compactie van het journaal laat alles na deze backup staan
+        with get_pool(db_name).transaction() as conn:
+            record_backup(conn, journal_seq)
+    logging.info(f"Backup gemaakt: {backup_file}")
+    return backup_file
+
+
+class BackupScheduler:
+    """Maakt periodiek een backup op een achtergrondthread."""
+
+    def __init__(self, db_name, backup_dir, interval_seconds):
+        self.db_name = db_name
+        self.backup_dir = backup_dir
+        self.interval_seconds = interval_seconds
+        self.last_backup = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.last_backup = create_backup(self.db_name, self.backup_dir)
+            except Exception as e:
+                logging.error(f"Geplande backup mislukt: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
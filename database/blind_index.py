@@ -0,0 +1,93 @@
+from .encryption import is_token
+
+# Versleutelde (of gevoelige) velden die een blind index kolom <veld>_bidx krijgen
+BLIND_INDEX_FIELDS = {
+    'travellers': ('email', 'license_number'),
+    'users': ('email', 'license_number'),
+}
+
+
+# Leesbaar opgeslagen velden met een eigen UNIQUE index: daar direct op zoeken.
+# Het rijbewijs van een traveller is niet versleuteld (het schema controleert
+# de lengte); de blind index voegt daar niets toe aan de bestaande index.
+PLAIN_LOOKUP_FIELDS = {
+    'travellers': ('license_number',),
+}
+
+
+def bidx_column(field):
+    return f"{field}_bidx"
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def ensure_blind_indexes(conn, encryption, commit=True):
+    """Voegt blind index kolommen en indexen toe en vult ontbrekende waarden aan."""
+    for table, fields in BLIND_INDEX_FIELDS.items():
+        columns = _columns(conn, table)
+        if not columns:
+            continue
+        fields = [field for field in fields if field in columns]
+        for field in fields:
+            column = bidx_column(field)
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+        backfill_blind_indexes(conn, encryption, table, fields)
+    if commit:
+        conn.commit()
+
+
+def backfill_blind_indexes(conn, encryption, table, fields, batch_size=500):
+    for field in fields:
+        column = bidx_column(field)
+        cursor = conn.execute(
+            f"SELECT id, {field} FROM {table} WHERE {column} IS NULL AND {field} IS NOT NULL AND {field} != ''"
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            # Versleutelde waarden in één batch ontsleutelen, oude plaintext direct gebruiken
+            tokens = [value for _, value in rows if is_token(value)]
+            plain = dict(zip(tokens, encryption.decrypt_many(tokens)))
+            updates = []
+            for row_id, value in rows:
+                value = plain.get(value) if is_token(value) else value
+                if value:
+                    updates.append((encryption.blind_index(field, value), row_id))
+            conn.executemany(f"UPDATE {table} SET {column} = ? WHERE id = ?", updates)
+
+
+def blind_index_values(encryption, table, data):
+    """Geeft {<veld>_bidx: hmac} voor de gevoelige velden in `data`."""
+    return {
+        bidx_column(field): encryption.blind_index(field, data.get(field))
+        for field in BLIND_INDEX_FIELDS.get(table, ())
+        if field in data
+    }
+
+
+def lookup(encryption, table, field, value):
+    """(kolom, waarde) voor een gelijkheidszoekopdracht: de kolom zelf of de blind index."""
+    if field in PLAIN_LOOKUP_FIELDS.get(table, ()):
+        # Zelfde normalisatie als blind_index() voor niet-e-mail velden
+        return field, str(value).strip().replace(" ", "").upper()
+    return bidx_column(field), encryption.blind_index(field, value)
+
+
+def find_ids(conn, encryption, table, field, value, exclude_id=None):
+    """Indexed gelijkheidszoekopdracht op een versleuteld (of PLAIN_LOOKUP) veld: lijst van ids."""
+    column, value = lookup(encryption, table, field, value)
+    sql = f"SELECT id FROM {table} WHERE {column} = ?"
+    params = [value]
+    if exclude_id is not None:
+        sql += " AND id != ?"
+        params.append(exclude_id)
+    return [row[0] for row in conn.execute(sql, params)]
+
+
+def exists(conn, encryption, table, field, value, exclude_id=None):
+    return bool(find_ids(conn, encryption, table, field, value, exclude_id))
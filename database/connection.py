@@ -0,0 +1,160 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from config import POOL_SIZE, BUSY_TIMEOUT_MS, STATEMENT_CACHE_SIZE
+
+
+class ConnectionPool:
+    """Pool van langlevende SQLite verbindingen voor één databasebestand.
+
+    Elke verbinding wordt één keer geconfigureerd (WAL, busy timeout,
+    statement cache) en daarna hergebruikt in plaats van per actie
+    opnieuw geopend en gesloten.
+    """
+
+    def __init__(self, db_name, size=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS,
+                 cached_statements=STATEMENT_CACHE_SIZE):
+        self.db_name = str(db_name)
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def read_only(self):
+        return self.db_name.startswith("file:") and "mode=ro" in self.db_name
+
+    def _open(self):
+        # db_name mag ook een URI zijn, bijv. "file:/pad/replica.db?mode=ro"
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=self.db_name.startswith("file:"),
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if not self.read_only:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connectie pool is gesloten")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        # Pool is vol: wacht tot een andere gebruiker een verbinding teruggeeft
+        try:
+            return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Geen vrije databaseverbinding beschikbaar")
+
+    def release(self, conn):
+        try:
+            # Nooit een openstaande transactie teruggeven aan de pool
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.ProgrammingError:
+            # Verbinding is al gesloten door de aanroeper
+            self._discard()
+            return
+
+        if self._closed:
+            conn.close()
+            self._discard()
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+            self._discard()
+
+    def _discard(self):
+        with self._lock:
+            self._created = max(0, self._created - 1)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close_all(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            self._discard()
+
+
+def execute_statements(conn, script):
+    """Voert een SQL script statement voor statement uit.
+
+    Anders dan executescript() commit dit niet tussendoor, zodat het binnen
+    een lopende transactie (bijv. een migratie) gebruikt kan worden.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name):
+    """Geeft de gedeelde pool voor `db_name` terug (één per bestand per proces)."""
+    key = str(db_name)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
@@ -1,12 +1,77 @@
-from cryptography.fernet import Fernet
+from collections import OrderedDict
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import os
 
+from config import DECRYPT_CACHE_SIZE, DECRYPT_WORKERS, DECRYPT_PARALLEL_THRESHOLD
+
+# Label voor het afleiden van de blind index sleutel uit de Fernet sleutel
+BLIND_INDEX_LABEL = b"blind-index-v1"
+
+# Fernet tokens beginnen altijd met versie byte 0x80, base64 "gAAAAA"
+TOKEN_PREFIX = "gAAAAA"
+
+def is_token(value):
+    return isinstance(value, str) and value.startswith(TOKEN_PREFIX)
+
+class DecryptCache:
+    """Begrensde LRU cache van ciphertext token -> plaintext."""
+
+    def __init__(self, max_entries=DECRYPT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            value = self._data.get(token)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(token)
+            self.hits += 1
+            return value
+
+    def put(self, token, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[token] = value
+            self._data.move_to_end(token)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            self._data.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
 class EncryptionManager:
-    def __init__(self, key_file="secret.key"):
+    def __init__(self, key_file="secret.key", cache_size=DECRYPT_CACHE_SIZE, workers=DECRYPT_WORKERS):
         self.key_file = key_file
         self.fernet = self._load_or_create_key()
+        self._index_key = hmac.new(self.key, BLIND_INDEX_LABEL, hashlib.sha256).digest()
+        self.cache = DecryptCache(cache_size)
+        self.workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
     def _load_or_create_key(self):
+        # cryptography pas hier importeren: modules die alleen is_token of de
+        # blind index functies nodig hebben starten zo sneller op
+        from cryptography.fernet import Fernet, InvalidToken
+
+        self._decrypt_errors = (InvalidToken, ValueError, AttributeError)
         if not os.path.exists(self.key_file):
             key = Fernet.generate_key()
             with open(self.key_file, "wb") as f:
@@ -14,10 +79,94 @@ class EncryptionManager:
         else:
             with open(self.key_file, "rb") as f:
                 key = f.read()
+        self.key = key
         return Fernet(key)
 
     def encrypt(self, data: str) -> str:
         return self.fernet.encrypt(data.encode()).decode()
 
     def decrypt(self, token: str) -> str:
-        return self.fernet.decrypt(token.encode()).decode()
+        value = self.cache.get(token)
+        if value is None:
+            value = self.fernet.decrypt(token.encode()).decode()
+            self.cache.put(token, value)
+        return value
+
+    def _decrypt_or_default(self, token, default):
+        try:
+            return self.fernet.decrypt(token.encode()).decode()
+        except self._decrypt_errors:
+            return default
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="decrypt")
+            return self._executor
+
+    def decrypt_many(self, tokens, default=None):
+        """Decrypt een batch tokens in volgorde; ongeldige tokens worden `default`.
+
+        Tokens uit de cache worden niet opnieuw ontsleuteld, dubbele tokens
+        maar één keer, en grote batches worden over een thread pool verdeeld.
+        """
+        results = [None] * len(tokens)
+        missing = {}
+        for index, token in enumerate(tokens):
+            if not token:
+                results[index] = token
+                continue
+            value = self.cache.get(token)
+            if value is None:
+                missing.setdefault(token, []).append(index)
+            else:
+                results[index] = value
+
+        if not missing:
+            return results
+
+        todo = list(missing)
+        if self.workers > 1 and len(todo) >= DECRYPT_PARALLEL_THRESHOLD:
+            chunk = -(-len(todo) // self.workers)
+            chunks = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+            decrypted = []
+            for part in self._get_executor().map(
+                    lambda part: [self._decrypt_or_default(t, None) for t in part], chunks):
+                decrypted.extend(part)
+        else:
+            decrypted = [self._decrypt_or_default(t, None) for t in todo]
+
+        for token, value in zip(todo, decrypted):
+            if value is None:
+                value = default
+            else:
+                self.cache.put(token, value)
+            for index in missing[token]:
+                results[index] = value
+        return results
+
+    def blind_index(self, field, value):
+        """Deterministische HMAC van een genormaliseerde waarde voor gelijkheidszoekopdrachten.
+
+        Fernet ciphertext is gerandomiseerd en dus niet doorzoekbaar; deze
+        HMAC wel, zonder de waarde zelf prijs te geven.
+        """
+        if value is None or value == "":
+            return None
+        normalized = str(value).strip().replace(" ", "")
+        normalized = normalized.lower() if field == "email" else normalized.upper()
+        message = f"{field}:{normalized}".encode()
+        return hmac.new(self._index_key, message, hashlib.sha256).hexdigest()
+
+    def invalidate(self, token):
+        # Aanroepen wanneer een versleuteld veld wordt overschreven
+        if token:
+            self.cache.invalidate(token)
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        self.cache.clear()
@@ -1,20 +1,22 @@
-import sqlite3
 from pathlib import Path
 from ..config import DB_PATH, SUPERADMIN_CREDENTIALS
-from .models import initialize_tables
 from .encryption import EncryptionManager
+from .connection import get_pool
+from .migrations import migrate
 
 class Database:
     def __init__(self):
         self.encryption = EncryptionManager()
+        self.pool = None
         self.conn = None
         self._initialize()
 
     def _initialize(self):
         """Initialize database and tables"""
         Path(DB_PATH).parent.mkdir(exist_ok=True)
-        self.conn = sqlite3.connect(DB_PATH)
-        initialize_tables(self.conn)
+        self.pool = get_pool(DB_PATH)
+        self.conn = self.pool.acquire()
+        migrate(self.conn, self.encryption)
         self._create_superadmin()
         
     def _create_superadmin(self):
@@ -33,6 +35,11 @@ class Database:
     def get_connection(self):
         return self.conn
 
+    def connection(self):
+        # Losse verbinding uit de gedeelde pool, bijv. voor ScooterManager/TravellerManager
+        return self.pool.connection()
+
     def close(self):
         if self.conn:
-            self.conn.close()
\ No newline at end of file
+            self.pool.release(self.conn)
+            self.conn = None
\ No newline at end of file
@@ -0,0 +1,433 @@
+"""Wijzigingsjournaal: elke insert, update en delete op de kerntabellen.
+
+Triggers schrijven per gewijzigde rij een record naar change_journal:
+tabel, rij id, operatie, gewijzigde kolommen, tijdstip, de handelende
+gebruiker en de nieuwe waarden (JSON): bij een insert het volledige
+rijbeeld, bij een update alleen id en de gewijzigde kolommen. Daarmee kan een backup tot op
+een gekozen tijdstip worden bijgewerkt (point-in-time restore) en kunnen
+afnemers (sync, replica's, audit) incrementeel meelezen met een
+JournalConsumer in plaats van hele tabellen opnieuw te lezen.
+
+Tijden staan in UTC ("YYYY-MM-DD HH:MM:SS.SSS"). De gebruiker komt uit
+journal_context; zet die met `acting_as()` binnen de schrijftransactie.
+Migraties die kolommen toevoegen aan een tabel uit JOURNAL_TABLES moeten
+daarna `ensure_journal_triggers()` aanroepen, anders ontbreken de nieuwe
+kolommen in het rijbeeld.
+
+Afnemers krijgen geen wachtwoord hashes: JournalConsumer vervangt de
+kolommen uit REDACTED_COLUMNS door REDACTED. Replay (restore) leest het
+journaal zelf en neemt de echte waarden over.
+"""
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import JOURNAL_BATCH_SIZE, JOURNAL_COMPACT_BATCH
+from .connection import execute_statements, get_pool
+
+JOURNAL_TABLES = ("travellers", "scooters", "users")
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS change_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    tbl TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    op TEXT NOT NULL CHECK(op IN ('I', 'U', 'D')),
+    data TEXT,
+    changed TEXT,
+    actor INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS journal_context (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    actor INTEGER
+);
+
+INSERT OR IGNORE INTO journal_context (id, actor) VALUES (1, NULL);
+
+CREATE TABLE IF NOT EXISTS journal_consumers (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+"""
+
+# Kolommen die na de eerste versie van het journaal zijn toegevoegd
+JOURNAL_ADDED_COLUMNS = {"changed": "TEXT", "actor": "INTEGER"}
+
+JOURNAL_COLUMNS = ("seq", "ts", "tbl", "row_id", "op", "changed", "actor", "data")
+
+TIMESTAMP_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+ACTOR_SQL = "(SELECT actor FROM journal_context WHERE id = 1)"
+
+# Positie van de laatste backup: compactie laat alles daarna staan voor restore
+BACKUP_CONSUMER = "backup"
+
+# Replay leest het journaal in stukken in plaats van alles tegelijk
+REPLAY_BATCH = 1000
+
+# Kolommen die een JournalConsumer nooit te zien krijgt
+REDACTED_COLUMNS = {"users": ("password_hash",)}
+REDACTED = "[verborgen]"
+
+
+class JournalChange:
+    __slots__ = JOURNAL_COLUMNS
+
+    def __init__(self, row):
+        for column, value in zip(JOURNAL_COLUMNS, row):
+            setattr(self, column, value)
+
+    @property
+    def columns(self):
+        """Gewijzigde kolommen van een update (leeg bij insert en delete)."""
+        return self.changed.split(",") if self.changed else []
+
+    @property
+    def row(self):
+        """Nieuwe waarden als dict: het hele rijbeeld bij een insert, id en de
+        gewijzigde kolommen bij een update; None bij een delete."""
+        return json.loads(self.data) if self.data else None
+
+    def __repr__(self):
+        return f"JournalChange(seq={self.seq}, {self.op} {self.tbl}#{self.row_id}, changed={self.columns})"
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _trigger_names(table):
+    return [f"journal_{table}_{event}" for event in ("insert", "update", "delete")]
+
+
+def drop_journal_triggers(conn):
+    for table in JOURNAL_TABLES:
+        for name in _trigger_names(table):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def ensure_journal_triggers(conn):
+    """(Her)maakt de journaal triggers op basis van de huidige kolommen."""
+    drop_journal_triggers(conn)
+    for table in JOURNAL_TABLES:
+        columns = _columns(conn, table)
+        if not columns:
+            continue
+        # Rijbeeld uit de tabel zelf in plaats van NEW: als een andere trigger
+        # (bijv. onderhoudskilometerstand) de rij nog aanpast, legt elk record
+        # de uiteindelijke stand vast
+        pairs = ", ".join(f"'{column}', {column}" for column in columns)
+        image = f"(SELECT json_object({pairs}) FROM {table} WHERE id = NEW.id)"
+        differs = [f"OLD.{column} IS NOT NEW.{column}" for column in columns]
+        changed = "rtrim(" + " || ".join(
+            f"CASE WHEN OLD.{column} IS NOT NEW.{column} THEN '{column},' ELSE '' END" for column in columns
+        ) + ", ',')"
+        # Bij een update alleen id en de gewijzigde kolommen: een telemetrie
+        # update van één kolom schrijft niet de hele rij opnieuw weg
+        delta = (f"(SELECT json_group_object(key, value) FROM json_each({image}) "
+                 f"WHERE key = 'id' OR instr(',' || {changed} || ',', ',' || key || ',') > 0)")
+        insert, update, delete = _trigger_names(table)
+        conn.execute(f"""
+            CREATE TRIGGER {insert} AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO change_journal (ts, tbl, row_id, op, actor, data)
+                VALUES ({TIMESTAMP_SQL}, '{table}', NEW.id, 'I', {ACTOR_SQL}, {image});
+            END
+        """)
+        # Updates die niets veranderen leveren geen record op
+        conn.execute(f"""
+            CREATE TRIGGER {update} AFTER UPDATE ON {table}
+            WHEN {' OR '.join(differs)}
+            BEGIN
+                INSERT INTO change_journal (ts, tbl, row_id, op, changed, actor, data)
+                VALUES ({TIMESTAMP_SQL}, '{table}', NEW.id, 'U', {changed}, {ACTOR_SQL}, {delta});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {delete} AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO change_journal (ts, tbl, row_id, op, actor, data)
+                VALUES ({TIMESTAMP_SQL}, '{table}', OLD.id, 'D', {ACTOR_SQL}, NULL);
+            END
+        """)
+
+
+def ensure_journal(conn):
+    execute_statements(conn, JOURNAL_SCHEMA)
+    existing = _columns(conn, "change_journal")
+    for column, definition in JOURNAL_ADDED_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE change_journal ADD COLUMN {column} {definition}")
+    ensure_journal_triggers(conn)
+
+
+def has_journal(conn):
+    return bool(_columns(conn, "change_journal"))
+
+
+def last_seq(conn):
+    # Uit sqlite_sequence in plaats van MAX(seq): na compactie kan het journaal leeg zijn
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_journal'").fetchone()
+    return row[0] if row else 0
+
+
+def to_journal_time(moment):
+    """Zet een (lokale) datetime om naar de UTC notatie van het journaal."""
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    return moment.astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)[:-3]
+
+
+@contextmanager
+def acting_as(conn, user_id):
+    """Schrijfacties binnen dit blok komen op naam van `user_id` in het journaal.
+
+    Zet de gebruiker in de lopende transactie van `conn` en wist hem weer
+    aan het einde van het blok; commit dus pas ná het blok. Omdat SQLite
+    maar één schrijver tegelijk toelaat, ziet geen andere verbinding deze
+    gebruiker.
+    """
+    conn.execute("UPDATE journal_context SET actor = ? WHERE id = 1", (user_id,))
+    try:
+        yield conn
+    finally:
+        conn.execute("UPDATE journal_context SET actor = NULL WHERE id = 1")
+
+
+def read_changes(conn, after_seq, tables=None, limit=JOURNAL_BATCH_SIZE, upto=None):
+    """Journaalrecords na `after_seq` (optioneel tot en met `upto`), op volgorde."""
+    clauses = ["seq > ?"]
+    params = [after_seq]
+    if upto is not None:
+        clauses.append("seq <= ?")
+        params.append(upto)
+    if tables:
+        clauses.append(f"tbl IN ({', '.join('?' for _ in tables)})")
+        params.extend(tables)
+    rows = conn.execute(
+        f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM change_journal WHERE {' AND '.join(clauses)} "
+        f"ORDER BY seq LIMIT ?",
+        [*params, limit],
+    ).fetchall()
+    return [JournalChange(row) for row in rows]
+
+
+def _redact(change):
+    hidden = [column for column in REDACTED_COLUMNS.get(change.tbl, ()) if change.data and column in change.row]
+    if hidden:
+        row = change.row
+        row.update(dict.fromkeys(hidden, REDACTED))
+        change.data = json.dumps(row)
+    return change
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def record_backup(conn, seq):
+    """Legt vast dat een backup het journaal tot en met `seq` bevat (binnen de transactie van de aanroeper)."""
+    if not _columns(conn, "journal_consumers"):
+        return
+    conn.execute("""
+        INSERT INTO journal_consumers (name, position, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET position = MAX(position, excluded.position), updated_at = excluded.updated_at
+    """, (BACKUP_CONSUMER, seq, _now()))
+
+
+class JournalConsumer:
+    """Leest het journaal incrementeel vanaf een bewaarde positie.
+
+    De positie staat in journal_consumers, zodat een afnemer na een
+    herstart verder gaat waar hij was. Verwerking is at-least-once: roep
+    `ack()` pas aan als de wijzigingen uit `poll()` verwerkt zijn.
+
+        consumer = JournalConsumer(DB_NAME, "replica", tables=["scooters"])
+        for change in consumer.poll():
+            ...
+        consumer.ack()
+    """
+
+    def __init__(self, db_name, name, tables=None, batch_size=JOURNAL_BATCH_SIZE, from_end=False):
+        if name == BACKUP_CONSUMER:
+            raise ValueError(f"'{BACKUP_CONSUMER}' is gereserveerd voor de backups")
+        self.pool = get_pool(db_name)
+        self.name = name
+        self.tables = list(tables) if tables else None
+        self.batch_size = batch_size
+        self.polled_to = None
+        with self.pool.transaction() as conn:
+            # Een nieuwe afnemer begint bij het begin van het journaal (of bij het einde)
+            start = last_seq(conn) if from_end else 0
+            conn.execute("INSERT OR IGNORE INTO journal_consumers (name, position, updated_at) VALUES (?, ?, ?)",
+                         (name, start, _now()))
+
+    @property
+    def position(self):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT position FROM journal_consumers WHERE name = ?", (self.name,)).fetchone()
+        if row is None:
+            raise LookupError(f"Afnemer {self.name} is afgemeld")
+        return row[0]
+
+    def poll(self, limit=None):
+        """Volgende wijzigingen na de positie; verschuift de positie nog niet."""
+        limit = limit or self.batch_size
+        position = self.position
+        with self.pool.connection() as conn:
+            upto = last_seq(conn)
+            changes = [_redact(change) for change in read_changes(conn, position, self.tables, limit, upto)]
+        # Met een tabelfilter mag de positie ook over overgeslagen records
+        # heen, anders houdt deze afnemer de compactie onnodig tegen
+        self.polled_to = changes[-1].seq if len(changes) == limit else upto
+        return changes
+
+    def ack(self, seq=None):
+        """Bevestigt verwerking tot en met `seq` (standaard: alles uit de laatste poll)."""
+        if seq is None:
+            seq = self.polled_to
+        if seq is None:
+            return
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "UPDATE journal_consumers SET position = MAX(position, ?), updated_at = ? WHERE name = ?",
+                (seq, _now(), self.name),
+            )
+        self.polled_to = None
+
+    def seek(self, seq):
+        """Zet de positie op `seq`, ook terug (bijv. na een volledige kopie)."""
+        with self.pool.transaction() as conn:
+            conn.execute("UPDATE journal_consumers SET position = ?, updated_at = ? WHERE name = ?",
+                         (seq, _now(), self.name))
+        self.polled_to = None
+
+    def consume(self, handler):
+        """Geeft alle openstaande wijzigingen per batch aan `handler(changes)`; geeft het aantal terug."""
+        total = 0
+        while True:
+            changes = self.poll()
+            if changes:
+                handler(changes)
+                total += len(changes)
+            self.ack()
+            if len(changes) < self.batch_size:
+                return total
+
+    def lag(self):
+        """Aantal journaalrecords dat deze afnemer nog niet bevestigd heeft."""
+        position = self.position
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM change_journal WHERE seq > ?", (position,)).fetchone()[0]
+
+    def unregister(self):
+        """Meldt de afnemer af, zodat hij de compactie niet langer tegenhoudt."""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM journal_consumers WHERE name = ?", (self.name,))
+
+
+def compact(db_name, batch_size=JOURNAL_COMPACT_BATCH):
+    """Verwijdert journaalrecords die alle afnemers én de laatste backup al bevatten.
+
+    Zonder vastgelegde backup wordt niets verwijderd: dan kan een restore
+    nog elk record nodig hebben. Records na de laatste backup blijven altijd
+    staan voor point-in-time restore. Verwijdert in kleine transacties om
+    schrijvers niet lang te blokkeren; geeft het aantal verwijderde records.
+    """
+    pool = get_pool(db_name)
+    with pool.connection() as conn:
+        backup_seq, upto = conn.execute(
+            "SELECT MAX(CASE WHEN name = ? THEN position END), MIN(position) FROM journal_consumers",
+            (BACKUP_CONSUMER,),
+        ).fetchone()
+    if backup_seq is None:
+        return 0
+    deleted = 0
+    while True:
+        with pool.transaction() as conn:
+            removed = conn.execute("""
+                DELETE FROM change_journal WHERE seq IN (
+                    SELECT seq FROM change_journal WHERE seq <= ? ORDER BY seq LIMIT ?
+                )
+            """, (upto, batch_size)).rowcount
+        deleted += removed
+        if removed < batch_size:
+            return deleted
+
+
+def replay(source, target, after_seq, until=None):
+    """Past journaalrecords uit `source` na `after_seq` (en tot `until`) toe op `target`.
+
+    `until` is een tijd in journaalnotatie (zie to_journal_time). De records
+    worden ook letterlijk in het journaal van `target` overgenomen, met de
+    journaal triggers tijdelijk uit zodat ze niet dubbel geschreven worden.
+    Loopt binnen de transactie van de aanroeper; geeft (aantal, laatste seq).
+    """
+    columns = table_columns(target)
+    drop_journal_triggers(target)
+    applied = 0
+    last = after_seq
+    cursor = source.execute(
+        f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM change_journal WHERE seq > ? ORDER BY seq", (after_seq,)
+    )
+    done = False
+    while not done:
+        records = cursor.fetchmany(REPLAY_BATCH)
+        if not records:
+            break
+        for record in records:
+            change = JournalChange(record)
+            # Het journaal is op seq geordend; het eerste record na `until` sluit af
+            if until is not None and change.ts > until:
+                done = True
+                break
+            apply_change(target, change, columns)
+            target.execute(
+                f"INSERT INTO change_journal ({', '.join(JOURNAL_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in JOURNAL_COLUMNS)})",
+                record,
+            )
+            applied += 1
+            last = change.seq
+    ensure_journal_triggers(target)
+    return applied, last
+
+
+def table_columns(conn):
+    """Kolommen per journaaltabel, voor apply_change."""
+    return {table: set(_columns(conn, table)) for table in JOURNAL_TABLES}
+
+
+def apply_change(target, change, columns):
+    """Past één JournalChange toe op `target`; `columns` komt van table_columns()."""
+    if change.tbl not in columns:
+        return
+    if change.op == "D":
+        target.execute(f"DELETE FROM {change.tbl} WHERE id = ?", (change.row_id,))
+    elif change.op == "U" and change.data:
+        _update(target, change.tbl, columns[change.tbl], change.row_id, change.row)
+    elif change.data:
+        _upsert(target, change.tbl, columns[change.tbl], change.row)
+
+
+def _update(conn, table, known, row_id, values):
+    # Een update bevat alleen de gewijzigde kolommen: een INSERT zou op NOT NULL kolommen stuklopen
+    names = [column for column in values if column in known and column != "id"]
+    if names:
+        conn.execute(f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in names)} WHERE id = ?",
+                     [*(values[column] for column in names), row_id])
+
+
+def _upsert(conn, table, known, image):
+    # ON CONFLICT DO UPDATE in plaats van REPLACE: zo lopen de update
+    # triggers (FTS, R*Tree) mee en blijven de indexen kloppen
+    names = [column for column in image if column in known]
+    updates = ", ".join(f"{column} = excluded.{column}" for column in names if column != "id")
+    conn.execute(
+        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+        f"ON CONFLICT(id) DO UPDATE SET {updates}",
+        [image[column] for column in names],
+    )
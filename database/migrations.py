@@ -0,0 +1,318 @@
+"""Versiebeheer van het databaseschema.
+
+Alle schemawijzigingen staan hier als genummerde, idempotente migraties.
+`migrate()` voert alleen migraties uit die nog niet in `schema_version`
+staan, elk in een eigen transactie, zodat een database altijd op een
+bekende versie staat. `check_query_plans()` controleert met EXPLAIN QUERY
+PLAN dat de veelgebruikte queries uit main.py een index gebruiken.
+
+    python -m database.migrations scooter_management.db
+"""
+import logging
+import sys
+from datetime import datetime
+
+from config import SUPERADMIN_CREDENTIALS, BCRYPT_ROUNDS
+from .connection import execute_statements
+
+# De schema modules (cryptography, FTS, R*Tree, ...) worden pas in hun
+# migratie geïmporteerd: een warme start heeft alleen schema_is_current nodig
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+)
+"""
+
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT CHECK(role IN ('superadmin', 'sysadmin', 'engineer')) NOT NULL,
+    email TEXT,
+    license_number TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    registration_date TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS travellers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    birthday TEXT,
+    gender TEXT,
+    street_name TEXT,
+    house_number TEXT,
+    zip_code TEXT,
+    city TEXT,
+    email TEXT,
+    license_number TEXT UNIQUE CHECK(length(license_number) = 10),
+    phone_number TEXT CHECK(length(phone_number) BETWEEN 10 AND 15),
+    registration_date TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS scooters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    serial_number TEXT UNIQUE NOT NULL CHECK(length(serial_number) <= 17),
+    top_speed INTEGER CHECK(top_speed BETWEEN 0 AND 100),
+    battery_capacity INTEGER CHECK(battery_capacity BETWEEN 0 AND 100),
+    soc INTEGER CHECK(soc BETWEEN 0 AND 100),
+    target_range_min INTEGER,
+    target_range_max INTEGER,
+    latitude REAL CHECK(latitude BETWEEN -90 AND 90),
+    longitude REAL CHECK(longitude BETWEEN -180 AND 180),
+    out_of_service INTEGER CHECK(out_of_service IN (0, 1)) DEFAULT 0,
+    mileage INTEGER CHECK(mileage >= 0),
+    last_maintenance TEXT,
+    in_service_date TEXT DEFAULT CURRENT_TIMESTAMP,
+    last_updated TEXT
+);
+"""
+
+# Indexen voor de overzichten in main.py. De sorteerkolommen + id komen eerst
+# zodat keyset paginering een index seek is; de overige kolommen maken de
+# index covering zodat de tabel zelf niet gelezen hoeft te worden.
+LISTING_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_travellers_listing
+    ON travellers (last_name, id, first_name, email, phone_number, registration_date);
+
+CREATE INDEX IF NOT EXISTS idx_scooters_listing
+    ON scooters (brand, model, id, serial_number, soc, out_of_service, last_updated);
+
+CREATE INDEX IF NOT EXISTS idx_scooters_maintenance
+    ON scooters (COALESCE(last_maintenance, ''), id, brand, model, last_maintenance, mileage, out_of_service);
+
+CREATE INDEX IF NOT EXISTS idx_scooters_out_of_service_maintenance
+    ON scooters (out_of_service, COALESCE(last_maintenance, ''), id);
+"""
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_column(conn, table, column, definition):
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _base_schema(conn, context):
+    execute_statements(conn, BASE_SCHEMA)
+
+
+def _missing_columns(conn, context):
+    # Databases van create_database.py missen deze kolommen
+    _add_column(conn, "users", "email", "TEXT")
+    _add_column(conn, "users", "license_number", "TEXT")
+    _add_column(conn, "scooters", "last_updated", "TEXT")
+
+
+def _blind_indexes(conn, context):
+    from .blind_index import ensure_blind_indexes
+    if context["encryption"] is None:
+        raise ValueError("Blind index migratie heeft een EncryptionManager nodig")
+    ensure_blind_indexes(conn, context["encryption"], commit=False)
+
+
+def _spatial_index(conn, context):
+    from management.locations import ensure_spatial_index
+    ensure_spatial_index(conn, commit=False)
+
+
+def _listing_indexes(conn, context):
+    execute_statements(conn, LISTING_INDEXES)
+
+
+def _search_index(conn, context):
+    from management.search import ensure_search_index
+    ensure_search_index(conn, commit=False)
+
+
+def _maintenance_mileage(conn, context):
+    from management.maintenance import MAINTENANCE_SCHEMA
+    _add_column(conn, "scooters", "mileage_at_maintenance", "INTEGER")
+    execute_statements(conn, MAINTENANCE_SCHEMA)
+
+
+def _import_progress(conn, context):
+    from management.traveller_import import IMPORT_SCHEMA
+    execute_statements(conn, IMPORT_SCHEMA)
+
+
+def _superadmin(conn, context):
+    # Eenmalig in plaats van bij elke start: de hardcoded superadmin
+    import bcrypt
+
+    if conn.execute("SELECT 1 FROM users WHERE username = ?",
+                    (SUPERADMIN_CREDENTIALS["username"],)).fetchone():
+        return
+    password_hash = bcrypt.hashpw(SUPERADMIN_CREDENTIALS["password"].encode(),
+                                  bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+    conn.execute("""
+        INSERT INTO users (username, password_hash, role, first_name, last_name)
+        VALUES (?, ?, ?, ?, ?)
+    """, (SUPERADMIN_CREDENTIALS["username"], password_hash, SUPERADMIN_CREDENTIALS["role"], "Super", "Admin"))
+
+
+def _change_journal(conn, context):
+    from .journal import ensure_journal
+    ensure_journal(conn)
+
+
+def _journal_consumers(conn, context):
+    # ensure_journal is idempotent: voegt kolommen, context en afnemers toe
+    # aan een journaal uit migratie 10 en hermaakt de triggers
+    from .journal import ensure_journal
+    ensure_journal(conn)
+
+
+def _journal_deltas(conn, context):
+    # Nieuwe triggers: bij een update alleen de gewijzigde kolommen in het journaal
+    from .journal import ensure_journal_triggers
+    ensure_journal_triggers(conn)
+
+
+# (versie, omschrijving, functie) - alleen toevoegen, nooit wijzigen of hernummeren.
+# Kolommen erbij op travellers, scooters of users: daarna ook
+# journal.ensure_journal_triggers() aanroepen.
+MIGRATIONS = [
+    (1, "basisschema users, travellers, scooters", _base_schema),
+    (2, "ontbrekende kolommen in oudere databases", _missing_columns),
+    (3, "blind index kolommen voor e-mail en rijbewijs", _blind_indexes),
+    (4, "R*Tree index voor scooter locaties", _spatial_index),
+    (5, "covering indexen voor overzichten", _listing_indexes),
+    (6, "FTS5 trigram index voor traveller zoeken", _search_index),
+    (7, "kilometerstand bij laatste onderhoud", _maintenance_mileage),
+    (8, "voortgang van bulk imports", _import_progress),
+    (9, "hardcoded superadmin account", _superadmin),
+    (10, "wijzigingsjournaal voor point-in-time restore", _change_journal),
+    (11, "journaal: gewijzigde kolommen, gebruiker en afnemers", _journal_consumers),
+    (12, "journaal: alleen gewijzigde kolommen bij een update", _journal_deltas),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    conn.execute(SCHEMA_VERSION_TABLE)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def schema_is_current(conn, target=LATEST_VERSION):
+    """Snelle controle bij het opstarten: leest alleen PRAGMA user_version uit de header.
+
+    migrate() houdt user_version gelijk aan de hoogste toegepaste versie.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0] >= target
+
+
+def _mark_version(conn, version):
+    # PRAGMA accepteert geen parameters; version is altijd een int
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def migrate(conn, encryption=None, target=LATEST_VERSION):
+    """Voert openstaande migraties uit; geeft de lijst toegepaste versies terug."""
+    context = {"encryption": encryption}
+    applied = []
+    version = current_version(conn)
+    if version >= target:
+        # Databases van vóór user_version: eenmalig bijwerken
+        if conn.execute("PRAGMA user_version").fetchone()[0] != version:
+            _mark_version(conn, version)
+        return applied
+
+    for version, description, migration in MIGRATIONS:
+        if version > target:
+            break
+        # BEGIN IMMEDIATE + hercontrole: twee processen migreren nooit tegelijk
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            migration(conn, context)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            _mark_version(conn, version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        logging.info(f"Migratie {version} toegepast: {description}")
+    return applied
+
+
+# Veelgebruikte queries uit main.py met voorbeeldparameters
+HOT_QUERIES = [
+    ("login", "SELECT id, password_hash, role FROM users WHERE username = ?", ("super_admin",)),
+    ("traveller op rijbewijs", "SELECT id FROM travellers WHERE license_number = ?", ("x",)),
+    ("traveller op e-mail", "SELECT id FROM travellers WHERE email_bidx = ?", ("x",)),
+    ("travellers pagina",
+     "SELECT id, first_name, last_name, email, phone_number, registration_date, last_name, id "
+     "FROM travellers WHERE last_name >= ? AND (last_name, id) > (?, ?) "
+     "ORDER BY last_name ASC, id ASC LIMIT 25", ("", "", 0)),
+    ("scooters pagina",
+     "SELECT id, brand, model, serial_number, soc, out_of_service, last_updated, brand, model, id "
+     "FROM scooters WHERE brand >= ? AND (brand, model, id) > (?, ?, ?) "
+     "ORDER BY brand ASC, model ASC, id ASC LIMIT 25", ("", "", "", 0)),
+    ("onderhoud pagina",
+     "SELECT id, brand, model, last_maintenance, mileage, out_of_service, COALESCE(last_maintenance, ''), id "
+     "FROM scooters WHERE COALESCE(last_maintenance, '') >= ? AND (COALESCE(last_maintenance, ''), id) > (?, ?) "
+     "ORDER BY COALESCE(last_maintenance, '') ASC, id ASC LIMIT 25", ("", "", 0)),
+    ("onderhoud buiten gebruik",
+     "SELECT id, brand, model, last_maintenance, mileage, out_of_service, COALESCE(last_maintenance, ''), id "
+     "FROM scooters WHERE out_of_service = ? ORDER BY COALESCE(last_maintenance, '') ASC, id ASC LIMIT 25", (1,)),
+    # ORDER BY rank sorteert FTS5 zelf, zonder temp b-tree (zie TravellerSearch._ranked)
+    ("traveller zoeken",
+     "SELECT rowid, rank FROM travellers_fts WHERE travellers_fts MATCH ? AND rank MATCH ? "
+     "ORDER BY rank LIMIT 250", ('"jan"', "bm25(2.0, 3.0, 1.0, 1.0, 1.0)")),
+    ("scooter op id", "SELECT * FROM scooters WHERE id = ?", (1,)),
+    ("scooter op serienummer", "SELECT id FROM scooters WHERE serial_number = ?", ("x",)),
+    ("scooters in gebied",
+     "SELECT s.id FROM scooter_rtree r JOIN scooters s ON s.id = r.id "
+     "WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?", (51.9, 51.91, 4.4, 4.41)),
+]
+
+
+def check_query_plans(conn):
+    """Geeft per hot query (naam, plan, ok); ok is False bij een full table scan of temp sort."""
+    report = []
+    for name, sql, params in HOT_QUERIES:
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        ok = not any(
+            "USE TEMP B-TREE" in step
+            or (step.startswith("SCAN") and "INDEX" not in step and "VIRTUAL TABLE" not in step)
+            for step in plan
+        )
+        report.append((name, plan, ok))
+    return report
+
+
+if __name__ == "__main__":
+    import sqlite3
+    from .encryption import EncryptionManager
+
+    if len(sys.argv) < 2:
+        print("Gebruik: python -m database.migrations <database>")
+        sys.exit(1)
+
+    conn = sqlite3.connect(sys.argv[1])
+    applied = migrate(conn, EncryptionManager())
+    print(f"Schema versie {current_version(conn)} (toegepast: {applied or 'niets'})")
+    problems = 0
+    for name, plan, ok in check_query_plans(conn):
+        problems += not ok
+        print(f"{'✅' if ok else '❌'} {name}: {' / '.join(plan)}")
+    conn.close()
+    sys.exit(1 if problems else 0)
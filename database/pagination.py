@@ -0,0 +1,121 @@
+from config import PAGE_SIZE
+from .connection import get_pool
+
+
+class Page:
+    __slots__ = ('rows', 'first_key', 'last_key')
+
+    def __init__(self, rows, first_key, last_key):
+        self.rows = rows
+        self.first_key = first_key
+        self.last_key = last_key
+
+
+class KeysetPager:
+    """Bladert door een tabel met keyset paginering in plaats van OFFSET.
+
+    `order_by` is een lijst SQL expressies waarvan de laatste uniek moet zijn
+    (meestal `id`); de waarden van de laatste rij vormen de sleutel voor de
+    volgende pagina, zodat elke pagina een index seek is in plaats van een
+    volledige sortering van de tabel.
+    """
+
+    def __init__(self, db_name, table, columns, order_by, page_size=PAGE_SIZE, filters=None):
+        self.pool = get_pool(db_name)
+        self.table = table
+        self.columns = list(columns)
+        self.order_by = list(order_by)
+        self.page_size = page_size
+        # Lijst van (sql fragment, parameters), bijv. ("last_name LIKE ?", ("Jan%",))
+        self.filters = list(filters or [])
+
+    def _query(self, key, forward, limit):
+        where = [fragment for fragment, _ in self.filters]
+        params = [p for _, fragment_params in self.filters for p in fragment_params]
+
+        key_columns = ", ".join(self.order_by)
+        if key is not None:
+            placeholders = ", ".join("?" for _ in self.order_by)
+            # Losse grens op de eerste kolom laat SQLite ook bij expressie-indexen
+            # (bijv. COALESCE) een index seek doen in plaats van een scan
+            where.append(f"{self.order_by[0]} {'>=' if forward else '<='} ?")
+            where.append(f"({key_columns}) {'>' if forward else '<'} ({placeholders})")
+            params.append(key[0])
+            params.extend(key)
+
+        direction = "ASC" if forward else "DESC"
+        sql = f"SELECT {', '.join(self.columns + self.order_by)} FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column in self.order_by)
+        sql += " LIMIT ?"
+        params.append(limit)
+        return sql, params
+
+    def _fetch(self, key, forward):
+        sql, params = self._query(key, forward, self.page_size)
+        with self.pool.connection() as conn:
+            raw = conn.execute(sql, params).fetchall()
+        if not forward:
+            raw.reverse()
+
+        width = len(self.columns)
+        rows = [row[:width] for row in raw]
+        if not raw:
+            return Page(rows, key, key)
+        return Page(rows, tuple(raw[0][width:]), tuple(raw[-1][width:]))
+
+    def first_page(self):
+        return self._fetch(None, True)
+
+    def next_page(self, page):
+        return self._fetch(page.last_key, True)
+
+    def previous_page(self, page):
+        return self._fetch(page.first_key, False)
+
+    def iter_rows(self, batch_size=None):
+        """Streamt alle rijen in volgorde, batch voor batch."""
+        key = None
+        batch_size = batch_size or self.page_size
+        width = len(self.columns)
+        while True:
+            sql, params = self._query(key, True, batch_size)
+            with self.pool.connection() as conn:
+                raw = conn.execute(sql, params).fetchall()
+            if not raw:
+                return
+            for row in raw:
+                yield row[:width]
+            if len(raw) < batch_size:
+                return
+            key = tuple(raw[-1][width:])
+
+
+class ListPager:
+    """Zelfde interface als KeysetPager, maar over een lijst in het geheugen.
+
+    De sleutels van een Page zijn hier de begin- en eindpositie in de lijst.
+    """
+
+    def __init__(self, rows, page_size=PAGE_SIZE):
+        self.rows = list(rows)
+        self.page_size = page_size
+
+    def _slice(self, start):
+        end = min(start + self.page_size, len(self.rows))
+        return Page(self.rows[start:end], start, end)
+
+    def first_page(self):
+        return self._slice(0)
+
+    def next_page(self, page):
+        return self._slice(page.last_key)
+
+    def previous_page(self, page):
+        if page.first_key <= 0:
+            return Page([], 0, 0)
+        return self._slice(max(0, page.first_key - self.page_size))
+
+    def iter_rows(self, batch_size=None):
+        return iter(self.rows)
@@ -0,0 +1,171 @@
+"""Alleen-lezen replica van de database voor overzichten en rapportages.
+
+De replica is een eigen bestand (`<database>.replica`). De eerste keer, en
+na een migratie of restore van de primaire database, wordt het met de
+backup API volledig gekopieerd. Daarna wordt het bijgewerkt uit het
+wijzigingsjournaal als afnemer "replica". Lezers openen de replica met
+een `mode=ro` URI en houden zo geen leestransacties open op de primaire
+database, waardoor checkpoints en schrijvers daar niet op hoeven te wachten.
+
+`read_db()` geeft de URI van de replica terug zolang die niet ouder is dan
+REPLICA_MAX_STALENESS seconden, en anders de primaire database. Na
+`mark_dirty()` (een eigen schrijfactie) werkt de volgende `read_db()` de
+replica eerst bij, zodat een gebruiker zijn eigen wijziging terugziet.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import BUSY_TIMEOUT_MS, REPLICA_MAX_STALENESS, REPLICA_REFRESH_INTERVAL
+from .journal import REDACTED, REDACTED_COLUMNS, JournalConsumer, apply_change, drop_journal_triggers, last_seq, \
+    table_columns
+
+REPLICA_CONSUMER = "replica"
+
+REPLICA_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS replica_state (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    position INTEGER NOT NULL
+)
+"""
+
+
+class Replica:
+    def __init__(self, db_name, path=None, max_staleness=REPLICA_MAX_STALENESS,
+                 interval=REPLICA_REFRESH_INTERVAL):
+        self.db_name = str(db_name)
+        self.path = str(path or f"{self.db_name}.replica")
+        self.uri = Path(self.path).absolute().as_uri() + "?mode=ro"
+        self.max_staleness = max_staleness
+        self.interval = interval
+        self.synced_at = None
+        self.snapshots = 0
+        self.applied = 0
+        self._dirty = False
+        self._consumer = None
+        self._writer = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _open_writer(self):
+        writer = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        writer.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_MS)}")
+        writer.execute("PRAGMA journal_mode = WAL")
+        # De replica is altijd opnieuw op te bouwen; fsync per commit is niet nodig
+        writer.execute("PRAGMA synchronous = OFF")
+        return writer
+
+    def _position(self):
+        try:
+            row = self._writer.execute("SELECT position FROM replica_state WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def _snapshot(self, primary):
+        # Via de backup API in de bestaande replica: open lezers zien in één
+        # keer de nieuwe inhoud, net als bij restore_backup
+        primary.backup(self._writer)
+        drop_journal_triggers(self._writer)
+        # Net als de journaal afnemers geen wachtwoord hashes (ook niet in de kopie van het journaal)
+        for table, hidden in REDACTED_COLUMNS.items():
+            self._writer.execute(f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in hidden)}",
+                                 [REDACTED] * len(hidden))
+        self._writer.execute("DELETE FROM change_journal")
+        position = last_seq(self._writer)
+        self._writer.execute(REPLICA_STATE_SCHEMA)
+        self._writer.execute("INSERT OR REPLACE INTO replica_state (id, position) VALUES (1, ?)", (position,))
+        self._writer.commit()
+        self._consumer.seek(position)
+        self.snapshots += 1
+        logging.info(f"Replica {self.path} volledig gekopieerd (journaal tot {position})")
+
+    def _catch_up(self):
+        columns = table_columns(self._writer)
+        while True:
+            changes = self._consumer.poll()
+            if changes:
+                for change in changes:
+                    apply_change(self._writer, change, columns)
+                self.applied += len(changes)
+            self._writer.execute("UPDATE replica_state SET position = ? WHERE id = 1", (self._consumer.polled_to,))
+            self._writer.commit()
+            self._consumer.ack()
+            if len(changes) < self._consumer.batch_size:
+                return
+
+    def refresh(self):
+        """Brengt de replica bij tot de huidige stand van de primaire database."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = self._open_writer()
+                self._consumer = JournalConsumer(self.db_name, REPLICA_CONSUMER)
+            primary = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                schema = primary.execute("PRAGMA user_version").fetchone()[0]
+                current = self._writer.execute("PRAGMA user_version").fetchone()[0]
+                # Na een migratie of restore klopt het journaal niet meer met de replica
+                if schema != current or self._position() != self._consumer.position:
+                    self._snapshot(primary)
+                else:
+                    self._catch_up()
+            except Exception:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                raise
+            finally:
+                primary.close()
+            self.synced_at = time.monotonic()
+
+    def staleness(self):
+        """Seconden sinds de replica voor het laatst bij was; None als dat nog nooit zo was."""
+        if self.synced_at is None:
+            return None
+        return time.monotonic() - self.synced_at
+
+    def mark_dirty(self):
+        """Er is (of wordt) geschreven: de volgende read_db() werkt de replica eerst bij."""
+        self._dirty = True
+
+    def read_db(self):
+        """URI van de replica, of de primaire database als de replica te oud is."""
+        staleness = self.staleness()
+        if self._dirty or staleness is None or staleness > self.max_staleness:
+            # Vóór de refresh wissen: een nieuwe mark_dirty() tijdens de refresh blijft staan
+            self._dirty = False
+            try:
+                self.refresh()
+            except Exception as e:
+                self._dirty = True
+                logging.error(f"Replica bijwerken mislukt, lezen van de primaire database: {e}")
+                return self.db_name
+        return self.uri
+
+    def start(self):
+        """Werkt de replica elke `interval` seconden bij op een achtergrondthread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Replica bijwerken mislukt: {e}")
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
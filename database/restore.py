@@ -0,0 +1,168 @@
+"""Backups terugzetten zonder het live bestand te overschrijven.
+
+1. De backup wordt met de backup API naar een staging bestand gekopieerd.
+2. integrity_check/quick_check draait op de staging kopie.
+3. De staging kopie wordt naar het laatste schema gemigreerd.
+4. Optioneel worden de wijzigingen uit het journaal van de live database
+   tot een gekozen tijdstip opnieuw toegepast (point-in-time restore).
+5. Na een veiligheidsbackup van de live database wordt de staging kopie
+   in één transactie via de backup API in de live database gezet.
+
+Stap 5 vervangt bewust niet het bestand zelf (os.replace): andere
+verbindingen en het WAL bestand horen bij het oude bestand. Via de backup
+API zien open verbindingen gewoon de nieuwe inhoud.
+"""
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+from config import BUSY_TIMEOUT_MS, RESTORE_INTEGRITY_CHECK
+from .backup import create_backup
+from .journal import has_journal, last_seq, replay, to_journal_time
+from .migrations import migrate
+
+BACKUP_TIMESTAMP = re.compile(r"\.backup_(\d{8}_\d{6})(?:_(\d+))?$")
+
+
+class RestoreError(Exception):
+    pass
+
+
+class RestoreResult:
+    __slots__ = ('backup', 'until', 'replayed', 'last_seq', 'safety_backup', 'phases')
+
+    def __init__(self, backup, until):
+        self.backup = backup
+        self.until = until
+        self.replayed = 0
+        self.last_seq = 0
+        self.safety_backup = None
+        self.phases = []
+
+    @property
+    def seconds(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def __repr__(self):
+        return (f"RestoreResult(backup={self.backup}, until={self.until}, replayed={self.replayed}, "
+                f"seconds={self.seconds:.2f})")
+
+
+def list_backups(db_name, backup_dir):
+    """[(pad, tijdstip), ...] van de backups van `db_name`, nieuwste eerst."""
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = os.path.basename(str(db_name)) + ".backup_"
+    backups = []
+    for name in os.listdir(backup_dir):
+        match = BACKUP_TIMESTAMP.search(name)
+        if name.startswith(prefix) and match:
+            taken_at = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+            backups.append((int(match.group(2) or 1), os.path.join(backup_dir, name), taken_at))
+    backups.sort(key=lambda item: (item[2], item[0]), reverse=True)
+    return [(path, taken_at) for _, path, taken_at in backups]
+
+
+def verify_database(conn, mode=RESTORE_INTEGRITY_CHECK):
+    """quick_check ("quick") of integrity_check ("full"); RestoreError als het niet "ok" is."""
+    pragma = "integrity_check" if mode == "full" else "quick_check"
+    problems = [row[0] for row in conn.execute(f"PRAGMA {pragma}")]
+    if problems != ["ok"]:
+        raise RestoreError(f"{pragma} mislukt: {'; '.join(problems[:5])}")
+
+
+def _remove(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _check_journal(live, backup_seq, until_ts, backup_ts):
+    if backup_ts and until_ts < backup_ts:
+        raise RestoreError("Het gekozen tijdstip ligt vóór deze backup; kies een oudere backup")
+    if not has_journal(live):
+        raise RestoreError("De live database heeft geen wijzigingsjournaal")
+    first = live.execute("SELECT MIN(seq) FROM change_journal WHERE seq > ?", (backup_seq,)).fetchone()[0]
+    if first is not None and first != backup_seq + 1:
+        raise RestoreError("Het journaal sluit niet aan op de backup (records ontbreken)")
+    if last_seq(live) < backup_seq:
+        raise RestoreError("Het journaal van de live database is ouder dan de backup")
+
+
+def restore_backup(db_name, backup_file, until=None, encryption=None, safety_dir=None,
+                   check=RESTORE_INTEGRITY_CHECK):
+    """Zet `backup_file` terug in `db_name`.
+
+    Met `until` (datetime) worden de wijzigingen uit het journaal van de
+    live database tot dat moment opnieuw toegepast; zonder `until` wordt
+    het precies de stand van de backup. Met `safety_dir` wordt eerst een
+    backup van de huidige live database gemaakt.
+    """
+    db_name = str(db_name)
+    result = RestoreResult(backup_file, until)
+    staging_file = f"{db_name}.restore-staging"
+    _remove(staging_file)
+
+    def phase(name, started):
+        result.phases.append((name, time.perf_counter() - started))
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    if not os.path.exists(backup_file):
+        raise RestoreError(f"Backup niet gevonden: {backup_file}")
+    staging = sqlite3.connect(staging_file)
+    try:
+        source = sqlite3.connect(backup_file)
+        try:
+            source.backup(staging)
+        finally:
+            source.close()
+        started = phase("kopiëren", started)
+
+        verify_database(staging, check)
+        journaled = has_journal(staging)
+        started = phase("controle", started)
+
+        migrate(staging, encryption)
+        started = phase("migreren", started)
+
+        if until is not None:
+            if not journaled:
+                raise RestoreError("Deze backup heeft nog geen wijzigingsjournaal; "
+                                   "alleen terugzetten zonder tijdstip is mogelijk")
+            until_ts = to_journal_time(until)
+            backup_seq = last_seq(staging)
+            backup_ts = staging.execute("SELECT MAX(ts) FROM change_journal").fetchone()[0]
+            live = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                _check_journal(live, backup_seq, until_ts, backup_ts)
+                staging.execute("BEGIN IMMEDIATE")
+                result.replayed, result.last_seq = replay(live, staging, backup_seq, until_ts)
+                staging.commit()
+            finally:
+                live.close()
+            verify_database(staging, "quick")
+            started = phase("journaal", started)
+
+        if safety_dir:
+            result.safety_backup = create_backup(db_name, safety_dir)
+            started = phase("veiligheidsbackup", started)
+
+        # Eén schrijftransactie op de live database: lezers zien de oude of de nieuwe inhoud
+        live = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            live.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_MS)}")
+            staging.backup(live)
+        finally:
+            live.close()
+        phase("wisselen", started)
+    finally:
+        staging.close()
+        _remove(staging_file)
+
+    logging.info(f"Database {db_name} hersteld: {result} "
+                 f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in result.phases)})")
+    return result
@@ -1,156 +1,280 @@
+from utils.startup import StartupTimer
+
+startup = StartupTimer()
+
 import sqlite3
-import bcrypt
 import getpass
-from cryptography.fernet import Fernet
 import os
 import logging
+import sys
 from datetime import datetime
-import shutil
 import re
 
+from config import BCRYPT_ROUNDS, RESTORE_CODE_TTL_HOURS, REPLICA_ENABLED
+from database.connection import get_pool, close_all_pools
+from database.backup import create_backup
+from database.encryption import EncryptionManager, is_token
+from database.blind_index import blind_index_values, find_ids, exists
+from database.migrations import migrate, schema_is_current
+from database.pagination import KeysetPager, ListPager
+from database.journal import acting_as
+from database.replica import Replica
+from database.restore import RestoreError, list_backups, restore_backup
+from restore import RestoreManager
+from management.locations import ScooterLocator
+from management.search import TravellerSearch
+from management.fleet import get_fleet_cache, close_fleet_caches
+from management.scooters import ScooterManager
+from management.write_behind import get_scooter_writer, flush_scooter_writer, close_scooter_writers
+from management.maintenance import MaintenancePlanner
+
+# Zware modules (bcrypt, cryptography, asyncio, NumPy) worden pas bij het
+# eerste gebruik geïmporteerd
+
 DB_NAME = "scooter_management.db"
 BACKUP_DIR = "backups"
 LOG_FILE = "app.log"
 
+# 🗄️ Gedeelde connectie pool
+def get_connection():
+    return get_pool(DB_NAME).acquire()
+
+def release_connection(conn):
+    get_pool(DB_NAME).release(conn)
+
+# 🧾 Wijzigingen in het journaal (en de audit log) op naam van de ingelogde gebruiker
+_current_user = None
+_current_username = None
+
+def journaled(conn):
+    wrote()
+    return acting_as(conn, _current_user)
+
+def wrote():
+    # Eigen schrijfactie: het volgende overzicht van de replica toont hem al
+    if _replica is not None:
+        _replica.mark_dirty()
+
+# 🛵 Vlootstatus in het geheugen (write-through, herlaadt bij externe wijzigingen)
+def get_fleet():
+    # Wachtende scooter updates eerst committen: de cache toont dan de eigen wijzigingen
+    flush_scooter_writer(DB_NAME)
+    return get_fleet_cache(DB_NAME)
+
+# 📖 Overzichten en rapportages lezen van de alleen-lezen replica
+_replica = None
+
+def read_db():
+    global _replica
+    if not REPLICA_ENABLED:
+        return DB_NAME
+    if _replica is None:
+        _replica = Replica(DB_NAME)
+        _replica.start()
+    flush_scooter_writer(DB_NAME)
+    return _replica.read_db()
+
+# 🔧 Onderhoudsplanning (heap, bijgewerkt via de vlootcache)
+_planner = None
+
+def get_planner():
+    global _planner
+    if _planner is None:
+        _planner = MaintenancePlanner(get_fleet())
+    return _planner
+
 # 🔐 Wachtwoord hashen
 def hash_password(password):
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    import bcrypt
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS))
 
 def verify_password(password, hashed):
+    import bcrypt
     return bcrypt.checkpw(password.encode(), hashed)
 
-# 🔑 Fernet sleutel laden
-def load_key():
-    if not os.path.exists("secret.key"):
-        key = Fernet.generate_key()
-        with open("secret.key", "wb") as key_file:
-            key_file.write(key)
-    else:
-        with open("secret.key", "rb") as key_file:
-            key = key_file.read()
-    return key
+# 🔐 Authenticatie service (bcrypt buiten de hoofdthread)
+_auth_service = None
+
+def get_auth_service():
+    global _auth_service
+    if _auth_service is None:
+        from auth.service import AuthService
+        _auth_service = AuthService(DB_NAME)
+    return _auth_service
 
-fernet = Fernet(load_key())
+# 🔑 Fernet sleutel pas laden bij het eerste gebruik
+_encryption = None
+
+def get_encryption():
+    global _encryption
+    if _encryption is None:
+        _encryption = EncryptionManager()
+    return _encryption
+
+# 📝 Versleutelde audit log (schrijft op een achtergrondthread)
+_audit_logger = None
+
+def audit(action, username, description, suspicious=False):
+    global _audit_logger
+    if _audit_logger is None:
+        from utils.logging import SecureLogger
+        _audit_logger = SecureLogger(get_encryption().key)
+    _audit_logger.log(action, username, description, suspicious)
 
 # 🔓 Gegevens decrypten
 def decrypt_data(encrypted_data):
     if not encrypted_data:
         return ""
     try:
-        return fernet.decrypt(encrypted_data.encode()).decode()
+        return get_encryption().decrypt(encrypted_data)
     except Exception as e:
         logging.error(f"Decryptie fout: {e}")
         return "⚠️ Ongeldig"
 
+def decrypt_rows(rows, columns):
+    # Ontsleutel de versleutelde kolommen van een hele pagina in één batch;
+    # oude plaintext waarden blijven ongewijzigd
+    tokens = [row[c] for row in rows for c in columns if is_token(row[c])]
+    if not tokens:
+        return rows
+    plain = dict(zip(tokens, get_encryption().decrypt_many(tokens, default="⚠️ Ongeldig")))
+    return [
+        tuple(plain.get(value, value) if index in columns else value for index, value in enumerate(row))
+        for row in rows
+    ]
+
 
 # 🛠️ Database initialiseren
 def initialize_database():
+    """Brengt het schema op de laatste versie; geeft False bij een warme start."""
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
-    
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
 
-    # USERS TABEL
-    cursor.execute("SELECT id FROM users WHERE username = 'super_admin'")
-    if not cursor.fetchone():
-        password_hash = hash_password("Admin_123?").decode()
-        cursor.execute("""
-            INSERT INTO users (username, password_hash, role, first_name, last_name)
-            VALUES (?, ?, ?, ?, ?)
-        """, ("super_admin", password_hash, "superadmin", "Super", "Admin")) 
-
-    # TRAVELLERS TABEL
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS travellers (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        first_name TEXT NOT NULL,
-        last_name TEXT NOT NULL,
-        birthday TEXT,
-        gender TEXT,
-        street_name TEXT,
-        house_number TEXT,
-        zip_code TEXT,
-        city TEXT,
-        email TEXT,
-        license_number TEXT UNIQUE CHECK(length(license_number) = 10),
-        phone_number TEXT CHECK(length(phone_number) BETWEEN 10 AND 15),
-        registration_date TEXT DEFAULT CURRENT_TIMESTAMP
-    );
-    """)
-
-    # SCOOTERS TABEL
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS scooters (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        brand TEXT NOT NULL,
-        model TEXT NOT NULL,
-        serial_number TEXT UNIQUE NOT NULL CHECK(length(serial_number) <= 17),
-        top_speed INTEGER CHECK(top_speed BETWEEN 0 AND 100),
-        battery_capacity INTEGER CHECK(battery_capacity BETWEEN 0 AND 100),
-        soc INTEGER CHECK(soc BETWEEN 0 AND 100),
-        target_range_min INTEGER,
-        target_range_max INTEGER,
-        latitude REAL CHECK(latitude BETWEEN -90 AND 90),
-        longitude REAL CHECK(longitude BETWEEN -180 AND 180),
-        out_of_service INTEGER CHECK(out_of_service IN (0, 1)) DEFAULT 0,
-        mileage INTEGER CHECK(mileage >= 0),
-        last_maintenance TEXT,
-        in_service_date TEXT DEFAULT CURRENT_TIMESTAMP,
-        last_updated TEXT
-    );
-    """)
-
-    # Maak superadmin aan als die nog niet bestaat
-    cursor.execute("SELECT id FROM users WHERE username = 'super_admin'")  # Aangepast van 'superadmin'
-    if not cursor.fetchone():
-        password_hash = hash_password("Admin_123?").decode()  # Aangepast van 'admin123'
-        cursor.execute("""
-            INSERT INTO users (username, password_hash, role)
-            VALUES (?, ?, ?)
-        """, ("super_admin", password_hash, "superadmin"))
+    with get_pool(DB_NAME).connection() as conn:
+        # Warme start: PRAGMA user_version staat al op de laatste schemaversie,
+        # dus geen migraties, geen sleutel en geen bcrypt nodig
+        if schema_is_current(conn):
+            return False
 
-    conn.commit()
-    conn.close()
+        # Schema, indexen en de superadmin via de versioned migraties
+        applied = migrate(conn, get_encryption())
+        if applied:
+            logging.info(f"Migraties toegepast: {applied}")
     logging.info("Database geïnitialiseerd")
+    return True
 
 # 📂 Backup maken
 def backup_database():
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(BACKUP_DIR, f"{DB_NAME}.backup_{timestamp}")
-    shutil.copy2(DB_NAME, backup_file)
-    logging.info(f"Backup gemaakt: {backup_file}")
-    print(f"\n✅ Backup gemaakt: {backup_file}")
+    def show_progress(copied, total):
+        percentage = int(copied * 100 / total) if total else 100
+        print(f"\r⏳ Backup bezig: {percentage}% ({copied}/{total} pagina's)", end="", flush=True)
+
+    try:
+        # Wachtende scooter updates horen in de backup
+        flush_scooter_writer(DB_NAME)
+        backup_file = create_backup(DB_NAME, BACKUP_DIR, progress=show_progress)
+        print(f"\n✅ Backup gemaakt: {backup_file}")
+    except Exception as e:
+        logging.error(f"Backup fout: {e}")
+        print("\n❌ Fout bij maken backup")
 
 # 🔄 Restore database
-def restore_database():
-    if not os.path.exists(BACKUP_DIR):
-        print("Geen backups beschikbaar")
-        return
-    
-    backups = [f for f in os.listdir(BACKUP_DIR) if f.startswith(DB_NAME)]
+def choose_backup():
+    backups = list_backups(DB_NAME, BACKUP_DIR)
     if not backups:
         print("Geen backups beschikbaar")
-        return
-    
+        return None
+
     print("\nBeschikbare backups:")
-    for i, backup in enumerate(backups, 1):
-        print(f"{i}. {backup}")
-    
+    for i, (path, taken_at) in enumerate(backups, 1):
+        print(f"{i}. {os.path.basename(path)} ({taken_at:%d-%m-%Y %H:%M:%S})")
     try:
-        choice = int(input("Kies backup om te restoren (0 om te annuleren): "))
+        choice = int(input("Kies backup (0 om te annuleren): "))
         if choice == 0:
-            return
-        
-        selected_backup = os.path.join(BACKUP_DIR, backups[choice-1])
-        shutil.copy2(selected_backup, DB_NAME)
-        print(f"\n✅ Database hersteld van {selected_backup}")
-        logging.info(f"Database hersteld van {selected_backup}")
+            return None
+        if choice < 1:
+            raise IndexError
+        return backups[choice - 1][0]
     except (ValueError, IndexError):
         print("Ongeldige keuze")
+        return None
+
+def restore_database(user_id, role):
+    if role == "superadmin":
+        selected_backup = choose_backup()
+        if not selected_backup:
+            return
+    else:
+        # Systeembeheerders hebben een eenmalige code van de superadmin nodig
+        code = input("Restore code: ").strip()
+        selected_backup = RestoreManager().validate_code(code, user_id)
+        if not selected_backup:
+            print("\n❌ Ongeldige of verlopen restore code")
+            audit("Restore geweigerd", _current_username, "Ongeldige restore code", suspicious=True)
+            return
+        print(f"Backup: {os.path.basename(selected_backup)}")
+
+    print("\nTot welk moment herstellen?")
+    print("Leeg = precies de stand van de backup")
+    print("'nu' = backup plus alle wijzigingen daarna (uit het journaal)")
+    print("Of een tijdstip: DD-MM-YYYY HH:MM[:SS]")
+    moment = input("Tijdstip: ").strip().lower()
+    try:
+        if not moment:
+            until = None
+        elif moment == "nu":
+            until = datetime.now()
+        else:
+            fmt = "%d-%m-%Y %H:%M:%S" if moment.count(":") == 2 else "%d-%m-%Y %H:%M"
+            until = datetime.strptime(moment, fmt)
+    except ValueError:
+        print("\n❌ Ongeldig tijdstip")
+        return
+
+    if input("De huidige database wordt vervangen. Doorgaan? (j/n): ").strip().lower() != "j":
+        return
+
+    try:
+        # Wachtende updates niet ná de restore over de teruggezette stand heen schrijven
+        flush_scooter_writer(DB_NAME)
+        wrote()
+        result = restore_backup(DB_NAME, selected_backup, until=until,
+                                encryption=get_encryption(), safety_dir=BACKUP_DIR)
+    except RestoreError as e:
+        print(f"\n❌ Restore afgebroken: {e}")
+        logging.warning(f"Restore van {selected_backup} afgebroken: {e}")
+        return
+    except Exception as e:
+        print("\n❌ Fout bij terugzetten backup; de database is niet gewijzigd")
+        logging.error(f"Restore fout: {e}")
+        return
+
+    if role != "superadmin":
+        # De code pas na een geslaagde restore gebruiken; een mislukte poging kost hem niet
+        RestoreManager().consume_code(code, user_id)
+
+    print(f"\n✅ Database hersteld van {os.path.basename(selected_backup)} in {result.seconds:.1f}s")
+    if until is not None:
+        print(f"   {result.replayed} wijzigingen opnieuw toegepast tot {until:%d-%m-%Y %H:%M:%S}")
+    print(f"   Vorige stand bewaard in {result.safety_backup}")
+    audit("Backup teruggezet", _current_username,
+          f"{os.path.basename(selected_backup)} tot {until or 'backup'} ({result.replayed} wijzigingen)")
+
+def create_restore_code():
+    selected_backup = choose_backup()
+    if not selected_backup:
+        return
+    username = input("Gebruikersnaam van de systeembeheerder: ").strip()
+    with get_pool(DB_NAME).connection() as conn:
+        admin = conn.execute("SELECT id FROM users WHERE username = ? AND role = 'sysadmin'",
+                             (username,)).fetchone()
+    if not admin:
+        print("\n❌ Systeembeheerder niet gevonden")
+        return
+    code = RestoreManager().generate_code(selected_backup, admin[0])
+    print(f"\n✅ Restore code voor {username}: {code}")
+    print(f"   Eenmalig te gebruiken, {RESTORE_CODE_TTL_HOURS} uur geldig")
+    audit("Restore code aangemaakt", _current_username, f"{os.path.basename(selected_backup)} voor {username}")
 
 # 👥 Travellers registreren
 def register_traveller():
@@ -206,18 +330,26 @@ def register_traveller():
         print("Moet precies 10 cijfers zijn")
 
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO travellers (
+        if exists(conn, get_encryption(), "travellers", "license_number", license_number):
+            print("\n❌ Fout: Rijbewijsnummer bestaat al")
+            return
+
+        bidx = blind_index_values(get_encryption(), "travellers", {"email": email, "license_number": license_number})
+        with journaled(conn):
+            cursor.execute("""
+                INSERT INTO travellers (
+                    first_name, last_name, birthday, gender, street_name, house_number,
+                    zip_code, city, email, license_number, phone_number,
+                    email_bidx, license_number_bidx
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
                 first_name, last_name, birthday, gender, street_name, house_number,
-                zip_code, city, email, license_number, phone_number
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            first_name, last_name, birthday, gender, street_name, house_number,
-            zip_code, city, email, license_number, phone_number
-        ))
+                zip_code, city, email, license_number, phone_number,
+                bidx["email_bidx"], bidx["license_number_bidx"]
+            ))
         
         conn.commit()
         print("\n✅ Traveller succesvol geregistreerd")
@@ -226,31 +358,117 @@ def register_traveller():
     except Exception as e:
         print(f"\n❌ Er ging iets mis: {str(e)}")
     finally:
-        conn.close()
+        release_connection(conn)
+
+# 📄 Pagina voor pagina bladeren
+def browse(pager, header, width, format_row, prepare_rows=None):
+    page = pager.first_page()
+    if not page.rows:
+        print("\nGeen resultaten gevonden")
+        return
+
+    while True:
+        rows = prepare_rows(page.rows) if prepare_rows else page.rows
+        print(f"\n{header}")
+        print("-" * width)
+        for row in rows:
+            print(format_row(row))
+
+        nav = input("\n[n] volgende pagina, [v] vorige pagina, [Enter] stoppen: ").strip().lower()
+        if nav == "n":
+            next_page = pager.next_page(page)
+            if next_page.rows:
+                page = next_page
+            else:
+                print("\nDit is de laatste pagina")
+        elif nav == "v":
+            previous_page = pager.previous_page(page)
+            if previous_page.rows:
+                page = previous_page
+            else:
+                print("\nDit is de eerste pagina")
+        else:
+            break
+
+def prefix_filter(column, label):
+    value = input(f"Filter op {label} (leeg = alles): ").strip()
+    if not value:
+        return []
+    return [(f"{column} LIKE ?", (value + "%",))]
 
 # 👥 Travellers bekijken
 def view_travellers():
     print("\n=== Travellers Overzicht ===")
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
+        pager = KeysetPager(
+            read_db(), "travellers",
+            ["id", "first_name", "last_name", "email", "phone_number", "registration_date"],
+            ["last_name", "id"],
+            filters=prefix_filter("last_name", "achternaam"),
+        )
+        browse(
+            pager, "ID | Naam | E-mail | Telefoon | Registratiedatum", 80,
+            lambda traveller: f"{traveller[0]} | {traveller[1]} {traveller[2]} | {traveller[3]} | {traveller[4]} | {traveller[5]}",
+            prepare_rows=lambda rows: decrypt_rows(rows, (3, 4)),
+        )
+    except Exception as e:
+        logging.error(f"Travellers ophalen fout: {e}")
+        print("\n❌ Fout bij ophalen travellers")
 
-        cursor.execute("""
-            SELECT id, first_name, last_name, email, phone_number, registration_date 
-            FROM travellers ORDER BY last_name
-        """)
-        travellers = cursor.fetchall()
+# 🔎 Traveller zoeken via blind index
+def find_traveller():
+    print("\n=== Traveller Zoeken ===")
+    value = input("Rijbewijsnummer of e-mail: ").strip()
+    if not value:
+        return
+    field = "email" if "@" in value else "license_number"
+
+    try:
+        conn = get_connection()
+        ids = find_ids(conn, get_encryption(), "travellers", field, value)
+        if not ids:
+            print("\nGeen traveller gevonden")
+            return
+
+        placeholders = ", ".join("?" for _ in ids)
+        rows = conn.execute(f"""
+            SELECT id, first_name, last_name, email, phone_number, registration_date
+            FROM travellers WHERE id IN ({placeholders})
+        """, ids).fetchall()
 
         print("\nID | Naam | E-mail | Telefoon | Registratiedatum")
         print("-" * 80)
-        for traveller in travellers:
+        for traveller in decrypt_rows(rows, (3, 4)):
             print(f"{traveller[0]} | {traveller[1]} {traveller[2]} | {traveller[3]} | {traveller[4]} | {traveller[5]}")
-
     except Exception as e:
-        logging.error(f"Travellers ophalen fout: {e}")
-        print("\n❌ Fout bij ophalen travellers")
+        logging.error(f"Traveller zoeken fout: {e}")
+        print("\n❌ Fout bij zoeken traveller")
     finally:
-        conn.close()
+        release_connection(conn)
+
+# 🔎 Traveller zoeken op naam of adres
+def search_travellers():
+    print("\n=== Traveller Zoeken op Naam of Adres ===")
+    query = input("Zoekterm (naam, straat, postcode of woonplaats): ").strip()
+    if not query:
+        return
+
+    try:
+        rows, fuzzy = TravellerSearch(read_db()).search(query)
+        if not rows:
+            print("\nGeen traveller gevonden")
+            return
+        if fuzzy:
+            print("\nGeen exacte match, bedoelde u:")
+
+        print("\nID | Naam | Adres | E-mail | Telefoon")
+        print("-" * 100)
+        for traveller in decrypt_rows(rows, (7, 8)):
+            print(f"{traveller[0]} | {traveller[1]} {traveller[2]} | {traveller[3]} {traveller[4]}, "
+                  f"{traveller[5]} {traveller[6]} | {traveller[7]} | {traveller[8]}")
+    except Exception as e:
+        logging.error(f"Traveller zoeken fout: {e}")
+        print("\n❌ Fout bij zoeken traveller")
 
 def edit_traveller():
     print("\n=== Traveller Bewerken ===")
@@ -261,7 +479,7 @@ def edit_traveller():
         return
     
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM travellers WHERE id = ?", (traveller_id,))
         traveller = cursor.fetchone()
@@ -295,17 +513,33 @@ def edit_traveller():
             print("Ongeldig telefoonnummer")
             return
             
-        fields = ["", "first_name", "last_name", "", "", "", "", "", "", "license_number", "phone_number"]
-        field_name = fields[int(field)]
-        
-        cursor.execute(f"UPDATE travellers SET {field_name} = ? WHERE id = ?", (new_value, traveller_id))
+        fields = {"1": "first_name", "2": "last_name", "3": "license_number", "4": "phone_number"}
+        field_name = fields[field]
+
+        if field == "3":
+            if exists(conn, get_encryption(), "travellers", "license_number", new_value, exclude_id=traveller[0]):
+                print("❌ Rijbewijsnummer bestaat al")
+                return
+            with journaled(conn):
+                cursor.execute(
+                    "UPDATE travellers SET license_number = ?, license_number_bidx = ? WHERE id = ?",
+                    (new_value, get_encryption().blind_index("license_number", new_value), traveller_id)
+                )
+        else:
+            with journaled(conn):
+                cursor.execute(f"UPDATE travellers SET {field_name} = ? WHERE id = ?", (new_value, traveller_id))
         conn.commit()
+        # Oude ontsleutelde waarde niet langer in de cache bewaren
+        if field == "3":
+            get_encryption().invalidate(traveller[10])
+        elif field == "4":
+            get_encryption().invalidate(traveller[11])
         print("✅ Traveller bijgewerkt")
         
     except Exception as e:
         print(f"❌ Fout: {str(e)}")
     finally:
-        conn.close()
+        release_connection(conn)
 
 def delete_traveller():
     print("\n=== Traveller Verwijderen ===")
@@ -320,15 +554,16 @@ def delete_traveller():
         return
     
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM travellers WHERE id = ?", (traveller_id,))
+        with journaled(conn):
+            cursor.execute("DELETE FROM travellers WHERE id = ?", (traveller_id,))
         conn.commit()
         print("✅ Traveller verwijderd")
     except Exception as e:
         print(f"❌ Fout: {str(e)}")
     finally:
-        conn.close()
+        release_connection(conn)
 # 🛵 Scooter toevoegen
 def add_scooter():
     print("\n=== Nieuwe Scooter Toevoegen ===")
@@ -349,24 +584,18 @@ def add_scooter():
     soc = input("State of Charge (%, leeg laten indien onbekend): ")
     
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO scooters (
-                brand, model, serial_number, top_speed, battery_capacity, soc,
-                in_service_date, last_updated
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            brand, model, serial_number, 
-            int(top_speed) if top_speed else None,
-            int(battery_capacity) if battery_capacity else None,
-            int(soc) if soc else None,
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ))
-        
-        conn.commit()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        wrote()
+        get_fleet().add({
+            "brand": brand,
+            "model": model,
+            "serial_number": serial_number,
+            "top_speed": int(top_speed) if top_speed else None,
+            "battery_capacity": int(battery_capacity) if battery_capacity else None,
+            "soc": int(soc) if soc else None,
+            "in_service_date": now,
+            "last_updated": now,
+        }, actor=_current_user)
         print("\n✅ Scooter succesvol toegevoegd")
         logging.info(f"Nieuwe scooter toegevoegd: {brand} {model} ({serial_number})")
     except sqlite3.IntegrityError:
@@ -378,8 +607,6 @@ def add_scooter():
     except Exception as e:
         print("\n❌ Er ging iets mis bij het toevoegen")
         logging.error(f"Scooter toevoegen fout: {e}")
-    finally:
-        conn.close()
 
 # 🛵 Scooter bewerken
 def edit_scooter(role):
@@ -387,26 +614,22 @@ def edit_scooter(role):
     scooter_id = input("Scooter ID om te bewerken: ")
     
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-
-        # Haal huidige gegevens op
-        cursor.execute("SELECT * FROM scooters WHERE id = ?", (scooter_id,))
-        scooter = cursor.fetchone()
+        # Huidige gegevens uit de vlootcache
+        scooter = get_fleet().get(scooter_id)
         
         if not scooter:
             print("\n❌ Scooter niet gevonden")
             return
         
         print("\nHuidige gegevens:")
-        print(f"Merk: {scooter[1]}")
-        print(f"Model: {scooter[2]}")
-        print(f"Serienummer: {scooter[3]}")
-        print(f"Top snelheid: {scooter[4]}")
-        print(f"Batterij capaciteit: {scooter[5]}%")
-        print(f"State of Charge: {scooter[6]}%")
-        print(f"Kilometerstand: {scooter[12]}")
-        print(f"Status: {'Buiten gebruik' if scooter[10] else 'In gebruik'}")
+        print(f"Merk: {scooter.brand}")
+        print(f"Model: {scooter.model}")
+        print(f"Serienummer: {scooter.serial_number}")
+        print(f"Top snelheid: {scooter.top_speed}")
+        print(f"Batterij capaciteit: {scooter.battery_capacity}%")
+        print(f"State of Charge: {scooter.soc}%")
+        print(f"Kilometerstand: {scooter.mileage}")
+        print(f"Status: {'Buiten gebruik' if scooter.out_of_service else 'In gebruik'}")
 
         # Velden die kunnen worden bewerkt
         if role in ['superadmin', 'sysadmin']:
@@ -454,39 +677,45 @@ def edit_scooter(role):
             print("\n❌ Ongeldige keuze")
             return
         
-        # Update uitvoeren
-        cursor.execute(f"""
-            UPDATE scooters 
-            SET {field_name} = ?, last_updated = ?
-            WHERE id = ?
-        """, (
-            new_value,
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            scooter_id
-        ))
-        
-        conn.commit()
+        # Zelfde validatie als elke scooter update; daarna via de write-behind
+        # wachtrij (group commit), die de vlootcache per scooter bijwerkt
+        wrote()
+        with get_pool(DB_NAME).connection() as conn:
+            manager = ScooterManager(conn, writer=get_scooter_writer(DB_NAME))
+            found = manager.update_scooter(scooter.id, {field_name: new_value.strip()}, role, actor=_current_user)
+        if not found:
+            print("\n❌ Scooter niet gevonden")
+            return
         print("\n✅ Scooter succesvol bijgewerkt")
         logging.info(f"Scooter {scooter_id} bijgewerkt: {field_name}={new_value}")
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        logging.warning(f"Scooter bewerken: {e}")
     except Exception as e:
         print("\n❌ Fout bij bewerken scooter")
         logging.error(f"Scooter bewerken fout: {e}")
-    finally:
-        conn.close()
 
 # 🛵 Scooter locaties bekijken
 def view_scooter_locations():
     print("\n=== Scooter Locaties ===")
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
+    print("1. Alle scooters")
+    print("2. Scooters in gebied")
+    print("3. Dichtstbijzijnde scooters")
+    print("4. Beschikbare scooters binnen straal")
+    choice = input("\nKeuze (Enter = alle scooters): ").strip() or "1"
+
+    if choice != "1":
+        search_scooter_locations(choice)
+        return
 
-        cursor.execute("""
-            SELECT id, brand, model, latitude, longitude, soc 
-            FROM scooters 
-            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
-        """)
-        scooters = cursor.fetchall()
+    try:
+        scooters = [
+            state.values(("id", "brand", "model", "latitude", "longitude", "soc"))
+            for state in get_fleet().scooters(
+                lambda s: s.latitude is not None and s.longitude is not None,
+                key=lambda s: s.id,
+            )
+        ]
 
         if not scooters:
             print("\nGeen scooters met locatiegegevens gevonden")
@@ -500,37 +729,184 @@ def view_scooter_locations():
     except Exception as e:
         logging.error(f"Scooter locaties ophalen fout: {e}")
         print("\n❌ Fout bij ophalen locaties")
-    finally:
-        conn.close()
+
+def search_scooter_locations(choice):
+    locator = ScooterLocator(read_db())
+    try:
+        if choice == "2":
+            min_lat = float(input("Minimale latitude: "))
+            min_lon = float(input("Minimale longitude: "))
+            max_lat = float(input("Maximale latitude: "))
+            max_lon = float(input("Maximale longitude: "))
+            results = [(None, row) for row in locator.in_box(min_lat, min_lon, max_lat, max_lon)]
+        elif choice in ("3", "4"):
+            lat = float(input("Latitude: "))
+            lon = float(input("Longitude: "))
+            if choice == "3":
+                count = int(input("Aantal scooters (standaard 10): ") or 10)
+                results = locator.nearest(lat, lon, count)
+            else:
+                radius = float(input("Straal in meters: "))
+                min_soc = int(input("Minimale SOC % (standaard 0): ") or 0)
+                results = locator.available_within_radius(lat, lon, radius, min_soc)
+        else:
+            print("\n❌ Ongeldige keuze")
+            return
+    except ValueError:
+        print("\n❌ Ongeldige numerieke waarde")
+        return
+    except Exception as e:
+        logging.error(f"Scooter locaties zoeken fout: {e}")
+        print("\n❌ Fout bij zoeken locaties")
+        return
+
+    if not results:
+        print("\nGeen scooters gevonden")
+        return
+
+    print("\nID | Merk | Model | Locatie | SOC | Afstand")
+    print("-" * 70)
+    for distance, scooter in results:
+        afstand = f"{distance:.0f} m" if distance is not None else "-"
+        print(f"{scooter[0]} | {scooter[1]} | {scooter[2]} | ({scooter[3]}, {scooter[4]}) | {scooter[5]}% | {afstand}")
 
 # 🛵 Scooter onderhoud bekijken
 def view_scooter_maintenance():
     print("\n=== Scooter Onderhoud ===")
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT id, brand, model, last_maintenance, mileage, out_of_service 
-            FROM scooters 
-            ORDER BY last_maintenance ASC
-        """)
-        scooters = cursor.fetchall()
-
-        print("\nID | Merk | Model | Laatste onderhoud | Kilometerstand | Status")
-        print("-" * 80)
-        for scooter in scooters:
+        out_of_service_only = input("Alleen scooters buiten gebruik tonen? (j/n): ").strip().lower() == "j"
+        scooters = get_fleet().scooters(
+            (lambda s: s.out_of_service) if out_of_service_only else None,
+            # NULL (onbekend) eerst, net als ORDER BY last_maintenance ASC
+            key=lambda s: (s.last_maintenance or "", s.id),
+        )
+        pager = ListPager(
+            state.values(("id", "brand", "model", "last_maintenance", "mileage", "out_of_service"))
+            for state in scooters
+        )
+
+        def format_row(scooter):
             status = "Buiten gebruik" if scooter[5] else "In gebruik"
-            print(f"{scooter[0]} | {scooter[1]} | {scooter[2]} | {scooter[3] or 'Onbekend'} | {scooter[4]} km | {status}")
+            return f"{scooter[0]} | {scooter[1]} | {scooter[2]} | {scooter[3] or 'Onbekend'} | {scooter[4]} km | {status}"
 
+        browse(pager, "ID | Merk | Model | Laatste onderhoud | Kilometerstand | Status", 80, format_row)
     except Exception as e:
         logging.error(f"Scooter onderhoud ophalen fout: {e}")
         print("\n❌ Fout bij ophalen onderhoudsinfo")
-    finally:
-        conn.close()
+
+# 🔧 Onderhoudsplanning
+def view_maintenance_plan():
+    print("\n=== Onderhoudsplanning ===")
+    try:
+        count = int(input("Aantal scooters (standaard 10): ") or 10)
+    except ValueError:
+        print("\n❌ Ongeldig aantal")
+        return
+
+    try:
+        plan = get_planner().next_due(count)
+    except Exception as e:
+        logging.error(f"Onderhoudsplanning fout: {e}")
+        print("\n❌ Fout bij ophalen onderhoudsplanning")
+        return
+
+    if not plan:
+        print("\nGeen scooters gevonden")
+        return
+
+    print("\nScore | ID | Merk | Model | Laatste onderhoud | Km sinds onderhoud | SOC | Status")
+    print("-" * 100)
+    for score, scooter in plan:
+        status = "Buiten gebruik" if scooter.out_of_service else "In gebruik"
+        km = (scooter.mileage or 0) - (scooter.mileage_at_maintenance or 0)
+        print(f"{score:.0f} | {scooter.id} | {scooter.brand} | {scooter.model} | "
+              f"{scooter.last_maintenance or 'Onbekend'} | {km} km | {scooter.soc}% | {status}")
+
+# 📊 Vlootstatistieken
+def view_fleet_statistics():
+    print("\n=== Vlootstatistieken ===")
+    print("Groeperen op: 1. Merk  2. Merk en model  3. Zone")
+    group = {"1": "brand", "2": "model", "3": "zone"}.get(input("Keuze (Enter = merk): ").strip() or "1")
+    if group is None:
+        print("\n❌ Ongeldige keuze")
+        return
+
+    try:
+        from management.analytics import FleetSnapshot
+        snapshot = FleetSnapshot.load(read_db())
+        if not snapshot.size:
+            print("\nGeen scooters gevonden")
+            return
+        summary = snapshot.summary()
+        groups = snapshot.group_by(group)
+    except Exception as e:
+        logging.error(f"Vlootstatistieken fout: {e}")
+        print("\n❌ Fout bij berekenen statistieken")
+        return
+
+    fmt = lambda value, suffix="": "-" if value != value else f"{value:.1f}{suffix}"
+    print(f"\nScooters: {summary['scooters']}")
+    print(f"Buiten gebruik: {fmt(summary['out_of_service_ratio'] * 100, '%')}")
+    print(f"Gemiddelde SOC: {fmt(summary['mean_soc'], '%')}")
+    print(f"Resterende actieradius: {fmt(summary['total_range_km'], ' km')} totaal, "
+          f"{fmt(summary['mean_range_km'], ' km')} gemiddeld")
+    print("Kilometerstand: " + ", ".join(
+        f"p{p} {fmt(value, ' km')}" for p, value in summary["mileage_percentiles"].items()))
+
+    print("\nSOC verdeling:")
+    largest = max(count for _, _, count in summary["soc_histogram"]) or 1
+    for low, high, count in summary["soc_histogram"]:
+        print(f"{low:>3}-{high:<3}% | {'█' * round(count / largest * 40)} {count}")
+
+    print("\nGroep | Aantal | Buiten gebruik | Gem. SOC | Gem. actieradius | Gem. km-stand")
+    print("-" * 90)
+    for name, stats in groups.items():
+        print(f"{name} | {stats['scooters']} | {fmt(stats['out_of_service_ratio'] * 100, '%')} | "
+              f"{fmt(stats['mean_soc'], '%')} | {fmt(stats['mean_range_km'], ' km')} | {fmt(stats['mean_mileage'], ' km')}")
+
+# 📜 Logs bekijken
+def view_logs():
+    print("\n=== Logs Bekijken ===")
+    try:
+        start = input("Vanaf (DD-MM-YYYY, leeg = begin): ").strip()
+        end = input("Tot en met (DD-MM-YYYY, leeg = nu): ").strip()
+        start = datetime.strptime(start, "%d-%m-%Y") if start else None
+        end = datetime.strptime(end + " 23:59:59", "%d-%m-%Y %H:%M:%S") if end else None
+    except ValueError:
+        print("\n❌ Ongeldige datum")
+        return
+    username = input("Gebruikersnaam (leeg = iedereen): ").strip() or None
+    action = input("Actie (leeg = alle): ").strip() or None
+    suspicious_only = input("Alleen verdachte activiteit? (j/n): ").strip().lower() == "j"
+
+    try:
+        # Zorg dat net gelogde regels al op schijf staan
+        if _audit_logger is not None:
+            _audit_logger.flush()
+        from utils.log_reader import LogReader
+        entries = LogReader(get_encryption().key).search(start, end, username, action, suspicious_only)
+    except Exception as e:
+        logging.error(f"Logs lezen fout: {e}")
+        print("\n❌ Fout bij lezen logs")
+        return
+
+    if not entries:
+        print("\nGeen logregels gevonden")
+        return
+
+    print("\nTijdstip | Gebruiker | Actie | Omschrijving | Status")
+    print("-" * 90)
+    for entry in entries:
+        status = "⚠️ VERDACHT" if entry["suspicious"] else "Normaal"
+        print(f"{entry['timestamp']} | {entry['username']} | {entry['action']} | {entry['description']} | {status}")
 
 # 📋 Menu op basis van rol
 def show_menu(user_id, role):
+    global _current_user, _current_username
+    _current_user = user_id
+    with get_pool(DB_NAME).connection() as conn:
+        row = conn.execute("SELECT username FROM users WHERE id = ?", (user_id,)).fetchone()
+    _current_username = row[0] if row else str(user_id)
     while True:
         print(f"\n=== Hoofdmenu ({role.upper()}) ===")
         
@@ -539,8 +915,11 @@ def show_menu(user_id, role):
             print("1. Gebruikers beheren")
             print("2. Travellers beheren")
             print("3. Scooters beheren")
-            print("4. Backups beheren")
+            print("4. Backup maken")
             print("5. Logs bekijken")
+            print("6. Backup terugzetten")
+            print("7. Mijn gegevens")
+            print("8. Restore code aanmaken")
             print("0. Uitloggen")
             
         elif role == "sysadmin":
@@ -550,17 +929,23 @@ def show_menu(user_id, role):
             print("3. Service Engineers beheren")
             print("4. Backups maken")
             print("5. Logs bekijken")
+            print("6. Backup terugzetten (met restore code)")
             print("0. Uitloggen")
             
         elif role == "engineer":
             # Engineer menu opties
-            print("1. Scooter status bekijken")
-            print("2. Scooter status bijwerken")
+            print("1. Scooter locaties bekijken")
+            print("2. Scooter onderhoud bekijken")
+            print("3. Scooter status bijwerken")
+            print("4. Mijn gegevens")
+            print("5. Onderhoudsplanning")
             print("0. Uitloggen")
 
         choice = input("\nKeuze: ")
 
         if choice == "0":
+            _current_user = None
+            _current_username = None
             break
         
         # Superadmin opties
@@ -572,11 +957,15 @@ def show_menu(user_id, role):
             elif choice == "3":
                 scooter_menu(role)
             elif choice == "4":
-                view_my_details(user_id)
-            elif choice == "5":
                 backup_database()
+            elif choice == "5":
+                view_logs()
             elif choice == "6":
-                restore_database()
+                restore_database(user_id, role)
+            elif choice == "7":
+                view_my_details(user_id)
+            elif choice == "8":
+                create_restore_code()
         
         # Sysadmin opties
         elif role == "sysadmin":
@@ -588,6 +977,10 @@ def show_menu(user_id, role):
                 view_my_details(user_id)
             elif choice == "4":
                 backup_database()
+            elif choice == "5":
+                view_logs()
+            elif choice == "6":
+                restore_database(user_id, role)
         
         # Engineer opties
         elif role == "engineer":
@@ -599,6 +992,8 @@ def show_menu(user_id, role):
                 edit_scooter(role)
             elif choice == "4":
                 view_my_details(user_id)
+            elif choice == "5":
+                view_maintenance_plan()
 
 # 🛵 Scooter menu
 def scooter_menu(role):
@@ -608,6 +1003,9 @@ def scooter_menu(role):
         print("2. Scooter toevoegen")
         print("3. Scooter bewerken")
         print("4. Scooter verwijderen") 
+        if role in ['superadmin', 'sysadmin']:
+            print("5. Vlootstatistieken")
+        print("6. Onderhoudsplanning")
         print("0. Terug naar hoofdmenu")
 
         choice = input("\nKeuze: ")
@@ -620,6 +1018,10 @@ def scooter_menu(role):
             add_scooter()
         elif choice == "3":
             edit_scooter(role)
+        elif choice == "5" and role in ['superadmin', 'sysadmin']:
+            view_fleet_statistics()
+        elif choice == "6":
+            view_maintenance_plan()
         else:
             print("\n❌ Ongeldige keuze of geen rechten")
 
@@ -632,6 +1034,8 @@ def traveller_menu(role):
         if role in ['superadmin', 'sysadmin']:  # Alleen voor beheerders
             print("3. Traveller bewerken")
             print("4. Traveller verwijderen")
+        print("5. Traveller zoeken op rijbewijs of e-mail")
+        print("6. Traveller zoeken op naam of adres")
         print("0. Terug naar hoofdmenu")
 
         choice = input("\nKeuze: ")
@@ -646,6 +1050,10 @@ def traveller_menu(role):
             edit_traveller()
         elif choice == "4" and role in ['superadmin', 'sysadmin']:
             delete_traveller()
+        elif choice == "5":
+            find_traveller()
+        elif choice == "6":
+            search_travellers()
         else:
             print("\n❌ Ongeldige keuze of geen rechten")
 
@@ -653,32 +1061,29 @@ def traveller_menu(role):
 def view_scooters():
     print("\n=== Scooters Overzicht ===")
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT id, brand, model, serial_number, soc, out_of_service, last_updated 
-            FROM scooters 
-            ORDER BY brand, model
-        """)
-        scooters = cursor.fetchall()
-
-        print("\nID | Merk | Model | Serienummer | SOC | Status | Laatste update")
-        print("-" * 90)
-        for scooter in scooters:
+        brand = input("Filter op merk (leeg = alles): ").strip().lower()
+        scooters = get_fleet().scooters(
+            (lambda s: (s.brand or "").lower().startswith(brand)) if brand else None,
+            key=lambda s: (s.brand, s.model, s.id),
+        )
+        pager = ListPager(
+            state.values(("id", "brand", "model", "serial_number", "soc", "out_of_service", "last_updated"))
+            for state in scooters
+        )
+
+        def format_row(scooter):
             status = "Buiten gebruik" if scooter[5] else "In gebruik"
-            print(f"{scooter[0]} | {scooter[1]} | {scooter[2]} | {scooter[3]} | {scooter[4]}% | {status} | {scooter[6]}")
+            return f"{scooter[0]} | {scooter[1]} | {scooter[2]} | {scooter[3]} | {scooter[4]}% | {status} | {scooter[6]}"
 
+        browse(pager, "ID | Merk | Model | Serienummer | SOC | Status | Laatste update", 90, format_row)
     except Exception as e:
         logging.error(f"Scooters ophalen fout: {e}")
         print("\n❌ Fout bij ophalen scooters")
-    finally:
-        conn.close()
 
 # 👤 Eigen gegevens bekijken
 def view_my_details(user_id):
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = get_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -703,22 +1108,24 @@ def view_my_details(user_id):
         logging.error(f"Gegevens ophalen fout: {e}")
         print("\n❌ Fout bij ophalen gegevens")
     finally:
-        conn.close()
+        release_connection(conn)
 
 # 👥 Gebruikers beheren (alleen voor superadmin)
 def manage_users():
     print("\n=== Gebruikersbeheer ===")
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT id, username, role, first_name, last_name, registration_date FROM users")
-        users = cursor.fetchall()
-
-        print("\nID | Gebruikersnaam | Rol | Naam | Registratiedatum")
-        print("-" * 80)
-        for user in users:
-            print(f"{user[0]} | {user[1]} | {user[2]} | {user[3]} {user[4]} | {user[5]}")
+        pager = KeysetPager(
+            DB_NAME, "users",
+            ["id", "username", "role", "first_name", "last_name", "registration_date"],
+            ["id"],
+        )
+        browse(
+            pager, "ID | Gebruikersnaam | Rol | Naam | Registratiedatum", 80,
+            lambda user: f"{user[0]} | {user[1]} | {user[2]} | {user[3]} {user[4]} | {user[5]}",
+        )
 
         print("\nOpties:")
         print("1. Nieuwe gebruiker toevoegen")
@@ -753,12 +1160,14 @@ def manage_users():
             
             try:
                 password_hash = hash_password(password).decode()
-                cursor.execute("""
-                    INSERT INTO users (username, password_hash, role, first_name, last_name)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (username, password_hash, role, first_name, last_name))
+                with journaled(conn):
+                    cursor.execute("""
+                        INSERT INTO users (username, password_hash, role, first_name, last_name)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (username, password_hash, role, first_name, last_name))
                 conn.commit()
                 print(f"\n✅ Gebruiker {username} succesvol toegevoegd als {role}")
+                audit("Gebruiker toegevoegd", _current_username, f"{username} ({role})")
             except sqlite3.IntegrityError:
                 print("\n❌ Gebruikersnaam bestaat al")
 
@@ -768,10 +1177,12 @@ def manage_users():
                 print("\n❌ Superadmin kan niet verwijderd worden")
                 return
             
-            cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            with journaled(conn):
+                cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
             conn.commit()
             print("\n✅ Gebruiker verwijderd")
             logging.info(f"Gebruiker verwijderd (ID: {user_id})")
+            audit("Gebruiker verwijderd", _current_username, f"ID: {user_id}")
 
         elif choice == "3":
             user_id = input("ID van gebruiker om rol te wijzigen: ")
@@ -784,16 +1195,18 @@ def manage_users():
                 print("\n❌ Ongeldige rol")
                 return
             
-            cursor.execute("UPDATE users SET role = ? WHERE id = ?", (new_role, user_id))
+            with journaled(conn):
+                cursor.execute("UPDATE users SET role = ? WHERE id = ?", (new_role, user_id))
             conn.commit()
             print("\n✅ Gebruikersrol bijgewerkt")
             logging.info(f"Gebruiker {user_id} rol gewijzigd naar {new_role}")
+            audit("Rol gewijzigd", _current_username, f"Gebruiker {user_id} -> {new_role}")
 
     except Exception as e:
         logging.error(f"Gebruikersbeheer fout: {e}")
         print("\n❌ Fout bij gebruikersbeheer")
     finally:
-        conn.close()
+        release_connection(conn)
 
 # 🔐 Inloggen
 def login():
@@ -802,27 +1215,21 @@ def login():
     password = getpass.getpass("Wachtwoord: ")
 
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
+        user_id, role = get_auth_service().login(username, password).result()
 
-        cursor.execute("""
-            SELECT id, password_hash, role FROM users WHERE username = ?
-        """, (username,))
-        result = cursor.fetchone()
-
-        if result and verify_password(password, result[1].encode()):
-            print(f"\n✅ Ingelogd als {username} ({result[2]})")
-            logging.info(f"Succesvolle login: {username} ({result[2]})")
-            return result[0], result[2]  # return user_id en role
+        if user_id:
+            print(f"\n✅ Ingelogd als {username} ({role})")
+            logging.info(f"Succesvolle login: {username} ({role})")
+            audit("Login", username, f"Succesvolle login ({role})")
+            return user_id, role  # return user_id en role
         else:
             print("\n❌ Ongeldige gebruikersnaam of wachtwoord.")
             logging.warning(f"Mislukte loginpoging voor: {username}")
+            audit("Login mislukt", username, "Ongeldige gebruikersnaam of wachtwoord", suspicious=True)
             return None, None
     except Exception as e:
         logging.error(f"Login error: {e}")
         return None, None
-    finally:
-        conn.close()
 
 # 🆕 Gebruiker registreren
 def register_user():
@@ -848,16 +1255,24 @@ def register_user():
 
     try:
         password_hash = hash_password(password).decode()
-        email_encrypted = fernet.encrypt(email.encode()).decode()
-        license_encrypted = fernet.encrypt(license_number.encode()).decode()
+        email_encrypted = get_encryption().encrypt(email)
+        license_encrypted = get_encryption().encrypt(license_number)
 
-        conn = sqlite3.connect(DB_NAME)
+        conn = get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO users (username, password_hash, role, email, license_number, first_name, last_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (username, password_hash, role, email_encrypted, license_encrypted, first_name, last_name))
+        if exists(conn, get_encryption(), "users", "email", email):
+            print("\n❌ E-mailadres is al in gebruik.")
+            return
+
+        bidx = blind_index_values(get_encryption(), "users", {"email": email, "license_number": license_number})
+        with journaled(conn):
+            cursor.execute("""
+                INSERT INTO users (username, password_hash, role, email, license_number, first_name, last_name,
+                                   email_bidx, license_number_bidx)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (username, password_hash, role, email_encrypted, license_encrypted, first_name, last_name,
+                  bidx["email_bidx"], bidx["license_number_bidx"]))
         
         conn.commit()
         print("\n✅ Gebruiker succesvol geregistreerd.")
@@ -869,7 +1284,7 @@ def register_user():
         print("\n❌ Er ging iets mis bij de registratie.")
         logging.error(f"Registratiefout: {e}")
     finally:
-        conn.close()
+        release_connection(conn)
 
 # Logging instellen
 logging.basicConfig(
@@ -879,10 +1294,26 @@ logging.basicConfig(
     filemode='a'
 )
 
+startup.mark("imports")
+
 # ▶️ Start
 def main():
-    initialize_database()
-    
+    # Dunne client: de operaties van het menu via server.py in plaats van een eigen verbinding met de database
+    address = os.environ.get("SCOOTER_SERVER")
+    if "--server" in sys.argv[1:]:
+        index = sys.argv.index("--server")
+        address = sys.argv[index + 1] if index + 1 < len(sys.argv) else None
+    if address:
+        from client import run_client
+        return run_client(address)
+
+    with startup.phase("database"):
+        cold = initialize_database()
+    startup.log()
+    if os.environ.get("SCOOTER_STARTUP_REPORT") or "--startup-report" in sys.argv[1:]:
+        print(f"\n=== Opstarttijd ({'koude' if cold else 'warme'} start) ===")
+        print(startup.report())
+
     while True:
         print("\n=== Startmenu ===")
         print("1. Inloggen")
@@ -901,6 +1332,18 @@ def main():
         elif choice == "0":
             print("\nTot ziens!")
             logging.info("Applicatie afgesloten")
+            if _audit_logger is not None:
+                _audit_logger.close()
+            if _auth_service is not None:
+                logging.info(f"Login latency (ms): {_auth_service.latency_report()}")
+                _auth_service.close()
+            if _planner is not None:
+                _planner.close()
+            close_scooter_writers()
+            close_fleet_caches()
+            if _replica is not None:
+                _replica.close()
+            close_all_pools()
             break
         else:
             print("\n❌ Ongeldige keuze")
@@ -0,0 +1,239 @@
+import math
+from array import array
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optioneel; zonder NumPy rekenen we over array('d')
+    np = None
+
+from config import ANALYTICS_SOC_BINS, ANALYTICS_ZONE_GRID, ANALYTICS_PERCENTILES
+from database.connection import get_pool
+from management.scooters import ROTTERDAM_BOUNDS
+
+NUMERIC_COLUMNS = (
+    "soc", "battery_capacity", "target_range_min", "target_range_max",
+    "mileage", "latitude", "longitude", "out_of_service",
+)
+
+NAN = float("nan")
+
+
+def _percentile(values, p):
+    # Lineaire interpolatie zoals numpy.percentile, NaN wordt overgeslagen
+    data = sorted(v for v in values if v == v)
+    if not data:
+        return NAN
+    rank = (len(data) - 1) * p / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(data) - 1)
+    return data[low] + (data[high] - data[low]) * (rank - low)
+
+
+def _mean(values):
+    data = [v for v in values if v == v]
+    return sum(data) / len(data) if data else NAN
+
+
+def _factorize(labels):
+    """Geeft (unieke labels, code per rij) terug, zoals pandas.factorize."""
+    positions = {}
+    codes = array('q')
+    for label in labels:
+        code = positions.get(label)
+        if code is None:
+            code = positions[label] = len(positions)
+        codes.append(code)
+    return list(positions), codes
+
+
+def zone_name(lat, lon, grid=ANALYTICS_ZONE_GRID):
+    """Rastervak binnen Rotterdam, bijv. "B3"; None buiten het gebied of zonder locatie."""
+    if lat != lat or lon != lon:
+        return None
+    b = ROTTERDAM_BOUNDS
+    if not (b['min_lat'] <= lat <= b['max_lat'] and b['min_lon'] <= lon <= b['max_lon']):
+        return None
+    row = min(int((lat - b['min_lat']) / (b['max_lat'] - b['min_lat']) * grid), grid - 1)
+    col = min(int((lon - b['min_lon']) / (b['max_lon'] - b['min_lon']) * grid), grid - 1)
+    return f"{chr(ord('A') + row)}{col + 1}"
+
+
+class FleetSnapshot:
+    """Kolomgewijze momentopname van de vloot voor rapportages.
+
+    Numerieke kolommen staan als array('d') (NULL = NaN) en worden met NumPy
+    zonder kopie als ndarray bekeken als NumPy beschikbaar is. Alle
+    aggregaties werken op hele kolommen in plaats van per rij.
+    """
+
+    __slots__ = ("size", "taken_at", "ids", "brand", "model", "_columns")
+
+    def __init__(self, rows):
+        self.taken_at = datetime.now()
+        self.size = len(rows)
+        self.ids = array('q', (row[0] for row in rows))
+        self.brand = [row[1] for row in rows]
+        self.model = [row[2] for row in rows]
+        self._columns = {}
+        for offset, name in enumerate(NUMERIC_COLUMNS, start=3):
+            self._columns[name] = array('d', (NAN if row[offset] is None else row[offset] for row in rows))
+
+    @classmethod
+    def load(cls, db_name):
+        with get_pool(db_name).connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, brand, model, {', '.join(NUMERIC_COLUMNS)} FROM scooters"
+            ).fetchall()
+        return cls(rows)
+
+    def column(self, name):
+        values = self._columns[name]
+        return np.frombuffer(values, dtype=np.float64) if np is not None else values
+
+    # 📊 Aggregaties over de hele vloot
+
+    def soc_histogram(self, bins=ANALYTICS_SOC_BINS):
+        """Aantal scooters per SOC bucket: [(van %, tot %, aantal), ...]."""
+        width = 100 / bins
+        soc = self.column("soc")
+        if np is not None:
+            counts, _ = np.histogram(soc[~np.isnan(soc)], bins=bins, range=(0, 100))
+            counts = counts.tolist()
+        else:
+            counts = [0] * bins
+            for value in soc:
+                if value == value:
+                    counts[min(int(value / width), bins - 1)] += 1
+        return [(round(i * width), round((i + 1) * width), count) for i, count in enumerate(counts)]
+
+    def estimated_range(self):
+        """Geschatte resterende actieradius per scooter (km): gemiddelde doelrange x SOC."""
+        soc = self.column("soc")
+        low = self.column("target_range_min")
+        high = self.column("target_range_max")
+        if np is not None:
+            return (low + high) / 2 * soc / 100
+        return array('d', ((l + h) / 2 * s / 100 for s, l, h in zip(soc, low, high)))
+
+    def out_of_service_ratio(self):
+        if not self.size:
+            return NAN
+        oos = self.column("out_of_service")
+        if np is not None:
+            return float(np.nansum(oos)) / self.size
+        return sum(v for v in oos if v == v) / self.size
+
+    def mileage_percentiles(self, percentiles=ANALYTICS_PERCENTILES):
+        mileage = self.column("mileage")
+        if np is not None:
+            if np.isnan(mileage).all():
+                return {p: NAN for p in percentiles}
+            return dict(zip(percentiles, np.nanpercentile(mileage, percentiles).tolist()))
+        return {p: _percentile(mileage, p) for p in percentiles}
+
+    def zone_codes(self, grid=ANALYTICS_ZONE_GRID):
+        """Rastervak per scooter als getal rij * grid + kolom; -1 buiten Rotterdam of zonder locatie."""
+        b = ROTTERDAM_BOUNDS
+        lat = self.column("latitude")
+        lon = self.column("longitude")
+        if np is not None:
+            row = np.floor((lat - b['min_lat']) / (b['max_lat'] - b['min_lat']) * grid)
+            col = np.floor((lon - b['min_lon']) / (b['max_lon'] - b['min_lon']) * grid)
+            inside = ((lat >= b['min_lat']) & (lat <= b['max_lat'])
+                      & (lon >= b['min_lon']) & (lon <= b['max_lon']))
+            codes = np.full(self.size, -1, dtype=np.int64)
+            codes[inside] = (np.minimum(row[inside], grid - 1) * grid + np.minimum(col[inside], grid - 1))
+            return codes
+        codes = array('q')
+        for a, o in zip(lat, lon):
+            zone = zone_name(a, o, grid)
+            codes.append(-1 if zone is None else (ord(zone[0]) - ord('A')) * grid + int(zone[1:]) - 1)
+        return codes
+
+    def summary(self):
+        ranges = self.estimated_range()
+        return {
+            "scooters": self.size,
+            "out_of_service_ratio": self.out_of_service_ratio(),
+            "mean_soc": self._mean(self.column("soc")),
+            "mean_range_km": self._mean(ranges),
+            "total_range_km": self._sum(ranges),
+            "mileage_percentiles": self.mileage_percentiles(),
+            "soc_histogram": self.soc_histogram(),
+        }
+
+    def group_by(self, key="brand"):
+        """Statistieken per merk, merk/model of zone: {groep: {...}}."""
+        if key == "brand":
+            groups, codes = _factorize(self.brand)
+        elif key == "model":
+            groups, codes = _factorize(list(zip(self.brand, self.model)))
+            groups = [f"{brand} {model}" for brand, model in groups]
+        elif key == "zone":
+            grid = ANALYTICS_ZONE_GRID
+            zone_codes = self.zone_codes(grid)
+            groups = [f"{chr(ord('A') + i // grid)}{i % grid + 1}" for i in range(grid * grid)] + ["Onbekend"]
+            # Onbekend (-1) krijgt de laatste groep
+            if np is not None:
+                codes = np.where(zone_codes < 0, grid * grid, zone_codes)
+            else:
+                codes = array('q', (grid * grid if c < 0 else c for c in zone_codes))
+        else:
+            raise ValueError(f"Onbekende groepering: {key}")
+
+        soc = self.column("soc")
+        oos = self.column("out_of_service")
+        mileage = self.column("mileage")
+        ranges = self.estimated_range()
+
+        if np is not None:
+            inverse = np.asarray(codes, dtype=np.int64)
+            counts = np.bincount(inverse, minlength=len(groups))
+
+            def per_group_mean(values):
+                valid = ~np.isnan(values)
+                totals = np.bincount(inverse[valid], weights=values[valid], minlength=len(groups))
+                numbers = np.bincount(inverse[valid], minlength=len(groups))
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    return (totals / numbers).tolist()
+
+            mean_soc, mean_range, mean_mileage = (per_group_mean(v) for v in (soc, ranges, mileage))
+            oos_counts = np.bincount(inverse, weights=np.nan_to_num(oos), minlength=len(groups))
+            stats = {
+                group: {
+                    "scooters": int(counts[i]),
+                    "out_of_service_ratio": float(oos_counts[i] / counts[i]),
+                    "mean_soc": mean_soc[i],
+                    "mean_range_km": mean_range[i],
+                    "mean_mileage": mean_mileage[i],
+                }
+                for i, group in enumerate(groups) if counts[i]
+            }
+        else:
+            members = {}
+            for index, code in enumerate(codes):
+                members.setdefault(code, []).append(index)
+            stats = {
+                groups[code]: {
+                    "scooters": len(indexes),
+                    "out_of_service_ratio": sum(oos[i] for i in indexes if oos[i] == oos[i]) / len(indexes),
+                    "mean_soc": _mean(soc[i] for i in indexes),
+                    "mean_range_km": _mean(ranges[i] for i in indexes),
+                    "mean_mileage": _mean(mileage[i] for i in indexes),
+                }
+                for code, indexes in members.items()
+            }
+        return dict(sorted(stats.items()))
+
+    @staticmethod
+    def _mean(values):
+        if np is not None:
+            return float(np.nanmean(values)) if not np.isnan(values).all() else NAN
+        return _mean(values)
+
+    @staticmethod
+    def _sum(values):
+        if np is not None:
+            return float(np.nansum(values))
+        return sum(v for v in values if v == v)
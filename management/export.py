@@ -0,0 +1,346 @@
+"""Streaming export van travellers en scooters naar CSV, JSONL of Parquet.
+
+Rijen worden per EXPORT_BATCH_SIZE van de cursor gelezen en direct
+weggeschreven, dus het geheugengebruik hangt niet af van de tabelgrootte.
+De export leest uit één WAL snapshot: wat tijdens de export gecommit wordt
+komt er niet half in terecht.
+
+    SCOOTER_EXPORT_PASSWORD=... python -m management.export travellers travellers.csv.gz \\
+        --username super_admin --gzip --where city=Rotterdam
+"""
+import argparse
+import csv
+import getpass
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optioneel; alleen nodig voor Parquet
+    pa = pq = None
+
+from config import EXPORT_BATCH_SIZE
+from auth.service import AuthService
+from database.blind_index import BLIND_INDEX_FIELDS, lookup
+from database.connection import get_pool, close_all_pools
+from database.encryption import EncryptionManager, is_token
+from utils.logging import SecureLogger
+
+# Kolommen per tabel met hun type: "int", "float" of "text"
+EXPORT_TABLES = {
+    "travellers": {
+        "id": "int", "first_name": "text", "last_name": "text", "birthday": "text", "gender": "text",
+        "street_name": "text", "house_number": "text", "zip_code": "text", "city": "text",
+        "email": "text", "license_number": "text", "phone_number": "text", "registration_date": "text",
+    },
+    "scooters": {
+        "id": "int", "brand": "text", "model": "text", "serial_number": "text", "top_speed": "int",
+        "battery_capacity": "int", "soc": "int", "target_range_min": "int", "target_range_max": "int",
+        "latitude": "float", "longitude": "float", "out_of_service": "int", "mileage": "int",
+        "last_maintenance": "text", "in_service_date": "text", "last_updated": "text",
+        "mileage_at_maintenance": "int",
+    },
+}
+
+# Persoonsgegevens: alleen met pii=True en een rol uit PII_ROLES
+PII_COLUMNS = {
+    "travellers": ("email", "license_number", "phone_number"),
+    "scooters": (),
+}
+
+# Zelfde toegang als de menu's in main.py
+TABLE_ROLES = {
+    "travellers": ("superadmin", "sysadmin"),
+    "scooters": ("superadmin", "sysadmin", "engineer"),
+}
+PII_ROLES = ("superadmin", "sysadmin")
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+OPERATORS = {"=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "~": "LIKE"}
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(<=|>=|!=|=|<|>|~)\s*(.*?)\s*$')
+
+_CONVERT = {"int": int, "float": float, "text": str}
+
+
+def parse_filter(expression):
+    """"soc<20" -> ("soc", "<", "20"); "~" betekent LIKE."""
+    match = FILTER_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Ongeldig filter: {expression}")
+    return match.groups()
+
+
+class ExportResult:
+    __slots__ = ('table', 'path', 'rows', 'seconds')
+
+    def __init__(self, table, path):
+        self.table = table
+        self.path = path
+        self.rows = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return f"ExportResult(table={self.table}, path={self.path}, rows={self.rows}, seconds={self.seconds:.2f})"
+
+
+# ✍️ Writers: één per formaat, allemaal met write(rows) per batch
+
+class CsvWriter:
+    def __init__(self, stream, columns):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class JsonlWriter:
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.columns = columns
+
+    def write(self, rows):
+        self.stream.writelines(
+            json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n" for row in rows
+        )
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Eén row group per batch; kolomtypes liggen vast zodat lege batches geen type hoeven te raden."""
+
+    TYPES = {"int": "int64", "float": "float64", "text": "string"}
+
+    def __init__(self, path, columns, types, compression):
+        if pa is None:
+            raise RuntimeError("Parquet export vereist pyarrow (pip install pyarrow)")
+        self.schema = pa.schema([(column, getattr(pa, self.TYPES[types[column]])()) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, rows):
+        if not rows:
+            return
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class Exporter:
+    def __init__(self, db_name, role, encryption=None, batch_size=EXPORT_BATCH_SIZE):
+        self.pool = get_pool(db_name)
+        self.role = role
+        # Geen decrypt cache: een export ziet elke waarde maar één keer
+        self.encryption = encryption or EncryptionManager(cache_size=0)
+        self.batch_size = batch_size
+
+    def _columns(self, table, columns, pii):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Onbekende tabel: {table}")
+        if self.role not in TABLE_ROLES[table]:
+            raise PermissionError(f"Rol {self.role} mag {table} niet exporteren")
+        if pii and self.role not in PII_ROLES:
+            raise PermissionError(f"Rol {self.role} mag geen persoonsgegevens exporteren")
+
+        available = EXPORT_TABLES[table]
+        sensitive = PII_COLUMNS[table]
+        if not columns:
+            return [column for column in available if pii or column not in sensitive]
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ValueError(f"Onbekende kolommen: {', '.join(unknown)}")
+        if not pii and any(column in sensitive for column in columns):
+            raise PermissionError("Persoonsgegevens alleen exporteren met pii=True")
+        return list(columns)
+
+    def _where(self, table, filters, pii):
+        clauses = []
+        params = []
+        types = EXPORT_TABLES[table]
+        for column, operator, value in filters:
+            if column not in types:
+                raise ValueError(f"Onbekende filterkolom: {column}")
+            if operator not in OPERATORS:
+                raise ValueError(f"Onbekende operator: {operator}")
+            if column in PII_COLUMNS[table]:
+                # Gevoelige velden zijn alleen op gelijkheid te filteren, via de blind index (of UNIQUE index)
+                if not pii or operator != "=" or column not in BLIND_INDEX_FIELDS.get(table, ()):
+                    raise ValueError(f"Op {column} kan alleen met pii en '=' gefilterd worden")
+                column, value = lookup(self.encryption, table, column, value)
+                clauses.append(f"{column} = ?")
+                params.append(value)
+                continue
+            try:
+                params.append(value if operator == "~" else _CONVERT[types[column]](value))
+            except ValueError:
+                raise ValueError(f"Ongeldige waarde voor {column}: {value}")
+            clauses.append(f"{column} {OPERATORS[operator]} ?")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _decrypt(self, rows, positions):
+        # Alle tokens van een batch in één decrypt_many; oude plaintext blijft zoals hij is
+        tokens = [row[i] for row in rows for i in positions if is_token(row[i])]
+        if not tokens:
+            return rows
+        plain = dict(zip(tokens, self.encryption.decrypt_many(tokens)))
+        return [
+            tuple(plain.get(value, value) if i in positions else value for i, value in enumerate(row))
+            for row in rows
+        ]
+
+    def batches(self, table, columns=None, filters=(), pii=False):
+        """Geeft (kolommen, generator van rij-batches) terug; de cursor wordt stapsgewijs gelezen."""
+        columns = self._columns(table, columns, pii)
+        where, params = self._where(table, filters, pii)
+        positions = {i for i, column in enumerate(columns) if column in PII_COLUMNS[table]}
+        sql = f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY id"
+
+        def generate():
+            with self.pool.connection() as conn:
+                cursor = conn.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    yield self._decrypt(rows, positions) if positions else rows
+
+        return columns, generate()
+
+    def export(self, table, path, fmt=None, columns=None, filters=(), pii=False, compress=False):
+        """Schrijft `table` naar `path` ('-' = stdout).
+
+        Het formaat volgt uit de extensie als `fmt` ontbreekt. Bij een bestand
+        wordt eerst naar <path>.tmp geschreven en pas aan het eind hernoemd,
+        zodat een afgebroken export nooit een half bestand achterlaat.
+        """
+        fmt = fmt or self._format(path)
+        if fmt not in FORMATS:
+            raise ValueError(f"Onbekend formaat: {fmt}")
+        if fmt == "parquet" and path == "-":
+            raise ValueError("Parquet kan niet naar stdout")
+
+        result = ExportResult(table, path)
+        started = time.perf_counter()
+        columns, batches = self.batches(table, columns, filters, pii)
+        target = path if path == "-" else f"{path}.tmp"
+        try:
+            if fmt == "parquet":
+                writer = ParquetWriter(target, columns, EXPORT_TABLES[table], "gzip" if compress else "snappy")
+                stream = None
+            else:
+                stream = self._open(target, compress)
+                writer = (CsvWriter if fmt == "csv" else JsonlWriter)(stream, columns)
+            try:
+                for rows in batches:
+                    writer.write(rows)
+                    result.rows += len(rows)
+            finally:
+                writer.close()
+                if stream is sys.stdout:
+                    stream.flush()
+                elif stream is not None:
+                    stream.close()
+            if path != "-":
+                os.replace(target, path)
+        except BaseException:
+            if path != "-" and os.path.exists(target):
+                os.remove(target)
+            raise
+
+        result.seconds = time.perf_counter() - started
+        logging.info(f"Export door rol {self.role}: {result} (pii={pii})")
+        return result
+
+    @staticmethod
+    def _format(path):
+        name = str(path).lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        for fmt in FORMATS:
+            if name.endswith("." + fmt):
+                return fmt
+        return "csv"
+
+    @staticmethod
+    def _open(target, compress):
+        if target == "-":
+            if compress:
+                return io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"),
+                                        encoding="utf-8", newline="")
+            return sys.stdout
+        if compress:
+            return gzip.open(target, "wt", encoding="utf-8", newline="")
+        return open(target, "w", encoding="utf-8", newline="")
+
+    def close(self):
+        self.encryption.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporteer travellers of scooters")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("output", help="doelbestand ('-' = stdout)")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--db", default="scooter_management.db")
+    parser.add_argument("--format", choices=FORMATS, help="standaard: afgeleid van de extensie")
+    parser.add_argument("--columns", help="kommagescheiden kolommen")
+    parser.add_argument("--where", action="append", default=[],
+                        help="filter, bijv. city=Rotterdam, soc<20 of last_name~Jan%% (herhaalbaar)")
+    parser.add_argument("--pii", action="store_true", help="persoonsgegevens ontsleuteld meenemen")
+    parser.add_argument("--gzip", action="store_true")
+    options = parser.parse_args(argv)
+
+    logging.basicConfig(filename="app.log", level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s", filemode='a')
+
+    password = os.environ.get("SCOOTER_EXPORT_PASSWORD") or getpass.getpass("Wachtwoord: ", stream=sys.stderr)
+    auth = AuthService(options.db)
+    try:
+        user_id, role = auth.login(options.username, password).result()
+    finally:
+        auth.close()
+
+    encryption = EncryptionManager(cache_size=0)
+    audit_log = SecureLogger(encryption.key)
+    if not user_id:
+        audit_log.log("Login mislukt", options.username, "Export login mislukt", suspicious=True)
+        audit_log.close()
+        print("❌ Ongeldige gebruikersnaam of wachtwoord", file=sys.stderr)
+        return 2
+
+    exporter = Exporter(options.db, role, encryption)
+    try:
+        columns = [c.strip() for c in options.columns.split(",")] if options.columns else None
+        result = exporter.export(options.table, options.output, options.format, columns,
+                                 [parse_filter(f) for f in options.where], options.pii, options.gzip)
+    except (ValueError, PermissionError, RuntimeError) as e:
+        audit_log.log("Export geweigerd", options.username, f"{options.table}: {e}", suspicious=True)
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        exporter.close()
+        close_all_pools()
+
+    audit_log.log("Export", options.username,
+                  f"{options.table} -> {options.output}: {result.rows} rijen (pii={options.pii})")
+    audit_log.close()
+    print(f"✅ {result.rows} rijen geëxporteerd in {result.seconds:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
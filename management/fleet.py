@@ -0,0 +1,239 @@
+import sqlite3
+import threading
+from operator import attrgetter
+
+from config import BUSY_TIMEOUT_MS
+from database.journal import acting_as
+
+SCOOTER_COLUMNS = (
+    "id", "brand", "model", "serial_number", "top_speed", "battery_capacity", "soc",
+    "target_range_min", "target_range_max", "latitude", "longitude", "out_of_service",
+    "mileage", "last_maintenance", "in_service_date", "last_updated",
+    "mileage_at_maintenance",
+)
+
+EDITABLE_COLUMNS = frozenset(SCOOTER_COLUMNS) - {"id"}
+
+_as_row = attrgetter(*SCOOTER_COLUMNS)
+
+
+class ScooterState:
+    """Compacte momentopname van één scooter rij."""
+    __slots__ = SCOOTER_COLUMNS
+
+    def __init__(self, row):
+        for column, value in zip(SCOOTER_COLUMNS, row):
+            setattr(self, column, value)
+
+    def values(self, columns):
+        return tuple(getattr(self, column) for column in columns)
+
+
+class FleetCache:
+    """Procesbrede cache van alle scooters, op id en serienummer.
+
+    De cache heeft een eigen verbinding. PRAGMA data_version op die
+    verbinding verandert alleen als een *andere* verbinding (telemetrie,
+    een ander proces) iets commit; dan wordt de vloot opnieuw geladen.
+    Schrijfacties via `add()`, `update()` en `write()` lopen over de eigen verbinding
+    en werken de cache direct bij, zonder volledige herlaadbeurt.
+
+    Met `subscribe(callback)` krijgt een afnemer alleen de gewijzigde
+    scooters door: `callback(changed_states, removed_ids)`.
+    """
+
+    def __init__(self, db_name):
+        self.db_name = str(db_name)
+        self._conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT_MS / 1000,
+                                     check_same_thread=False)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_MS)}")
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_serial = {}
+        self._version = None
+        self._listeners = []
+        self.reloads = 0
+
+    def _select(self, where="", params=()):
+        return self._conn.execute(f"SELECT {', '.join(SCOOTER_COLUMNS)} FROM scooters {where}", params)
+
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        # Ongewijzigde rijen houden hun bestaande ScooterState; alleen
+        # gewijzigde rijen worden opnieuw opgebouwd en doorgegeven
+        old = self._by_id
+        by_id = {}
+        changed = []
+        for row in self._select():
+            state = old.get(row[0])
+            if state is None or _as_row(state) != row:
+                state = ScooterState(row)
+                changed.append(state)
+            by_id[row[0]] = state
+        removed = [scooter_id for scooter_id in old if scooter_id not in by_id]
+
+        self._by_id = by_id
+        if changed or removed:
+            self._by_serial = {state.serial_number: state for state in by_id.values()}
+        self._version = version
+        self.reloads += 1
+        if changed or removed:
+            self._notify(changed, removed)
+
+    def _notify(self, changed, removed):
+        for callback in list(self._listeners):
+            callback(changed, removed)
+
+    def _store(self, scooter_id):
+        # Rij opnieuw lezen zodat types en defaults gelijk zijn aan de database
+        row = self._select("WHERE id = ?", (scooter_id,)).fetchone()
+        old = self._by_id.pop(scooter_id, None)
+        if old is not None:
+            self._by_serial.pop(old.serial_number, None)
+        if row is None:
+            if old is not None:
+                self._notify([], [scooter_id])
+            return None
+        state = ScooterState(row)
+        self._by_id[state.id] = state
+        self._by_serial[state.serial_number] = state
+        self._notify([state], [])
+        return state
+
+    def subscribe(self, callback):
+        """Registreert een afnemer; geeft de huidige vloot terug als startpunt."""
+        with self._lock:
+            self._sync()
+            self._listeners.append(callback)
+            return list(self._by_id.values())
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def refresh(self):
+        """Verwerkt wijzigingen van andere verbindingen (en stuurt ze naar afnemers)."""
+        with self._lock:
+            self._sync()
+
+    def get(self, scooter_id):
+        try:
+            scooter_id = int(scooter_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            self._sync()
+            return self._by_id.get(scooter_id)
+
+    def get_by_serial(self, serial_number):
+        with self._lock:
+            self._sync()
+            return self._by_serial.get(serial_number)
+
+    def scooters(self, predicate=None, key=None):
+        """Lijst van scooters, optioneel gefilterd en gesorteerd."""
+        with self._lock:
+            self._sync()
+            states = list(self._by_id.values())
+        if predicate is not None:
+            states = [state for state in states if predicate(state)]
+        if key is not None:
+            states.sort(key=key)
+        return states
+
+    def add(self, values, actor=None):
+        """Voegt een scooter toe (write-through); geeft de nieuwe ScooterState.
+
+        `actor` is de gebruiker die in het wijzigingsjournaal komt.
+        """
+        columns = [column for column in values if column in EDITABLE_COLUMNS]
+        with self._lock:
+            self._sync()
+            try:
+                with acting_as(self._conn, actor):
+                    cursor = self._conn.execute(
+                        f"INSERT INTO scooters ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                        [values[column] for column in columns],
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            return self._store(cursor.lastrowid)
+
+    def update(self, scooter_id, changes, actor=None):
+        """Werkt velden bij (write-through); geeft de nieuwe ScooterState of None."""
+        unknown = set(changes) - EDITABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Onbekende scooter velden: {', '.join(sorted(unknown))}")
+        if not changes:
+            return self.get(scooter_id)
+        with self._lock:
+            self._sync()
+            try:
+                with acting_as(self._conn, actor):
+                    self._conn.execute(
+                        f"UPDATE scooters SET {', '.join(f'{column} = ?' for column in changes)} WHERE id = ?",
+                        [*changes.values(), scooter_id],
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            return self._store(int(scooter_id))
+
+    def write(self, apply, scooter_ids):
+        """Voert `apply(conn)` uit en commit op de eigen verbinding (write-through).
+
+        Daarna worden alleen `scooter_ids` opnieuw gelezen, zoals bij
+        `update()`; zo leidt bijvoorbeeld een group commit van de
+        write-behind wachtrij niet tot een volledige herlaadbeurt.
+        """
+        with self._lock:
+            self._sync()
+            try:
+                result = apply(self._conn)
+                self._conn.commit()
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                raise
+            for scooter_id in dict.fromkeys(scooter_ids):
+                self._store(scooter_id)
+            return result
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            self._listeners = []
+            self._by_id = {}
+            self._by_serial = {}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_fleet_cache(db_name):
+    """Geeft de gedeelde FleetCache voor `db_name` terug (één per bestand per proces)."""
+    key = str(db_name)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = FleetCache(key)
+            _caches[key] = cache
+        return cache
+
+
+def close_fleet_caches():
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
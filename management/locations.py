@@ -0,0 +1,124 @@
+import math
+
+from database.connection import get_pool, execute_statements
+
+METERS_PER_DEGREE_LAT = 111_320
+
+# R*Tree index op (latitude, longitude); triggers houden hem gelijk met scooters
+SPATIAL_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS scooter_rtree USING rtree(
+    id, min_lat, max_lat, min_lon, max_lon
+);
+
+CREATE TRIGGER IF NOT EXISTS scooters_rtree_insert AFTER INSERT ON scooters
+WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+BEGIN
+    INSERT OR REPLACE INTO scooter_rtree
+    VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+END;
+
+CREATE TRIGGER IF NOT EXISTS scooters_rtree_update AFTER UPDATE OF latitude, longitude ON scooters
+WHEN OLD.latitude IS NOT NEW.latitude OR OLD.longitude IS NOT NEW.longitude
+BEGIN
+    DELETE FROM scooter_rtree WHERE id = OLD.id;
+    INSERT INTO scooter_rtree
+    SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+    WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scooters_rtree_delete AFTER DELETE ON scooters
+BEGIN
+    DELETE FROM scooter_rtree WHERE id = OLD.id;
+END;
+"""
+
+LOCATION_COLUMNS = "s.id, s.brand, s.model, s.latitude, s.longitude, s.soc, s.out_of_service"
+
+
+def ensure_spatial_index(conn, commit=True):
+    """Maakt de R*Tree index en triggers aan en vult hem eenmalig vanuit scooters."""
+    execute_statements(conn, SPATIAL_SCHEMA)
+    if conn.execute("SELECT 1 FROM scooter_rtree LIMIT 1").fetchone() is None:
+        conn.execute("""
+            INSERT INTO scooter_rtree
+            SELECT id, latitude, latitude, longitude, longitude
+            FROM scooters
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+    if commit:
+        conn.commit()
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    # Haversine afstand in meters
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6_371_000 * math.asin(math.sqrt(a))
+
+
+def box_around(lat, lon, radius_m):
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+class ScooterLocator:
+    def __init__(self, db_name):
+        self.pool = get_pool(db_name)
+
+    def in_box(self, min_lat, min_lon, max_lat, max_lon, available_only=False, min_soc=None):
+        sql = f"""
+            SELECT {LOCATION_COLUMNS}
+            FROM scooter_rtree r JOIN scooters s ON s.id = r.id
+            WHERE r.max_lat >= ? AND r.min_lat <= ?
+              AND r.max_lon >= ? AND r.min_lon <= ?
+              AND s.latitude BETWEEN ? AND ?
+              AND s.longitude BETWEEN ? AND ?
+        """
+        params = [min_lat, max_lat, min_lon, max_lon, min_lat, max_lat, min_lon, max_lon]
+        if available_only:
+            sql += " AND s.out_of_service = 0"
+        if min_soc is not None:
+            sql += " AND s.soc >= ?"
+            params.append(min_soc)
+
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def within_radius(self, lat, lon, radius_m, available_only=False, min_soc=None):
+        """Scooters binnen `radius_m` meter, gesorteerd op afstand: (afstand, rij)."""
+        rows = self.in_box(*box_around(lat, lon, radius_m), available_only=available_only, min_soc=min_soc)
+        found = []
+        for row in rows:
+            distance = distance_m(lat, lon, row[3], row[4])
+            if distance <= radius_m:
+                found.append((distance, row))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def available_within_radius(self, lat, lon, radius_m, min_soc=0):
+        return self.within_radius(lat, lon, radius_m, available_only=True, min_soc=min_soc)
+
+    def nearest(self, lat, lon, n=10, available_only=False, min_soc=None, start_radius_m=250,
+                max_radius_m=50_000):
+        """De `n` dichtstbijzijnde scooters: (afstand, rij), dichtstbijzijnde eerst."""
+        radius = start_radius_m
+        # Vergroot het zoekvak tot er genoeg kandidaten zijn
+        while True:
+            rows = self.in_box(*box_around(lat, lon, radius), available_only=available_only, min_soc=min_soc)
+            if len(rows) >= n or radius >= max_radius_m:
+                break
+            radius *= 2
+
+        if not rows:
+            return []
+
+        candidates = sorted(((distance_m(lat, lon, row[3], row[4]), row) for row in rows),
+                            key=lambda item: item[0])
+        # Het vak kan hoekpunten bevatten die verder liggen dan scooters net buiten het
+        # vak; zoek daarom nog één keer binnen de afstand van de n-de kandidaat.
+        kth_distance = candidates[min(n, len(candidates)) - 1][0]
+        if kth_distance > radius:
+            candidates = self.within_radius(lat, lon, kth_distance, available_only, min_soc)
+        return candidates[:n]
@@ -0,0 +1,136 @@
+import heapq
+import threading
+from datetime import date
+
+from config import (
+    MAINTENANCE_POINTS_PER_DAY, MAINTENANCE_POINTS_PER_KM, MAINTENANCE_OUT_OF_SERVICE_POINTS,
+    MAINTENANCE_LOW_SOC, MAINTENANCE_LOW_SOC_POINTS, MAINTENANCE_UNKNOWN_DAYS,
+)
+
+# Bij een nieuwe onderhoudsdatum de kilometerstand van dat moment vastleggen
+MAINTENANCE_SCHEMA = """
+CREATE TRIGGER IF NOT EXISTS scooters_maintenance_mileage
+AFTER UPDATE OF last_maintenance ON scooters
+WHEN NEW.last_maintenance IS NOT OLD.last_maintenance
+BEGIN
+    UPDATE scooters SET mileage_at_maintenance = NEW.mileage WHERE id = NEW.id;
+END;
+"""
+
+
+def _day_number(value):
+    # "YYYY-MM-DD" of "YYYY-MM-DD HH:MM:SS" -> dagnummer; None als onbekend/ongeldig
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def score_parts(state):
+    """Onderdelen van de onderhoudsscore die niet van de datum van vandaag afhangen.
+
+    Geeft (vaste punten, dagnummer van laatste onderhoud) terug; de score op
+    dag d is vaste punten + MAINTENANCE_POINTS_PER_DAY * (d - dagnummer).
+    """
+    points = 0.0
+    if state.mileage is not None:
+        points += MAINTENANCE_POINTS_PER_KM * max(0, state.mileage - (state.mileage_at_maintenance or 0))
+    if state.out_of_service:
+        points += MAINTENANCE_OUT_OF_SERVICE_POINTS
+    if state.soc is not None and state.soc < MAINTENANCE_LOW_SOC:
+        points += MAINTENANCE_LOW_SOC_POINTS
+
+    serviced = _day_number(state.last_maintenance) or _day_number(state.in_service_date)
+    if serviced is None:
+        serviced = date.today().toordinal() - MAINTENANCE_UNKNOWN_DAYS
+    return points, serviced
+
+
+def maintenance_score(state, today=None):
+    points, serviced = score_parts(state)
+    today = (today or date.today()).toordinal()
+    return points + MAINTENANCE_POINTS_PER_DAY * (today - serviced)
+
+
+class MaintenancePlanner:
+    """Houdt alle scooters in een heap op onderhoudsprioriteit.
+
+    Omdat elke scooter even snel veroudert, verandert de volgorde niet door
+    het verstrijken van de tijd: de heap sleutel is de score zonder de
+    "vandaag" term. Alleen gewijzigde scooters worden opnieuw gescoord; ze
+    komen via de FleetCache change feed binnen (edits én telemetrie).
+    Oude heap entries worden lui overgeslagen en af en toe opgeruimd.
+    """
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self._lock = threading.Lock()
+        self._heap = []
+        self._keys = {}
+        self._states = {}
+        self._reset(fleet.subscribe(self._on_change))
+
+    @staticmethod
+    def _key(state):
+        points, serviced = score_parts(state)
+        return points - MAINTENANCE_POINTS_PER_DAY * serviced
+
+    def _reset(self, states):
+        with self._lock:
+            self._states = {state.id: state for state in states}
+            self._keys = {state.id: self._key(state) for state in states}
+            self._heap = [(-key, scooter_id) for scooter_id, key in self._keys.items()]
+            heapq.heapify(self._heap)
+
+    def _on_change(self, changed, removed):
+        with self._lock:
+            for scooter_id in removed:
+                self._keys.pop(scooter_id, None)
+                self._states.pop(scooter_id, None)
+            for state in changed:
+                key = self._key(state)
+                self._states[state.id] = state
+                if self._keys.get(state.id) != key:
+                    self._keys[state.id] = key
+                    heapq.heappush(self._heap, (-key, state.id))
+            # Opruimen als de heap vooral uit verouderde entries bestaat
+            if len(self._heap) > 2 * len(self._keys) + 64:
+                self._heap = [(-key, scooter_id) for scooter_id, key in self._keys.items()]
+                heapq.heapify(self._heap)
+
+    def _pop_valid(self):
+        while self._heap:
+            negative_key, scooter_id = heapq.heappop(self._heap)
+            if self._keys.get(scooter_id) == -negative_key:
+                return negative_key, scooter_id
+        return None
+
+    def next_due(self, count=10, today=None):
+        """De `count` scooters die het eerst onderhoud nodig hebben: [(score, ScooterState), ...]."""
+        # Buiten de eigen lock: refresh kan _on_change aanroepen
+        self.fleet.refresh()
+        day = (today or date.today()).toordinal()
+        result = []
+        with self._lock:
+            popped = []
+            seen = set()
+            while len(popped) < count:
+                entry = self._pop_valid()
+                if entry is None:
+                    break
+                # Een sleutel die terugkeert naar een oude waarde staat er twee keer in
+                if entry[1] in seen:
+                    continue
+                seen.add(entry[1])
+                popped.append(entry)
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+                negative_key, scooter_id = entry
+                result.append((-negative_key + MAINTENANCE_POINTS_PER_DAY * day, self._states[scooter_id]))
+        return result
+
+    def close(self):
+        self.fleet.unsubscribe(self._on_change)
+
@@ -1,24 +1,113 @@
+from datetime import datetime
+
+from management.fleet import EDITABLE_COLUMNS
+
+# Rotterdam gebied coördinaten
+ROTTERDAM_BOUNDS = {
+    'min_lat': 51.85, 'max_lat': 52.00,
+    'min_lon': 4.30, 'max_lon': 4.55,
+}
+
+# Velden die een rol mag wijzigen
+ROLE_FIELDS = {
+    'superadmin': ['all'],
+    'sysadmin': ['all'],
+    'engineer': ['soc', 'mileage', 'out_of_service']
+}
+
+# Type en grenzen per veld, gelijk aan de CHECK constraints van de scooters tabel
+FIELD_RULES = {
+    'top_speed': (int, 0, 100),
+    'battery_capacity': (int, 0, 100),
+    'soc': (int, 0, 100),
+    'target_range_min': (int, 0, None),
+    'target_range_max': (int, 0, None),
+    'latitude': (float, -90, 90),
+    'longitude': (float, -180, 180),
+    'out_of_service': (int, 0, 1),
+    'mileage': (int, 0, None),
+    'mileage_at_maintenance': (int, 0, None),
+}
+
+def within_bounds(lat, lon):
+    return (ROTTERDAM_BOUNDS['min_lat'] <= lat <= ROTTERDAM_BOUNDS['max_lat']) and \
+        (ROTTERDAM_BOUNDS['min_lon'] <= lon <= ROTTERDAM_BOUNDS['max_lon'])
+
+def filter_fields(updates, role):
+    allowed_fields = ROLE_FIELDS.get(role, [])
+    if 'all' in allowed_fields:
+        return dict(updates)
+    return {k: v for k, v in updates.items() if k in allowed_fields}
+
+def validate_fields(updates):
+    """Zet invoer om naar het juiste type en controleert de grenzen; gooit ValueError."""
+    values = {}
+    for field, value in updates.items():
+        rule = FIELD_RULES.get(field)
+        if rule is not None and value is not None:
+            convert, low, high = rule
+            try:
+                value = convert(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Ongeldige waarde voor {field}: {value}")
+            if (low is not None and value < low) or (high is not None and value > high):
+                raise ValueError(f"Waarde voor {field} buiten bereik: {value}")
+        elif field == 'last_maintenance' and value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise ValueError(f"Ongeldige datum voor {field}: {value}")
+        values[field] = value
+    return values
+
 class ScooterManager:
-    def __init__(self, conn):
+    def __init__(self, conn, fleet=None, writer=None):
         self.conn = conn
+        # Optionele FleetCache; updates lopen dan write-through via de cache
+        self.fleet = fleet
+        # Optionele ScooterWriteBehind; updates gaan dan via group commit
+        self.writer = writer
 
     def validate_gps(self, lat, lon):
-        # Rotterdam gebied coördinaten
-        return (51.85 <= lat <= 52.00) and (4.30 <= lon <= 4.55)
+        return within_bounds(lat, lon)
     
+    @staticmethod
     def validate_location(lat, lon):
-        return (51.85 <= lat <= 52.00) and (4.30 <= lon <= 4.55)
+        return within_bounds(lat, lon)
+
+    def update_scooter(self, scooter_id, updates, role, commit=True, actor=None, durability=None):
+        updates = filter_fields(updates, role)
+        unknown = set(updates) - EDITABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Onbekende scooter velden: {', '.join(sorted(unknown))}")
+        if not updates:
+            return False
+        updates = validate_fields(updates)
 
-    def update_scooter(self, scooter_id, updates, role):
-        allowed_fields = {
-            'superadmin': ['all'],
-            'sysadmin': ['all'],
-            'engineer': ['soc', 'mileage', 'out_of_service']
-        }.get(role, [])
+        if 'latitude' in updates or 'longitude' in updates:
+            current = self.conn.execute(
+                "SELECT latitude, longitude FROM scooters WHERE id = ?", (scooter_id,)
+            ).fetchone() or (None, None)
+            lat = updates.get('latitude', current[0])
+            lon = updates.get('longitude', current[1])
+            if lat is None or lon is None or not within_bounds(lat, lon):
+                raise ValueError("Locatie ligt buiten Rotterdam")
 
-        if 'all' not in allowed_fields:
-            updates = {k: v for k, v in updates.items() if k in allowed_fields}
+        updates['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if self.writer is not None:
+            ticket = self.writer.update(scooter_id, updates, actor=actor, durability=durability)
+            if ticket.found is not None:
+                return ticket.found
+            # "buffered": de update staat nog in de wachtrij, controleer alleen of de scooter bestaat
+            return self.conn.execute("SELECT 1 FROM scooters WHERE id = ?", (scooter_id,)).fetchone() is not None
+        if self.fleet is not None:
+            return self.fleet.update(scooter_id, updates) is not None
 
         cursor = self.conn.cursor()
-        # Update query uitvoeren
-        self.conn.commit()
\ No newline at end of file
+        cursor.execute(
+            f"UPDATE scooters SET {', '.join(f'{column} = ?' for column in updates)} WHERE id = ?",
+            [*updates.values(), scooter_id],
+        )
+        if commit:
+            self.conn.commit()
+        return cursor.rowcount > 0
@@ -0,0 +1,169 @@
+import difflib
+
+from config import SEARCH_LIMIT, SEARCH_CANDIDATES, SEARCH_MIN_SIMILARITY
+from database.connection import get_pool, execute_statements
+
+SEARCH_FIELDS = ("first_name", "last_name", "street_name", "zip_code", "city")
+
+# bm25 gewichten in de volgorde van SEARCH_FIELDS; namen tellen zwaarder dan adres
+FIELD_WEIGHTS = (2.0, 3.0, 1.0, 1.0, 1.0)
+
+# Per zoekopdracht via `rank MATCH ?`: FTS5 sorteert dan zelf op deze bm25
+RANK_FUNCTION = f"bm25({', '.join(str(weight) for weight in FIELD_WEIGHTS)})"
+
+# FTS5 index met trigram tokenizer op de (onversleutelde) naam- en adresvelden.
+# External content: de tekst staat alleen in travellers, triggers houden de
+# index gelijk.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS travellers_fts USING fts5(
+    first_name, last_name, street_name, zip_code, city,
+    content='travellers', content_rowid='id', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS travellers_fts_insert AFTER INSERT ON travellers
+BEGIN
+    INSERT INTO travellers_fts (rowid, first_name, last_name, street_name, zip_code, city)
+    VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.street_name, NEW.zip_code, NEW.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS travellers_fts_delete AFTER DELETE ON travellers
+BEGIN
+    INSERT INTO travellers_fts (travellers_fts, rowid, first_name, last_name, street_name, zip_code, city)
+    VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.street_name, OLD.zip_code, OLD.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS travellers_fts_update
+AFTER UPDATE OF id, first_name, last_name, street_name, zip_code, city ON travellers
+BEGIN
+    INSERT INTO travellers_fts (travellers_fts, rowid, first_name, last_name, street_name, zip_code, city)
+    VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.street_name, OLD.zip_code, OLD.city);
+    INSERT INTO travellers_fts (rowid, first_name, last_name, street_name, zip_code, city)
+    VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.street_name, NEW.zip_code, NEW.city);
+END;
+"""
+
+RESULT_COLUMNS = "t.id, t.first_name, t.last_name, t.street_name, t.house_number, t.zip_code, t.city, t.email, t.phone_number"
+
+
+def ensure_search_index(conn, commit=True):
+    """Maakt de FTS5 index en triggers aan en bouwt de index op vanuit travellers."""
+    execute_statements(conn, SEARCH_SCHEMA)
+    conn.execute("INSERT INTO travellers_fts (travellers_fts) VALUES ('rebuild')")
+    if commit:
+        conn.commit()
+
+
+def _quote(term):
+    # FTS5 string literal: dubbele quotes verdubbelen
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _typo_pattern(term):
+    """FTS5 expressie die `term` ook met één tikfout nog vindt.
+
+    Eén tikfout raakt maar één helft van een term, dus bij 6+ tekens is
+    "linkerhelft OR rechterhelft" genoeg; kortere termen vallen terug op
+    hun losse trigrams.
+    """
+    if len(term) >= 6:
+        half = len(term) // 2
+        parts = [term[:half], term[half:]]
+    else:
+        parts = sorted({term[i:i + 3] for i in range(len(term) - 2)})
+    return "(" + " OR ".join(_quote(part) for part in parts) + ")"
+
+
+def _similarity(terms, values):
+    # Beste overeenkomst per zoekterm met een van de velden, gemiddeld over de termen
+    values = [value.lower() for value in values if value]
+    if not values:
+        return 0.0
+    total = 0.0
+    for term in terms:
+        total += max(difflib.SequenceMatcher(None, term, value).ratio() for value in values)
+    return total / len(terms)
+
+
+def _prefix_hits(terms, values):
+    values = [value.lower() for value in values if value]
+    return sum(1 for term in terms for value in values if value.startswith(term))
+
+
+class TravellerSearch:
+    """Zoekt travellers op naam, straat, postcode of woonplaats.
+
+    Eerst een exacte trigram zoekopdracht (elke term als substring, dus ook
+    prefixen). Levert dat niets op, dan een fuzzy zoekopdracht waarin elke
+    term met één tikfout nog matcht. FTS5 sorteert alle matches op bm25
+    (`ORDER BY rank`) en alleen de beste SEARCH_CANDIDATES worden daarna in
+    Python opnieuw gescoord.
+    """
+
+    def __init__(self, db_name, limit=SEARCH_LIMIT, candidates=SEARCH_CANDIDATES):
+        self.pool = get_pool(db_name)
+        self.limit = limit
+        self.candidates = candidates
+
+    @staticmethod
+    def _terms(query):
+        return [term for term in query.lower().replace('"', " ").split() if term]
+
+    def search(self, query, limit=None):
+        """Geeft (rijen, fuzzy) terug; rijen volgen RESULT_COLUMNS."""
+        limit = limit or self.limit
+        terms = self._terms(query)
+        if not terms:
+            return [], False
+
+        indexed = [term for term in terms if len(term) >= 3]
+        with self.pool.connection() as conn:
+            if not indexed:
+                return self._short(conn, terms, limit), False
+
+            match = " AND ".join(_quote(term) for term in indexed)
+            rows = self._ranked(conn, match, terms, limit, fuzzy=False)
+            if rows:
+                return rows, False
+            match = " AND ".join(_typo_pattern(term) for term in indexed)
+            return self._ranked(conn, match, terms, limit, fuzzy=True), True
+
+    @staticmethod
+    def _short(conn, terms, limit):
+        # Trigrams hebben minstens 3 tekens nodig: korte termen als prefix
+        # op de naam via de listing index
+        where = " AND ".join("(t.last_name LIKE ? OR t.first_name LIKE ?)" for _ in terms)
+        params = [p for term in terms for p in (term + "%", term + "%")]
+        return conn.execute(f"""
+            SELECT {RESULT_COLUMNS} FROM travellers t
+            WHERE {where} ORDER BY t.last_name, t.id LIMIT ?
+        """, params + [limit]).fetchall()
+
+    def _ranked(self, conn, match, terms, limit, fuzzy):
+        # Eerst de beste kandidaten op bm25, niet de eerste op rowid
+        candidates = conn.execute(f"""
+            SELECT {RESULT_COLUMNS}, c.score
+            FROM (
+                SELECT rowid AS id, rank AS score
+                FROM travellers_fts WHERE travellers_fts MATCH ? AND rank MATCH ?
+                ORDER BY rank LIMIT ?
+            ) c JOIN travellers t ON t.id = c.id
+        """, (match, RANK_FUNCTION, self.candidates)).fetchall()
+
+        scored = []
+        for row in candidates:
+            values = [row[1], row[2], row[3], row[5], row[6]]
+            short = [term for term in terms if len(term) < 3]
+            # Korte termen moeten als prefix van een veld voorkomen
+            if short and _prefix_hits(short, values) < len(short):
+                continue
+            if fuzzy:
+                similarity = _similarity(terms, values)
+                if similarity < SEARCH_MIN_SIMILARITY:
+                    continue
+                key = (-similarity, row[-1])
+            else:
+                # Velden die met een zoekterm beginnen eerst, daarna bm25 (lager is beter)
+                key = (-_prefix_hits(terms, values), row[-1])
+            scored.append((key, row[:-1]))
+        scored.sort(key=lambda item: item[0])
+        return [row for _, row in scored[:limit]]
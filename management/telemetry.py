@@ -0,0 +1,195 @@
+import csv
+import json
+import logging
+import sys
+from datetime import datetime
+
+from config import TELEMETRY_BATCH_SIZE
+from database.connection import get_pool
+from .scooters import within_bounds, filter_fields
+
+TELEMETRY_FIELDS = ('soc', 'latitude', 'longitude', 'mileage')
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Eén vaste statement voor elke batch; ontbrekende of niet toegestane velden
+# zijn NULL en laten via COALESCE de huidige waarde staan. Oudere meetwaarden
+# overschrijven nooit een nieuwere update.
+UPDATE_SQL = """
+    UPDATE scooters
+    SET soc = COALESCE(?, soc),
+        latitude = COALESCE(?, latitude),
+        longitude = COALESCE(?, longitude),
+        mileage = COALESCE(?, mileage),
+        last_updated = ?
+    WHERE serial_number = ?
+      AND (last_updated IS NULL OR last_updated <= ?)
+"""
+
+
+def read_records(path):
+    """Leest een JSONL of CSV telemetrie-feed regel voor regel."""
+    if str(path).lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield {k: (v if v != "" else None) for k, v in row.items()}
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Ongeldige regel wordt door validate_record afgewezen
+                    yield None
+
+
+def _parse_timestamp(value):
+    if value is None:
+        return datetime.now().strftime(TIMESTAMP_FORMAT)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).strftime(TIMESTAMP_FORMAT)
+    return datetime.fromisoformat(str(value)).strftime(TIMESTAMP_FORMAT)
+
+
+def validate_record(record):
+    """Zet een ruw telemetrie-record om naar getypeerde waarden.
+
+    Gooit ValueError met een Nederlandse reden als het record ongeldig is.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Ongeldig record")
+
+    serial_number = record.get('serial_number')
+    if not serial_number or len(serial_number) > 17:
+        raise ValueError("Ongeldig serienummer")
+
+    clean = {'serial_number': serial_number, 'timestamp': _parse_timestamp(record.get('timestamp'))}
+
+    if record.get('soc') is not None:
+        soc = int(record['soc'])
+        if not 0 <= soc <= 100:
+            raise ValueError("SOC moet tussen 0 en 100 liggen")
+        clean['soc'] = soc
+
+    if record.get('mileage') is not None:
+        mileage = int(record['mileage'])
+        if mileage < 0:
+            raise ValueError("Kilometerstand mag niet negatief zijn")
+        clean['mileage'] = mileage
+
+    lat, lon = record.get('latitude'), record.get('longitude')
+    if (lat is None) != (lon is None):
+        raise ValueError("Latitude en longitude moeten samen aangeleverd worden")
+    if lat is not None:
+        lat, lon = float(lat), float(lon)
+        if not within_bounds(lat, lon):
+            raise ValueError("Locatie valt buiten het Rotterdam gebied")
+        clean['latitude'] = lat
+        clean['longitude'] = lon
+
+    return clean
+
+
+def _merge(previous, params):
+    # Nieuwste meting wint per veld, oudere meting vult ontbrekende velden aan
+    older, newer = (previous, params) if previous[4] <= params[4] else (params, previous)
+    values = tuple(n if n is not None else o for n, o in zip(newer[:4], older[:4]))
+    return values + newer[4:]
+
+
+class IngestResult:
+    __slots__ = ('received', 'applied', 'rejected', 'batches', 'errors')
+
+    def __init__(self):
+        self.received = 0
+        self.applied = 0
+        self.rejected = 0
+        self.batches = 0
+        self.errors = []
+
+    def __repr__(self):
+        return (f"IngestResult(received={self.received}, applied={self.applied}, "
+                f"rejected={self.rejected}, batches={self.batches})")
+
+
+class TelemetryIngestor:
+    def __init__(self, db_name, role, batch_size=TELEMETRY_BATCH_SIZE, max_errors=1000):
+        self.pool = get_pool(db_name)
+        self.role = role
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def _to_params(self, record):
+        updates = filter_fields({k: record[k] for k in TELEMETRY_FIELDS if k in record}, self.role)
+        # Locatie alleen als paar toepassen
+        if ('latitude' in updates) != ('longitude' in updates):
+            updates.pop('latitude', None)
+            updates.pop('longitude', None)
+        if not updates:
+            return None
+        return (
+            updates.get('soc'), updates.get('latitude'), updates.get('longitude'),
+            updates.get('mileage'), record['timestamp'], record['serial_number'],
+            record['timestamp'],
+        )
+
+    def _flush(self, batch, result):
+        if not batch:
+            return
+        with self.pool.transaction() as conn:
+            cursor = conn.executemany(UPDATE_SQL, batch.values())
+            result.applied += max(cursor.rowcount, 0)
+        result.batches += 1
+        batch.clear()
+
+    def _reject(self, result, line_number, reason):
+        result.rejected += 1
+        if len(result.errors) < self.max_errors:
+            result.errors.append((line_number, reason))
+
+    def ingest(self, records):
+        result = IngestResult()
+        # Metingen per serienummer samenvoegen tot één update per batch
+        batch = {}
+        pending = 0
+
+        for line_number, raw in enumerate(records, 1):
+            result.received += 1
+            try:
+                record = validate_record(raw)
+            except (ValueError, TypeError) as e:
+                self._reject(result, line_number, str(e))
+                continue
+
+            params = self._to_params(record)
+            if params is None:
+                self._reject(result, line_number, f"Geen velden toegestaan voor rol {self.role}")
+                continue
+
+            previous = batch.get(record['serial_number'])
+            batch[record['serial_number']] = params if previous is None else _merge(previous, params)
+            pending += 1
+
+            if pending >= self.batch_size:
+                self._flush(batch, result)
+                pending = 0
+
+        self._flush(batch, result)
+        logging.info(f"Telemetrie verwerkt: {result}")
+        return result
+
+    def ingest_file(self, path):
+        return self.ingest(read_records(path))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Gebruik: python -m management.telemetry <database> <feed.jsonl|feed.csv> [rol]")
+        sys.exit(1)
+    ingestor = TelemetryIngestor(sys.argv[1], sys.argv[3] if len(sys.argv) > 3 else "sysadmin")
+    result = ingestor.ingest_file(sys.argv[2])
+    print(result)
+    for line_number, reason in result.errors[:20]:
+        print(f"Regel {line_number}: {reason}")
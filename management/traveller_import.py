@@ -0,0 +1,315 @@
+"""Bulk import van travellers uit CSV of JSONL (bijv. klantlijsten van partners).
+
+Rijen worden in chunks over worker processen verdeeld die ze valideren
+met dezelfde regels als register_traveller (normalize_traveller), het
+e-mailadres versleutelen en de blind indexen berekenen. Het hoofdproces
+voegt elke chunk in één transactie in en legt in dezelfde transactie de
+voortgang vast in import_progress, zodat een afgebroken import verder gaat
+waar hij gebleven was.
+
+    python -m management.traveller_import scooter_management.db partners.csv
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from config import IMPORT_CHUNK_SIZE, IMPORT_WORKERS
+from database.connection import get_pool
+from database.encryption import EncryptionManager
+from .telemetry import read_records
+from .travellers import normalize_traveller
+
+IMPORT_FIELDS = ('first_name', 'last_name', 'birthday', 'gender', 'street_name', 'house_number',
+                 'zip_code', 'city', 'email', 'license_number', 'phone_number')
+
+IMPORT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    imported INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    finished_at TEXT,
+    updated_at TEXT
+);
+"""
+
+INSERT_SQL = f"""
+    INSERT INTO travellers ({', '.join(IMPORT_FIELDS)}, email_bidx, license_number_bidx)
+    VALUES ({', '.join('?' for _ in IMPORT_FIELDS)}, ?, ?)
+"""
+
+# Ruim onder de SQLite limiet voor het aantal parameters per statement
+LOOKUP_BATCH = 500
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def file_fingerprint(path, sample_bytes=64 * 1024):
+    """Grootte + hash van het begin van het bestand; verandert het bestand, dan begint de import opnieuw."""
+    path = Path(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(sample_bytes))
+    return f"{path.stat().st_size}:{digest.hexdigest()}"
+
+
+# 🔐 Worker processen: validatie en versleuteling per chunk
+
+_worker_encryption = None
+
+
+def _init_worker(key_file):
+    global _worker_encryption
+    _worker_encryption = EncryptionManager(key_file, cache_size=0, workers=1)
+
+
+def prepare_chunk(chunk, encryption=None):
+    """Valideert en versleutelt een chunk [(rijnummer, record), ...].
+
+    Geeft (geaccepteerd, afgewezen) terug: geaccepteerd is een lijst van
+    (rijnummer, rijbewijsnummer, insert parameters), afgewezen een lijst van
+    (rijnummer, reden).
+    """
+    encryption = encryption or _worker_encryption
+    accepted = []
+    rejected = []
+    for number, record in chunk:
+        if not isinstance(record, dict):
+            rejected.append((number, "Ongeldig record"))
+            continue
+        try:
+            data = normalize_traveller(record)
+        except (ValueError, TypeError) as e:
+            rejected.append((number, str(e)))
+            continue
+        email_bidx = encryption.blind_index('email', data['email'])
+        license_bidx = encryption.blind_index('license_number', data['license_number'])
+        # Rijbewijs en telefoon blijven leesbaar zoals bij register_traveller:
+        # het schema controleert hun lengte
+        data['email'] = encryption.encrypt(data['email'])
+        params = tuple(data.get(field) for field in IMPORT_FIELDS) + (email_bidx, license_bidx)
+        accepted.append((number, data['license_number'], params))
+    return accepted, rejected
+
+
+class ImportResult:
+    __slots__ = ('read', 'skipped', 'imported', 'rejected', 'chunks', 'finished', 'errors')
+
+    def __init__(self):
+        self.read = 0
+        self.skipped = 0
+        self.imported = 0
+        self.rejected = 0
+        self.chunks = 0
+        self.finished = False
+        self.errors = []
+
+    def __repr__(self):
+        return (f"ImportResult(read={self.read}, skipped={self.skipped}, imported={self.imported}, "
+                f"rejected={self.rejected}, chunks={self.chunks}, finished={self.finished})")
+
+
+class TravellerImporter:
+    """Importeert een traveller bestand in chunks, hervatbaar na een fout.
+
+    Afgewezen rijen (validatie of rijbewijs dat al bestaat) komen met
+    rijnummer en reden in een rejects bestand (JSONL), zonder de
+    persoonsgegevens zelf.
+    """
+
+    def __init__(self, db_name, key_file="secret.key", chunk_size=IMPORT_CHUNK_SIZE,
+                 workers=IMPORT_WORKERS, max_errors=1000):
+        self.pool = get_pool(db_name)
+        self.key_file = key_file
+        self.encryption = EncryptionManager(key_file, cache_size=0, workers=1)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.max_errors = max_errors
+
+    # 📌 Voortgang
+
+    def _progress(self, conn, source, fingerprint):
+        row = conn.execute(
+            "SELECT fingerprint, rows_done, finished_at FROM import_progress WHERE source = ?",
+            (source,),
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            if row is not None:
+                logging.warning(f"Importbestand {source} is gewijzigd, import begint opnieuw")
+            conn.execute(
+                "INSERT OR REPLACE INTO import_progress (source, fingerprint, updated_at) VALUES (?, ?, ?)",
+                (source, fingerprint, datetime.now().strftime(TIMESTAMP_FORMAT)),
+            )
+            conn.commit()
+            return 0, None
+        return row[1], row[2]
+
+    def reset(self, path):
+        """Vergeet de voortgang van `path`; de volgende run begint bij de eerste rij."""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM import_progress WHERE source = ?", (str(Path(path).resolve()),))
+
+    # 📥 Invoegen
+
+    @staticmethod
+    def _existing(conn, licenses):
+        # Rijbewijsnummers staan leesbaar in de tabel, met een UNIQUE index
+        found = set()
+        for start in range(0, len(licenses), LOOKUP_BATCH):
+            part = licenses[start:start + LOOKUP_BATCH]
+            found.update(row[0] for row in conn.execute(
+                f"SELECT license_number FROM travellers WHERE license_number IN "
+                f"({', '.join('?' for _ in part)})", part))
+        return found
+
+    def _insert_chunk(self, conn, source, accepted, rejected, rows_done, write_rejects):
+        """Voegt één chunk in en legt de voortgang vast, alles in één transactie.
+
+        `write_rejects(rejected)` draait vlak vóór de commit: wat als verwerkt
+        is vastgelegd, staat dan ook in het rejects bestand.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self._existing(conn, [license for _, license, _ in accepted])
+            rows = []
+            for number, license, params in accepted:
+                if license in existing:
+                    rejected.append((number, "Rijbewijsnummer bestaat al"))
+                    continue
+                # Ook dubbelen binnen dezelfde chunk afwijzen
+                existing.add(license)
+                rows.append(params)
+            conn.executemany(INSERT_SQL, rows)
+            rejected.sort()
+            conn.execute("""
+                UPDATE import_progress
+                SET rows_done = ?, imported = imported + ?, rejected = rejected + ?, updated_at = ?
+                WHERE source = ?
+            """, (rows_done, len(rows), len(rejected), datetime.now().strftime(TIMESTAMP_FORMAT), source))
+            write_rejects(rejected)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(rows)
+
+    # 🚚 Import
+
+    @staticmethod
+    def _trim_rejects(rejects_path, rows_done):
+        # Rejects van een chunk die wel geschreven maar niet gecommit is, komen
+        # bij het hervatten opnieuw: alleen regels tot en met rows_done bewaren
+        if not rejects_path.exists():
+            return
+        temp_path = rejects_path.with_name(rejects_path.name + ".tmp")
+        with open(rejects_path, encoding="utf-8") as source, open(temp_path, "w", encoding="utf-8") as target:
+            for line in source:
+                try:
+                    keep = json.loads(line)["row"] <= rows_done
+                except (ValueError, KeyError, TypeError):
+                    keep = False
+                if keep:
+                    target.write(line)
+        os.replace(temp_path, rejects_path)
+
+    def _chunks(self, records, start, result):
+        chunk = []
+        for number, record in enumerate(records, 1):
+            if number <= start:
+                result.skipped += 1
+                continue
+            chunk.append((number, record))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _prepared(self, chunks):
+        # Chunks in volgorde teruggeven; hooguit 2 per worker tegelijk onderweg
+        # zodat het geheugengebruik niet met de bestandsgrootte meegroeit
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield chunk[-1][0], prepare_chunk(chunk, self.encryption)
+            return
+
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(self.key_file,)) as executor:
+            pending = deque()
+            try:
+                for chunk in chunks:
+                    pending.append((chunk[-1][0], executor.submit(prepare_chunk, chunk)))
+                    if len(pending) >= 2 * self.workers:
+                        last, future = pending.popleft()
+                        yield last, future.result()
+                while pending:
+                    last, future = pending.popleft()
+                    yield last, future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def import_file(self, path, rejects_path=None):
+        path = Path(path)
+        source = str(path.resolve())
+        rejects_path = Path(rejects_path) if rejects_path else path.with_name(path.name + ".rejects.jsonl")
+        result = ImportResult()
+
+        with self.pool.connection() as conn:
+            rows_done, finished_at = self._progress(conn, source, file_fingerprint(path))
+            if finished_at:
+                logging.info(f"Import van {source} was al voltooid op {finished_at}")
+                result.skipped = rows_done
+                result.finished = True
+                return result
+
+            # Bij een verse start een leeg rejects bestand, bij hervatten aanvullen
+            if rows_done:
+                self._trim_rejects(rejects_path, rows_done)
+            with open(rejects_path, "a" if rows_done else "w", encoding="utf-8") as rejects:
+                def write_rejects(chunk_rejects):
+                    for number, reason in chunk_rejects:
+                        rejects.write(json.dumps({"row": number, "reason": reason}) + "\n")
+                    rejects.flush()
+                    os.fsync(rejects.fileno())
+
+                for last, (accepted, chunk_rejects) in self._prepared(
+                        self._chunks(read_records(path), rows_done, result)):
+                    result.read += len(accepted) + len(chunk_rejects)
+                    result.imported += self._insert_chunk(conn, source, accepted, chunk_rejects, last,
+                                                          write_rejects)
+                    result.rejected += len(chunk_rejects)
+                    result.chunks += 1
+                    for number, reason in chunk_rejects:
+                        if len(result.errors) < self.max_errors:
+                            result.errors.append((number, reason))
+
+            conn.execute("UPDATE import_progress SET finished_at = ? WHERE source = ?",
+                         (datetime.now().strftime(TIMESTAMP_FORMAT), source))
+            conn.commit()
+        result.finished = True
+        logging.info(f"Traveller import {source}: {result}")
+        return result
+
+    def close(self):
+        self.encryption.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Gebruik: python -m management.traveller_import <database> <bestand.csv|bestand.jsonl> "
+              "[rejects.jsonl]")
+        sys.exit(1)
+    importer = TravellerImporter(sys.argv[1])
+    result = importer.import_file(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    importer.close()
+    print(result)
+    for row_number, reason in result.errors[:20]:
+        print(f"Rij {row_number}: {reason}")
@@ -1,35 +1,93 @@
 import re
-from datetime import datetime
-from ..config import CITIES
-from ..database.encryption import EncryptionManager
+from config import CITIES
+from database.blind_index import blind_index_values, exists, lookup
+
+# Zelfde formaten als register_traveller in main.py
+ZIP_CODE_PATTERN = r'^[1-9][0-9]{3}[A-Z]{2}$'
+LICENSE_NUMBER_PATTERN = r'^\d{4}[A-Z]{2}\d{4}$'
+PHONE_NUMBER_PATTERN = r'^[0-9]{10}$'
+
+def normalize_traveller(data):
+    """Valideert traveller velden zoals register_traveller; geeft een opgeschoonde dict of ValueError."""
+    cleaned = {key: (value.strip() if isinstance(value, str) else value) for key, value in data.items()}
+    for field in ('first_name', 'last_name'):
+        if not cleaned.get(field):
+            raise ValueError(f"{field} mag niet leeg zijn")
+
+    cleaned['zip_code'] = str(cleaned.get('zip_code') or '').upper().replace(" ", "")
+    if not re.match(ZIP_CODE_PATTERN, cleaned['zip_code']):
+        raise ValueError("Ongeldige postcode")
+
+    email = str(cleaned.get('email') or '')
+    if '@' not in email or '.' not in email.split('@')[-1]:
+        raise ValueError("Ongeldig e-mail formaat")
+
+    cleaned['license_number'] = str(cleaned.get('license_number') or '').upper().replace(" ", "")
+    if not re.match(LICENSE_NUMBER_PATTERN, cleaned['license_number']):
+        raise ValueError("Ongeldig rijbewijsnummer")
+
+    cleaned['phone_number'] = str(cleaned.get('phone_number') or '').replace(" ", "")
+    if not re.match(PHONE_NUMBER_PATTERN, cleaned['phone_number']):
+        raise ValueError("Ongeldig telefoonnummer")
+
+    if cleaned.get('gender'):
+        cleaned['gender'] = str(cleaned['gender']).upper()
+    return cleaned
 
 class TravellerManager:
     def __init__(self, conn, encryption):
         self.conn = conn
         self.encryption = encryption
 
+    @staticmethod
     def validate_license_number(number):
-        return re.match(r'^\d{4}[A-Z]{2}$', number) is not None
+        return re.match(LICENSE_NUMBER_PATTERN, number) is not None
     
+    @staticmethod
     def format_phone_number(phone): 
         return f"+31-6-{phone}" if re.match(r'^\d{8}$', phone) else None
     
+    def find_by_license(self, license_number):
+        return self._find('license_number', license_number)
+
+    def find_by_email(self, email):
+        return self._find('email', email)
+
+    def _find(self, field, value):
+        # Indexed zoeken (blind index of de leesbare kolom) in plaats van alle rijen te ontsleutelen
+        column, value = lookup(self.encryption, 'travellers', field, value)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT * FROM travellers WHERE {column} = ?
+        """, (value,))
+        return cursor.fetchall()
+
     def add_traveller(self, data):
-        if not self.validate_license(data['license_number']):
-            raise ValueError("Ongeldig rijbewijsnummer")
-        
-        if data['city'] not in CITIES:
+        data = normalize_traveller(data)
+        if data.get('city') not in CITIES:
             raise ValueError("Ongeldige stad")
 
-        encrypted_data = {
-            'email': self.encryption.encrypt(data['email']),
-            'license_number': self.encryption.encrypt(data['license_number']),
-            'phone_number': self.encryption.encrypt(f"+31-6-{data['phone_number']}")
-        }
+        if exists(self.conn, self.encryption, 'travellers', 'license_number', data['license_number']):
+            raise ValueError("Rijbewijsnummer bestaat al")
+
+        # E-mail versleuteld zoals bij de import, met een HMAC blind index om op
+        # te zoeken; rijbewijs en telefoon leesbaar, het schema controleert hun lengte
+        bidx = blind_index_values(self.encryption, 'travellers', data)
+        data['email'] = self.encryption.encrypt(data['email'])
 
         cursor = self.conn.cursor()
         cursor.execute("""
-            INSERT INTO travellers (..., registration_date)
-            VALUES (..., ?)
-        """, (..., datetime.now()))
-        self.conn.commit()
\ No newline at end of file
+            INSERT INTO travellers (
+                first_name, last_name, birthday, gender, street_name, house_number,
+                zip_code, city, email, license_number, phone_number,
+                email_bidx, license_number_bidx
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            data['first_name'], data['last_name'], data.get('birthday'), data.get('gender'),
+            data.get('street_name'), data.get('house_number'), data['zip_code'], data['city'],
+            data['email'], data['license_number'], data['phone_number'],
+            bidx['email_bidx'], bidx['license_number_bidx']
+        ))
+        self.conn.commit()
+        return cursor.lastrowid
@@ -0,0 +1,361 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import (BUSY_TIMEOUT_MS, SCOOTER_WRITE_BATCH, SCOOTER_WRITE_INTERVAL, SCOOTER_WRITE_QUEUE,
+                    SCOOTER_WRITE_DURABILITY)
+from database.journal import acting_as
+from management.fleet import EDITABLE_COLUMNS, get_fleet_cache
+
+# Duurzaamheid per update:
+# "buffered"  - terug zodra de update in de wachtrij staat; bij een crash gaan
+#               hooguit de laatste SCOOTER_WRITE_INTERVAL seconden verloren
+# "committed" - wacht op de group commit: zichtbaar voor andere verbindingen
+#               en bestand tegen een crash van de app
+# "durable"   - wacht ook op fsync van het WAL bestand: bestand tegen stroomuitval
+DURABILITY_LEVELS = ("buffered", "committed", "durable")
+
+
+class WriteTicket:
+    """Eén update van één aanroeper, met een eigen resultaat (`found` of `error`)."""
+    __slots__ = ('seq', 'scooter_id', 'actor', 'changes', 'durable', 'found', 'error', '_done')
+
+    def __init__(self, seq, scooter_id, actor, changes, durable):
+        self.seq = seq
+        self.scooter_id = scooter_id
+        self.actor = actor
+        self.changes = changes
+        self.durable = durable
+        self.found = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wacht op de commit; gooit de fout van deze update door. Geeft False bij een timeout."""
+        if not self._done.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+class _Group:
+    # Opeenvolgende updates van dezelfde scooter door dezelfde gebruiker: één UPDATE
+    __slots__ = ('seq', 'scooter_id', 'actor', 'changes', 'tickets')
+
+    def __init__(self, seq, scooter_id, actor):
+        self.seq = seq
+        self.scooter_id = scooter_id
+        self.actor = actor
+        self.changes = {}
+        self.tickets = []
+
+    @property
+    def durable(self):
+        return any(ticket.durable for ticket in self.tickets)
+
+
+class _Barrier:
+    __slots__ = ('upto', 'durable', 'event')
+
+    def __init__(self, upto, durable):
+        self.upto = upto
+        self.durable = durable
+        self.event = threading.Event()
+
+
+class ScooterWriteBehind:
+    """Write-behind wachtrij voor scooter updates met group commit.
+
+    `update()` zet de wijziging in een wachtrij; updates van dezelfde scooter
+    (door dezelfde gebruiker) worden samengevoegd tot één UPDATE. Een
+    achtergrondthread commit alles wat klaarstaat in één transactie zodra er
+    `batch_size` scooters wachten of `interval` seconden zijn verstreken (of
+    meteen als een aanroeper op de commit wacht), met een savepoint per
+    scooter zodat één ongeldige update de rest niet terugdraait. Faalt een
+    samengevoegde UPDATE, dan worden de losse updates één voor één opnieuw
+    geprobeerd: elke aanroeper krijgt de uitkomst van zijn eigen wijziging.
+    `flush()` is een barrière: alles wat eerder in de wachtrij stond is
+    daarna gecommit (read-your-writes).
+
+    Met een `fleet` (FleetCache) commit de wachtrij via de verbinding van
+    de cache, die daarna alleen de bijgewerkte scooters opnieuw leest.
+    """
+
+    def __init__(self, db_name, batch_size=SCOOTER_WRITE_BATCH, interval=SCOOTER_WRITE_INTERVAL,
+                 max_pending=SCOOTER_WRITE_QUEUE, durability=SCOOTER_WRITE_DURABILITY, fleet=None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Onbekende duurzaamheid: {durability}")
+        self.db_name = str(db_name)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self.updates = 0
+        self.writes = 0
+        self.commits = 0
+
+        self.fleet = fleet
+        self._conn = None
+        if fleet is None:
+            self._conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            self._conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_MS)}")
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._needs_sync = None
+        self._unsynced = False
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._latest = {}
+        self._barriers = []
+        self._first_at = None
+        self._created = 0
+        self._taken = 0
+        self._busy = False
+        self._waiting = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="scooter-write-behind", daemon=True)
+        self._thread.start()
+
+    def update(self, scooter_id, changes, actor=None, durability=None):
+        """Zet een update in de wachtrij; wacht afhankelijk van `durability` op de commit.
+
+        Geeft het WriteTicket terug. Bij "committed" en "durable" is
+        `ticket.found` daarna ingevuld en wordt een databasefout doorgegooid.
+        """
+        durability = durability or self.durability
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Onbekende duurzaamheid: {durability}")
+        unknown = set(changes) - EDITABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Onbekende scooter velden: {', '.join(sorted(unknown))}")
+        scooter_id = int(scooter_id)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind wachtrij is gesloten")
+            group = self._latest.get(scooter_id)
+            if group is None or group.actor != actor:
+                # Bij een andere gebruiker een nieuwe groep: de volgorde per scooter blijft zo gelijk
+                while len(self._pending) >= self.max_pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    raise RuntimeError("Write-behind wachtrij is gesloten")
+                self._created += 1
+                group = _Group(self._created, scooter_id, actor)
+                self._pending.append(group)
+                self._latest[scooter_id] = group
+                if self._first_at is None:
+                    # Eerste wachtende update: de writer start de interval timer
+                    self._first_at = time.monotonic()
+                    self._cond.notify_all()
+                elif len(self._pending) >= self.batch_size:
+                    self._cond.notify_all()
+            ticket = WriteTicket(group.seq, scooter_id, actor, dict(changes), durability == "durable")
+            group.tickets.append(ticket)
+            group.changes.update(changes)
+            self.updates += 1
+            if durability != "buffered" and not self._waiting:
+                # Er wacht een aanroeper: committen zodra de writer vrij is. Wie
+                # tijdens die commit binnenkomt, gaat mee in de volgende.
+                self._waiting = True
+                self._cond.notify_all()
+
+        if durability != "buffered":
+            ticket.wait()
+        return ticket
+
+    def flush(self, timeout=None, durable=False):
+        """Wacht tot alles wat eerder in de wachtrij stond gecommit (en bij `durable` gesynct) is."""
+        with self._cond:
+            if self._closed:
+                return True
+            if not self._pending and not self._busy and not (durable and self._unsynced):
+                return True
+            barrier = _Barrier(self._created, durable)
+            self._barriers.append(barrier)
+            self._cond.notify_all()
+        return barrier.event.wait(timeout)
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._conn is not None:
+            self._conn.close()
+
+    # Achtergrond writer
+
+    def _take(self):
+        # Wacht op een volle batch, het verstrijken van het interval of een
+        # barrière; geeft (groepen, barrières die na deze batch klaar zijn)
+        with self._cond:
+            while True:
+                if (self._barriers or self._waiting or self._closed
+                        or len(self._pending) >= self.batch_size):
+                    break
+                if self._pending:
+                    remaining = self._first_at + self.interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            groups = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            for group in groups:
+                if self._latest.get(group.scooter_id) is group:
+                    del self._latest[group.scooter_id]
+            # Wat achterblijft is al minstens zo oud: volgende ronde meteen committen
+            if not self._pending:
+                self._first_at = None
+                self._waiting = False
+            if groups:
+                self._taken = groups[-1].seq
+            # De wachtrij is FIFO: alles tot en met _taken zit in deze of een eerdere batch
+            barriers = [barrier for barrier in self._barriers if barrier.upto <= self._taken]
+            self._barriers = [barrier for barrier in self._barriers if barrier.upto > self._taken]
+            self._busy = True
+            self._cond.notify_all()
+            return groups, barriers
+
+    def _run(self):
+        while True:
+            groups, barriers = self._take()
+            tickets = [ticket for group in groups for ticket in group.tickets]
+            try:
+                if groups:
+                    self._commit(groups)
+                if any(ticket.durable for ticket in tickets) or any(barrier.durable for barrier in barriers):
+                    self._sync()
+            except Exception as e:
+                # BEGIN, COMMIT of fsync mislukt: geen van deze updates is zeker opgeslagen
+                logging.error(f"Scooter write-behind commit mislukt: {e}")
+                for ticket in tickets:
+                    if ticket.error is None:
+                        ticket.error = e
+            for ticket in tickets:
+                ticket._done.set()
+            with self._cond:
+                self._busy = False
+                stop = self._closed and not self._pending
+                if stop:
+                    barriers += self._barriers
+                    self._barriers = []
+            for barrier in barriers:
+                barrier.event.set()
+            if stop:
+                return
+
+    def _commit(self, groups):
+        if self.fleet is not None:
+            self.fleet.write(lambda conn: self._write(conn, groups), [group.scooter_id for group in groups])
+        else:
+            try:
+                self._write(self._conn, groups)
+                self._conn.commit()
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                raise
+        self.writes += len(groups)
+        self.commits += 1
+        self._unsynced = self._needs_sync
+
+    def _write(self, conn, groups):
+        if self._needs_sync is None:
+            # WAL met synchronous=NORMAL synct niet per commit: "durable" heeft dan een eigen fsync nodig
+            wal = conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+            self._needs_sync = wal and conn.execute("PRAGMA synchronous").fetchone()[0] < 2
+        conn.execute("BEGIN IMMEDIATE")
+        for group in groups:
+            try:
+                found = self._apply(conn, group.scooter_id, group.actor, group.changes)
+            except sqlite3.Error as e:
+                if len(group.tickets) == 1:
+                    group.tickets[0].error = e
+                    logging.warning(f"Scooter {group.scooter_id} bijwerken mislukt: {e}")
+                    continue
+                # Samengevoegde update mislukt: elke update apart, zodat alleen
+                # de aanroeper met de ongeldige waarde de fout krijgt
+                for ticket in group.tickets:
+                    try:
+                        ticket.found = self._apply(conn, ticket.scooter_id, ticket.actor, ticket.changes)
+                    except sqlite3.Error as e:
+                        ticket.error = e
+                        logging.warning(f"Scooter {ticket.scooter_id} bijwerken mislukt: {e}")
+                continue
+            for ticket in group.tickets:
+                ticket.found = found
+
+    @staticmethod
+    def _apply(conn, scooter_id, actor, changes):
+        # Eén UPDATE in een eigen savepoint; bij een fout blijft de rest van de batch staan
+        conn.execute("SAVEPOINT write_behind")
+        try:
+            with acting_as(conn, actor):
+                cursor = conn.execute(
+                    f"UPDATE scooters SET {', '.join(f'{column} = ?' for column in changes)} WHERE id = ?",
+                    [*changes.values(), scooter_id],
+                )
+            conn.execute("RELEASE write_behind")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK TO write_behind")
+            conn.execute("RELEASE write_behind")
+            raise
+        return cursor.rowcount > 0
+
+    def _sync(self):
+        # Met synchronous=NORMAL doet SQLite geen fsync per commit in WAL modus;
+        # één fsync van het WAL bestand maakt alle eerdere commits duurzaam
+        if not self._unsynced:
+            return
+        with open(f"{self.db_name}-wal", "ab") as wal:
+            os.fsync(wal.fileno())
+        self._unsynced = False
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_scooter_writer(db_name):
+    """Geeft de gedeelde write-behind wachtrij voor `db_name` terug (één per bestand per proces)."""
+    key = str(db_name)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            # Commits via de gedeelde vlootcache: die werkt alleen de bijgewerkte rijen bij
+            writer = ScooterWriteBehind(key, fleet=get_fleet_cache(key))
+            _writers[key] = writer
+        return writer
+
+
+def flush_scooter_writer(db_name, durable=False):
+    """Flusht de gedeelde wachtrij van `db_name`, als die al bestaat."""
+    with _writers_lock:
+        writer = _writers.get(str(db_name))
+    return writer.flush(durable=durable) if writer is not None else True
+
+
+def close_scooter_writers():
+    """Commit wat nog in de wachtrijen staat en sluit ze."""
+    with _writers_lock:
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
@@ -1,28 +1,96 @@
-from cryptography.fernet import Fernet
+import hashlib
+import secrets
 from datetime import datetime, timedelta
-from .config import CITIES
-from ..database.encryption import EncryptionManager
-from auth import main as auth_main
-from database import Database
+
+from config import RESTORE_CODES_DB, RESTORE_CODE_TTL_HOURS
+from database.connection import get_pool
+
+# Eigen bestand in plaats van een tabel in de hoofddatabase: een restore zet
+# die database terug, en daarmee zou een gebruikte code weer geldig worden
+RESTORE_CODES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS restore_codes (
+    code_hash TEXT PRIMARY KEY,
+    backup TEXT NOT NULL,
+    admin_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    used_at TEXT
+)
+"""
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _hash(code):
+    # Alleen de hash wordt bewaard: wie het bestand leest kan er niets mee
+    return hashlib.sha256(code.strip().encode()).hexdigest()
+
 
 class RestoreManager:
-    def __init__(self):
-        self.codes = {}
-        
-    def generate_code(self, backup_file, admin_id, expires_hours=24):
-        code = Fernet.generate_key().decode()[:8]
-        self.codes[code] = {
-            'backup': backup_file,
-            'admin_id': admin_id,
-            'expires': datetime.now() + timedelta(hours=expires_hours),
-            'used': False
-        }
+    """Eenmalige restore codes, per backup en systeembeheerder, met een vervaltijd."""
+
+    def __init__(self, db_name=RESTORE_CODES_DB, ttl_hours=RESTORE_CODE_TTL_HOURS):
+        self.pool = get_pool(db_name)
+        self.ttl_hours = ttl_hours
+        with self.pool.transaction() as conn:
+            conn.execute(RESTORE_CODES_SCHEMA)
+
+    def generate_code(self, backup_file, admin_id, expires_hours=None):
+        code = secrets.token_urlsafe(6)
+        now = datetime.now()
+        expires = now + timedelta(hours=expires_hours or self.ttl_hours)
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO restore_codes (code_hash, backup, admin_id, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (_hash(code), str(backup_file), admin_id,
+                 now.strftime(TIMESTAMP_FORMAT), expires.strftime(TIMESTAMP_FORMAT)),
+            )
         return code
-        
+
     def validate_code(self, code, admin_id):
-        if code in self.codes and not self.codes[code]['used']:
-            if self.codes[code]['admin_id'] == admin_id:
-                if datetime.now() < self.codes[code]['expires']:
-                    self.codes[code]['used'] = True
-                    return self.codes[code]['backup']
-        return None
\ No newline at end of file
+        """Geeft de backup van een geldige code terug, zonder de code te gebruiken; anders None.
+
+        Pas na een geslaagde restore `consume_code()` aanroepen: een restore
+        die afbreekt (ongeldig tijdstip, controle, journaal) kost de code niet.
+        """
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self.pool.connection() as conn:
+            row = conn.execute("""
+                SELECT backup FROM restore_codes
+                WHERE code_hash = ? AND admin_id = ? AND used_at IS NULL AND expires_at > ?
+            """, (_hash(code), admin_id, now)).fetchone()
+        return row[0] if row else None
+
+    def consume_code(self, code, admin_id):
+        """Markeert de code als gebruikt; geeft de backup terug, of None als hij al gebruikt of verlopen was."""
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self.pool.transaction() as conn:
+            # Controle en markeren in één statement: een code werkt precies één keer
+            row = conn.execute("""
+                UPDATE restore_codes SET used_at = ?
+                WHERE code_hash = ? AND admin_id = ? AND used_at IS NULL AND expires_at > ?
+                RETURNING backup
+            """, (now, _hash(code), admin_id, now)).fetchone()
+        return row[0] if row else None
+
+    def revoke_codes(self, backup_file=None, admin_id=None):
+        """Trekt openstaande codes in, voor een backup en/of een beheerder (of alle)."""
+        clauses = ["used_at IS NULL"]
+        params = []
+        if backup_file is not None:
+            clauses.append("backup = ?")
+            params.append(str(backup_file))
+        if admin_id is not None:
+            clauses.append("admin_id = ?")
+            params.append(admin_id)
+        with self.pool.transaction() as conn:
+            return conn.execute(f"DELETE FROM restore_codes WHERE {' AND '.join(clauses)}", params).rowcount
+
+    def purge_expired(self):
+        """Verwijdert verlopen en gebruikte codes; geeft het aantal terug."""
+        now = datetime.now().strftime(TIMESTAMP_FORMAT)
+        with self.pool.transaction() as conn:
+            return conn.execute("DELETE FROM restore_codes WHERE used_at IS NOT NULL OR expires_at <= ?",
+                                (now,)).rowcount
+
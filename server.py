@@ -0,0 +1,619 @@
+"""Asyncio server: veel operators tegelijk op één database.
+
+    python server.py --listen 127.0.0.1:8765
+    python server.py --listen unix:scooter.sock
+
+Protocol: één JSON object per regel, in beide richtingen.
+
+    {"id": 1, "op": "login", "args": {"username": "super_admin", "password": "..."}}
+    {"id": 1, "ok": true, "result": {"user_id": 1, "role": "superadmin"}}
+    {"id": 2, "op": "edit_scooter", "args": {"id": 12, "soc": 80}}
+    {"id": 2, "ok": false, "error": "Scooter niet gevonden"}
+
+Leesacties lopen op een thread pool tegen de alleen-lezen replica.
+Restore en restore codes (ACTIONS) lopen ook op die thread pool, maar
+tegen de primaire database en buiten de schrijfwachtrij.
+Schrijfacties (de operaties uit batch.py) gaan via één writer taak: alles
+wat in de wachtrij staat gaat samen in één transactie, met per operatie een
+savepoint (zie batch.run_operation). Daarna wordt de replica bijgewerkt,
+zodat een client zijn eigen wijziging meteen terugleest. Er is dus nog maar
+één schrijver op het bestand, in plaats van één per operator.
+
+Wachtwoorden gaan onversleuteld over de verbinding: alleen lokaal (of via
+een Unix socket) gebruiken.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import SERVER_ADDRESS, SERVER_READ_THREADS, SERVER_WRITE_BATCH, SERVER_MAX_REQUEST_BYTES, \
+    RESTORE_CODE_TTL_HOURS
+from auth.service import AuthService
+from batch import ADMINS, OPERATIONS, BatchContext, prepare_operations, run_operation, TRAVELLER_FIELDS, \
+    SCOOTER_FIELDS
+from client import parse_address
+from database.blind_index import find_ids
+from database.connection import get_pool, close_all_pools
+from database.encryption import EncryptionManager, is_token
+from database.migrations import migrate
+from database.pagination import KeysetPager, Page
+from database.replica import Replica
+from database.restore import RestoreError, list_backups, restore_backup
+from management.fleet import get_fleet_cache, close_fleet_caches
+from management.locations import ScooterLocator
+from management.maintenance import MaintenancePlanner
+from management.search import TravellerSearch
+from restore import RestoreManager
+from utils.log_reader import LogReader
+from utils.logging import SecureLogger
+
+ALL_ROLES = ADMINS + ('engineer',)
+SUPERADMIN = ('superadmin',)
+
+# Velden die de dunne client per schrijfoperatie vraagt
+WRITE_FIELDS = {
+    'add_traveller': TRAVELLER_FIELDS,
+    'edit_traveller': ('id', 'first_name', 'last_name', 'license_number', 'phone_number'),
+    'delete_traveller': ('id',),
+    'add_scooter': SCOOTER_FIELDS,
+    'edit_scooter': ('id', 'top_speed', 'battery_capacity', 'soc', 'mileage', 'out_of_service',
+                     'last_maintenance'),
+    'delete_scooter': ('id',),
+    'add_user': ('username', 'password', 'role', 'first_name', 'last_name'),
+    'delete_user': ('id',),
+    'change_role': ('id', 'role'),
+    'backup': (),
+    'compact_journal': (),
+}
+
+PAGE_LIMIT = 100
+
+
+class RequestError(Exception):
+    """Fout die letterlijk naar de client gaat."""
+
+
+def _decrypt(ctx, rows, columns):
+    tokens = [row[c] for row in rows for c in columns if is_token(row[c])]
+    plain = dict(zip(tokens, ctx.encryption.decrypt_many(tokens, default="⚠️ Ongeldig"))) if tokens else {}
+    return [[plain.get(value, value) if index in columns else value for index, value in enumerate(row)]
+            for row in rows]
+
+
+def _page(pager, args):
+    after = args.get('after')
+    page = pager.next_page(Page([], None, tuple(after))) if after else pager.first_page()
+    full = len(page.rows) == pager.page_size
+    return page, (list(page.last_key) if full else None)
+
+
+def _limit(args):
+    try:
+        return max(1, min(int(args.get('limit') or 25), PAGE_LIMIT))
+    except (TypeError, ValueError):
+        raise RequestError("Ongeldige limit")
+
+
+# 📖 Leesacties: (ctx, database, args) -> JSON resultaat
+
+def list_travellers(ctx, db, args):
+    filters = [("last_name LIKE ?", (args['last_name'] + "%",))] if args.get('last_name') else []
+    pager = KeysetPager(db, "travellers",
+                        ["id", "first_name", "last_name", "email", "phone_number", "registration_date"],
+                        ["last_name", "id"], page_size=_limit(args), filters=filters)
+    page, next_key = _page(pager, args)
+    return {"rows": _decrypt(ctx, page.rows, (3, 4)), "next": next_key}
+
+
+def search_travellers(ctx, db, args):
+    if not args.get('query'):
+        raise RequestError("Zoekterm ontbreekt")
+    rows, fuzzy = TravellerSearch(db).search(args['query'])
+    return {"rows": _decrypt(ctx, rows, (7, 8)), "fuzzy": fuzzy}
+
+
+def list_scooters(ctx, db, args):
+    filters = [("brand LIKE ?", (args['brand'] + "%",))] if args.get('brand') else []
+    pager = KeysetPager(db, "scooters",
+                        ["id", "brand", "model", "serial_number", "soc", "out_of_service", "last_updated"],
+                        ["id"], page_size=_limit(args), filters=filters)
+    page, next_key = _page(pager, args)
+    return {"rows": [list(row) for row in page.rows], "next": next_key}
+
+
+def find_traveller(ctx, db, args):
+    value = str(args.get('value') or "").strip()
+    if not value:
+        raise RequestError("Rijbewijsnummer of e-mail ontbreekt")
+    field = "email" if "@" in value else "license_number"
+    with get_pool(db).connection() as conn:
+        ids = find_ids(conn, ctx.encryption, "travellers", field, value)
+        if not ids:
+            return []
+        rows = conn.execute(
+            f"SELECT id, first_name, last_name, email, phone_number, registration_date "
+            f"FROM travellers WHERE id IN ({', '.join('?' for _ in ids)})", ids,
+        ).fetchall()
+    return _decrypt(ctx, rows, (3, 4))
+
+
+def _number(args, field, convert=float, default=None):
+    value = args.get(field)
+    try:
+        return convert(default if value in (None, "") else value)
+    except (TypeError, ValueError):
+        raise RequestError(f"{field} moet een getal zijn")
+
+
+def nearest_scooters(ctx, db, args):
+    try:
+        latitude, longitude = float(args['latitude']), float(args['longitude'])
+        count = min(int(args.get('count') or 10), PAGE_LIMIT)
+    except (KeyError, TypeError, ValueError):
+        raise RequestError("latitude, longitude en count moeten getallen zijn")
+    return [[distance, list(row)] for distance, row in ScooterLocator(db).nearest(latitude, longitude, count)]
+
+
+def scooters_in_box(ctx, db, args):
+    box = [_number(args, field) for field in ('min_lat', 'min_lon', 'max_lat', 'max_lon')]
+    return [list(row) for row in ScooterLocator(db).in_box(*box)]
+
+
+def scooters_within_radius(ctx, db, args):
+    latitude, longitude, radius = (_number(args, field) for field in ('latitude', 'longitude', 'radius'))
+    min_soc = _number(args, 'min_soc', int, 0)
+    return [[distance, list(row)]
+            for distance, row in ScooterLocator(db).available_within_radius(latitude, longitude, radius, min_soc)]
+
+
+def scooter_maintenance(ctx, db, args):
+    # NULL (onbekend) eerst, net als het onderhoudsoverzicht in main.py
+    filters = [("out_of_service = ?", (1,))] if args.get('out_of_service_only') else []
+    pager = KeysetPager(db, "scooters", ["id", "brand", "model", "last_maintenance", "mileage", "out_of_service"],
+                        ["COALESCE(last_maintenance, '')", "id"], page_size=_limit(args), filters=filters)
+    page, next_key = _page(pager, args)
+    return {"rows": [list(row) for row in page.rows], "next": next_key}
+
+
+_planners = {}
+_planners_lock = threading.Lock()
+
+
+def _planner(db_name):
+    # Eén heap per database, bijgewerkt via de vlootcache (zoals get_planner() in main.py)
+    with _planners_lock:
+        planner = _planners.get(db_name)
+        if planner is None:
+            planner = MaintenancePlanner(get_fleet_cache(db_name))
+            _planners[db_name] = planner
+        return planner
+
+
+def maintenance_plan(ctx, db, args):
+    count = _number(args, 'count', int, 10)
+    return [[round(score), scooter.id, scooter.brand, scooter.model, scooter.last_maintenance,
+             (scooter.mileage or 0) - (scooter.mileage_at_maintenance or 0), scooter.soc, scooter.out_of_service]
+            for score, scooter in _planner(ctx.db_name).next_due(min(count, PAGE_LIMIT))]
+
+
+def fleet_statistics(ctx, db, args):
+    from management.analytics import FleetSnapshot
+    snapshot = FleetSnapshot.load(db)
+    return {"summary": snapshot.summary(), "groups": snapshot.group_by(args.get('group') or "brand")}
+
+
+def list_users(ctx, db, args):
+    pager = KeysetPager(db, "users", ["id", "username", "role", "first_name", "last_name", "registration_date"],
+                        ["id"], page_size=_limit(args))
+    page, next_key = _page(pager, args)
+    return {"rows": [list(row) for row in page.rows], "next": next_key}
+
+
+def my_details(ctx, db, args):
+    with get_pool(db).connection() as conn:
+        rows = conn.execute(
+            "SELECT username, role, email, license_number, first_name, last_name, registration_date "
+            "FROM users WHERE id = ?", (ctx.user_id,),
+        ).fetchall()
+    if not rows:
+        raise RequestError("Gebruiker niet gevonden")
+    return dict(zip(("username", "role", "email", "license_number", "first_name", "last_name",
+                     "registration_date"), _decrypt(ctx, rows, (2, 3))[0]))
+
+
+def _date(value, suffix=""):
+    try:
+        return datetime.strptime(value + suffix, "%d-%m-%Y" + (" %H:%M:%S" if suffix else "")) if value else None
+    except (TypeError, ValueError):
+        raise RequestError(f"Ongeldige datum: {value} (verwacht DD-MM-YYYY)")
+
+
+def view_logs(ctx, db, args):
+    start = _date(args.get('start'))
+    end = _date(args.get('end'), " 23:59:59")
+    # Zorg dat net gelogde regels al op schijf staan
+    ctx.audit_log.flush()
+    return LogReader(ctx.encryption.key).search(start, end, args.get('username') or None,
+                                                args.get('action') or None, bool(args.get('suspicious_only')))
+
+
+def backups(ctx, db, args):
+    return [[os.path.basename(path), f"{taken_at:%d-%m-%Y %H:%M:%S}"]
+            for path, taken_at in list_backups(ctx.db_name, ctx.backup_dir)]
+
+
+# naam -> (toegestane rollen, functie)
+READS = {
+    'list_travellers': (ADMINS, list_travellers),
+    'search_travellers': (ADMINS, search_travellers),
+    'find_traveller': (ADMINS, find_traveller),
+    'list_scooters': (ALL_ROLES, list_scooters),
+    'nearest_scooters': (ALL_ROLES, nearest_scooters),
+    'scooters_in_box': (ALL_ROLES, scooters_in_box),
+    'scooters_within_radius': (ALL_ROLES, scooters_within_radius),
+    'scooter_maintenance': (ALL_ROLES, scooter_maintenance),
+    'maintenance_plan': (ALL_ROLES, maintenance_plan),
+    'fleet_statistics': (ADMINS, fleet_statistics),
+    'list_users': (ADMINS, list_users),
+    'my_details': (ALL_ROLES, my_details),
+    'view_logs': (ADMINS, view_logs),
+    'list_backups': (SUPERADMIN, backups),
+}
+
+
+# 🔄 Beheeracties: (ctx, primaire database, args) -> JSON resultaat
+
+def _backup_file(ctx, name):
+    # Alleen backups uit de eigen backup map, op bestandsnaam
+    for path, _ in list_backups(ctx.db_name, ctx.backup_dir):
+        if os.path.basename(path) == name:
+            return path
+    raise RequestError("Backup niet gevonden")
+
+
+def _moment(value):
+    # Leeg = stand van de backup, "nu" = backup plus het journaal, anders DD-MM-YYYY HH:MM[:SS]
+    value = str(value or "").strip().lower()
+    if not value:
+        return None
+    if value == "nu":
+        return datetime.now()
+    try:
+        return datetime.strptime(value, "%d-%m-%Y %H:%M:%S" if value.count(":") == 2 else "%d-%m-%Y %H:%M")
+    except ValueError:
+        raise RequestError("Ongeldig tijdstip")
+
+
+def restore(ctx, db, args):
+    until = _moment(args.get('until'))
+    code = str(args.get('code') or "")
+    if ctx.role == 'superadmin':
+        backup_file = _backup_file(ctx, args.get('backup'))
+    else:
+        # Systeembeheerders hebben een eenmalige code van de superadmin nodig
+        backup_file = RestoreManager().validate_code(code, ctx.user_id)
+        if not backup_file:
+            ctx.audit_log.log("Restore geweigerd", ctx.username, "Ongeldige restore code (server)", suspicious=True)
+            raise RequestError("Ongeldige of verlopen restore code")
+    try:
+        result = restore_backup(db, backup_file, until=until, encryption=ctx.encryption,
+                                safety_dir=ctx.backup_dir)
+    except RestoreError as e:
+        logging.warning(f"Restore van {backup_file} afgebroken: {e}")
+        raise RequestError(f"Restore afgebroken: {e}")
+    if ctx.role != 'superadmin':
+        # De code pas na een geslaagde restore gebruiken; een mislukte poging kost hem niet
+        RestoreManager().consume_code(code, ctx.user_id)
+    ctx.audit_log.log("Backup teruggezet", ctx.username,
+                      f"{os.path.basename(backup_file)} tot {until or 'backup'} ({result.replayed} wijzigingen)")
+    return {"backup": os.path.basename(backup_file), "replayed": result.replayed,
+            "seconds": round(result.seconds, 1), "safety_backup": result.safety_backup}
+
+
+def create_restore_code(ctx, db, args):
+    backup_file = _backup_file(ctx, args.get('backup'))
+    username = str(args.get('username') or "").strip()
+    with get_pool(db).connection() as conn:
+        admin = conn.execute("SELECT id FROM users WHERE username = ? AND role = 'sysadmin'",
+                             (username,)).fetchone()
+    if not admin:
+        raise RequestError("Systeembeheerder niet gevonden")
+    code = RestoreManager().generate_code(backup_file, admin[0])
+    ctx.audit_log.log("Restore code aangemaakt", ctx.username, f"{os.path.basename(backup_file)} voor {username}")
+    return {"code": code, "hours": RESTORE_CODE_TTL_HOURS}
+
+
+ACTIONS = {
+    'restore': (ADMINS, restore),
+    'create_restore_code': (SUPERADMIN, create_restore_code),
+}
+
+
+class ScooterServer:
+    def __init__(self, db_name, backup_dir, encryption, auth, audit_log, replica=None,
+                 read_threads=SERVER_READ_THREADS, write_batch=SERVER_WRITE_BATCH):
+        self.db_name = db_name
+        self.backup_dir = backup_dir
+        self.encryption = encryption
+        self.auth = auth
+        self.audit_log = audit_log
+        self.replica = replica
+        self.write_batch = write_batch
+        self.sessions = 0
+        self.writes = 0
+        self.write_batches = 0
+        self._readers = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix="server-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="server-write")
+        self._write_conn = None
+        self._queue = None
+        self._write_task = None
+        self._server = None
+
+    # ✍️ Eén schrijver
+
+    def _apply_writes(self, batch):
+        if self._write_conn is None:
+            self._write_conn = get_pool(self.db_name).acquire()
+        conn = self._write_conn
+        contexts = {id(ctx): ctx for ctx, *_ in batch}.values()
+        try:
+            results = [run_operation(ctx, conn, name, args) for ctx, name, args, _ in batch]
+            if conn.in_transaction:
+                conn.commit()
+        except Exception as e:
+            # BEGIN of COMMIT zelf mislukt: niets uit deze batch is opgeslagen
+            if conn.in_transaction:
+                conn.rollback()
+            for ctx in contexts:
+                ctx.discard_audit()
+            logging.error(f"Server schrijfbatch mislukt: {e}")
+            return [(False, f"{type(e).__name__}: {e}")] * len(batch)
+        for ctx in contexts:
+            ctx.commit_audit()
+        if self.replica is not None:
+            try:
+                self.replica.refresh()
+            except Exception as e:
+                logging.error(f"Replica bijwerken na schrijfbatch mislukt: {e}")
+        return results
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Alles wat zich tijdens de vorige batch heeft opgehoopt gaat mee
+            while len(batch) < self.write_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stop = any(item is None for item in batch)
+            batch = [item for item in batch if item is not None]
+            if batch:
+                results = await loop.run_in_executor(self._writer, self._apply_writes, batch)
+                self.writes += len(batch)
+                self.write_batches += 1
+                for (*_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            if stop:
+                return
+
+    async def write(self, ctx, name, args):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((ctx, name, args, future))
+        return await future
+
+    # 📨 Verzoeken
+
+    def read_db(self):
+        return self.replica.read_db() if self.replica is not None else self.db_name
+
+    def _read(self, handler, ctx, args):
+        # Op de thread pool: read_db() kan de replica synchroon bijwerken
+        return handler(ctx, self.read_db(), args)
+
+    def _act(self, handler, ctx, args):
+        try:
+            return handler(ctx, self.db_name, args)
+        finally:
+            # Een restore vervangt de primaire database: de replica eerst bijwerken
+            if self.replica is not None:
+                self.replica.mark_dirty()
+
+    async def _login(self, session, args):
+        username = str(args.get('username') or "")
+        user_id, role = await self.auth.alogin(username, str(args.get('password') or ""))
+        if not user_id:
+            self.audit_log.log("Login mislukt", username, "Ongeldige gebruikersnaam of wachtwoord (server)",
+                               suspicious=True)
+            raise RequestError("Ongeldige gebruikersnaam of wachtwoord")
+        session['ctx'] = BatchContext(self.db_name, username, role, self.encryption, self.auth,
+                                      self.backup_dir, self.audit_log, user_id, source="server")
+        self.audit_log.log("Login", username, f"Succesvolle login ({role}) via server")
+        return {"user_id": user_id, "role": role}
+
+    def _describe(self, ctx):
+        return {
+            "reads": [name for name, (roles, _) in READS.items() if ctx.role in roles],
+            "writes": {name: WRITE_FIELDS.get(name, ()) for name, (roles, _, _) in OPERATIONS.items()
+                       if ctx.role in roles},
+            "actions": [name for name, (roles, _) in ACTIONS.items() if ctx.role in roles],
+        }
+
+    async def dispatch(self, session, request):
+        name = request.get('op')
+        args = request.get('args') or {}
+        if not isinstance(args, dict):
+            raise RequestError("args moet een JSON object zijn")
+        loop = asyncio.get_running_loop()
+
+        if name == 'ping':
+            return "pong"
+        if name == 'login':
+            return await self._login(session, args)
+        ctx = session.get('ctx')
+        if ctx is None:
+            raise RequestError("Niet ingelogd")
+        if name == 'logout':
+            session['ctx'] = None
+            return "Uitgelogd"
+        if name == 'describe':
+            return self._describe(ctx)
+
+        if name in READS:
+            roles, handler = READS[name]
+            if ctx.role not in roles:
+                raise RequestError(f"Rol {ctx.role} mag {name} niet uitvoeren")
+            return await loop.run_in_executor(self._readers, self._read, handler, ctx, args)
+
+        if name in ACTIONS:
+            roles, handler = ACTIONS[name]
+            if ctx.role not in roles:
+                raise RequestError(f"Rol {ctx.role} mag {name} niet uitvoeren")
+            return await loop.run_in_executor(self._readers, self._act, handler, ctx, args)
+
+        entry = OPERATIONS.get(name)
+        if entry is None:
+            raise RequestError(f"Onbekende operatie: {name}")
+        if not entry[2]:
+            # Backup en compactie: buiten de writer, zodat schrijvers niet wachten
+            ok, message = await loop.run_in_executor(self._readers, self._run_unqueued, ctx, name, args)
+        else:
+            if name == 'add_user':
+                # bcrypt vooraf, niet in de schrijftransactie
+                op = [(None, {'op': name, **args})]
+                prepare_operations(op, self.auth)
+                args = {key: value for key, value in op[0][1].items() if key != 'op'}
+                if '_hash' in args:
+                    await asyncio.wrap_future(args['_hash'])
+            ok, message = await self.write(ctx, name, args)
+        if not ok:
+            raise RequestError(message)
+        return message
+
+    def _run_unqueued(self, ctx, name, args):
+        with get_pool(self.db_name).connection() as conn:
+            return run_operation(ctx, conn, name, args)
+
+    async def _handle(self, reader, writer):
+        self.sessions += 1
+        session = {'ctx': None}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Regel langer dan SERVER_MAX_REQUEST_BYTES
+                    break
+                if not line:
+                    break
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("verwacht een JSON object")
+                    request_id = request.get('id')
+                    response = {"id": request_id, "ok": True, "result": await self.dispatch(session, request)}
+                except ValueError as e:
+                    response = {"id": request_id, "ok": False, "error": f"Ongeldig verzoek: {e}"}
+                except RequestError as e:
+                    response = {"id": request_id, "ok": False, "error": str(e)}
+                except Exception as e:
+                    logging.error(f"Server fout bij {line[:100]!r}: {e}")
+                    response = {"id": request_id, "ok": False, "error": "Interne fout"}
+                writer.write((json.dumps(response, default=str) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    # 🚀 Starten en stoppen
+
+    async def start(self, address=SERVER_ADDRESS):
+        self._queue = asyncio.Queue()
+        self._write_task = asyncio.create_task(self._write_loop())
+        kind, target = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._handle, target, limit=SERVER_MAX_REQUEST_BYTES)
+            os.chmod(target, 0o660)
+        else:
+            self._server = await asyncio.start_server(self._handle, *target, limit=SERVER_MAX_REQUEST_BYTES)
+        if self.replica is not None:
+            self.replica.start()
+        logging.info(f"Server luistert op {address}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._write_task is not None:
+            await self._queue.put(None)
+            await self._write_task
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        if self._write_conn is not None:
+            get_pool(self.db_name).release(self._write_conn)
+            self._write_conn = None
+        if self.replica is not None:
+            self.replica.close()
+        with _planners_lock:
+            for planner in _planners.values():
+                planner.close()
+            _planners.clear()
+        close_fleet_caches()
+        logging.info(f"Server gestopt: {self.writes} schrijfacties in {self.write_batches} transacties")
+
+
+async def serve(server, address):
+    await server.start(address)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+    print(f"✅ Server luistert op {address} (Ctrl+C om te stoppen)")
+    await stopped.wait()
+    await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server voor meerdere operators tegelijk")
+    parser.add_argument("--listen", default=SERVER_ADDRESS, help="host:poort of unix:/pad")
+    parser.add_argument("--db", default="scooter_management.db")
+    parser.add_argument("--backup-dir", default="backups")
+    parser.add_argument("--no-replica", action="store_true", help="leesacties op de primaire database")
+    options = parser.parse_args(argv)
+
+    logging.basicConfig(filename="app.log", level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s", filemode='a')
+
+    encryption = EncryptionManager()
+    with get_pool(options.db).connection() as conn:
+        migrate(conn, encryption)
+    auth = AuthService(options.db)
+    audit_log = SecureLogger(encryption.key)
+    replica = None if options.no_replica else Replica(options.db)
+    server = ScooterServer(options.db, options.backup_dir, encryption, auth, audit_log, replica)
+    started = time.perf_counter()
+    try:
+        asyncio.run(serve(server, options.listen))
+    finally:
+        auth.close()
+        audit_log.close()
+        encryption.close()
+        close_all_pools()
+    logging.info(f"Server liep {time.perf_counter() - started:.0f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import sqlite3
+
+import pytest
+
+from database.connection import close_all_pools
+from database.encryption import EncryptionManager
+from database.migrations import migrate
+
+
+@pytest.fixture
+def encryption(tmp_path):
+    return EncryptionManager(key_file=str(tmp_path / "secret.key"))
+
+
+@pytest.fixture
+def db(tmp_path, encryption):
+    """Verse, gemigreerde database met één scooter (id 1)."""
+    db_name = str(tmp_path / "test.db")
+    conn = sqlite3.connect(db_name)
+    migrate(conn, encryption)
+    conn.execute("INSERT INTO scooters (brand, model, serial_number, soc) VALUES ('Segway', 'Max', 'S0001', 50)")
+    conn.commit()
+    conn.close()
+    yield db_name
+    close_all_pools()
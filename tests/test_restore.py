@@ -0,0 +1,87 @@
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+from database.backup import create_backup
+from database.restore import RestoreError, restore_backup
+from restore import RestoreManager
+
+
+def _set_soc(db, soc):
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE scooters SET soc = ? WHERE id = 1", (soc,))
+    conn.commit()
+    conn.close()
+
+
+def _soc(db):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute("SELECT soc FROM scooters WHERE id = 1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _moment():
+    # Het journaal rekent in milliseconden: wijzigingen vóór en na het moment niet laten samenvallen
+    time.sleep(0.05)
+    moment = datetime.now()
+    time.sleep(0.05)
+    return moment
+
+
+def test_restore_without_until_returns_backup_state(db, tmp_path, encryption):
+    backup = create_backup(db, str(tmp_path / "backups"))
+    _set_soc(db, 80)
+
+    result = restore_backup(db, backup, encryption=encryption)
+
+    assert _soc(db) == 50
+    assert result.replayed == 0
+
+
+def test_point_in_time_restore_replays_journal_until_moment(db, tmp_path, encryption):
+    backup = create_backup(db, str(tmp_path / "backups"))
+    _set_soc(db, 60)
+    _set_soc(db, 70)
+    until = _moment()
+    _set_soc(db, 90)
+
+    result = restore_backup(db, backup, until=until, encryption=encryption,
+                            safety_dir=str(tmp_path / "safety"))
+
+    assert _soc(db) == 70
+    assert result.replayed == 2
+    assert result.safety_backup is not None
+
+
+def test_restore_refuses_journal_that_does_not_connect(db, tmp_path, encryption):
+    backup = create_backup(db, str(tmp_path / "backups"))
+    _set_soc(db, 60)
+    _set_soc(db, 70)
+    conn = sqlite3.connect(db)
+    first = conn.execute("SELECT MIN(seq) FROM change_journal WHERE op = 'U'").fetchone()[0]
+    conn.execute("DELETE FROM change_journal WHERE seq = ?", (first,))
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(RestoreError, match="sluit niet aan"):
+        restore_backup(db, backup, until=datetime.now(), encryption=encryption)
+    # Geweigerd betekent: de live database is niet aangeraakt
+    assert _soc(db) == 70
+
+
+def test_restore_code_is_only_used_by_consume(tmp_path):
+    manager = RestoreManager(str(tmp_path / "codes.db"))
+    code = manager.generate_code("backup_a", admin_id=7)
+
+    # Valideren (bijv. vóór een restore die daarna mislukt) kost de code niet
+    assert manager.validate_code(code, 7) == "backup_a"
+    assert manager.validate_code(code, 7) == "backup_a"
+    assert manager.validate_code(code, 8) is None
+
+    assert manager.consume_code(code, 7) == "backup_a"
+    assert manager.consume_code(code, 7) is None
+    assert manager.validate_code(code, 7) is None
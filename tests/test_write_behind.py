@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+
+import pytest
+
+from management.write_behind import ScooterWriteBehind
+
+
+def _scooter(db):
+    conn = sqlite3.connect(db)
+    conn.row_factory = sqlite3.Row
+    try:
+        return dict(conn.execute("SELECT * FROM scooters WHERE id = 1").fetchone())
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def writer(db):
+    # Lang interval: niets wordt gecommit voordat de test flusht
+    writer = ScooterWriteBehind(db, interval=60)
+    yield writer
+    writer.close()
+
+
+def _update_concurrently(writer, updates):
+    """Elke update vanuit een eigen thread, allemaal tegelijk losgelaten; geeft de tickets."""
+    start = threading.Barrier(len(updates))
+    tickets = [None] * len(updates)
+
+    def run(index, changes):
+        start.wait()
+        tickets[index] = writer.update(1, changes, durability="buffered")
+
+    threads = [threading.Thread(target=run, args=item) for item in enumerate(updates)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return tickets
+
+
+def test_merged_update_with_bad_value_only_fails_that_caller(writer, db):
+    updates = [{"soc": 80}, {"mileage": 1200}, {"soc": 500}, {"top_speed": 25}, {"latitude": 51.9}]
+    tickets = _update_concurrently(writer, updates)
+    assert writer.flush(timeout=10)
+
+    # Zelfde scooter en gebruiker: één samengevoegde update in één commit
+    assert writer.writes == 1
+    assert writer.commits == 1
+    bad = tickets[2]
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.wait()
+    for ticket in tickets[:2] + tickets[3:]:
+        assert ticket.wait()
+        assert ticket.found is True
+
+    scooter = _scooter(db)
+    assert (scooter["mileage"], scooter["top_speed"], scooter["latitude"]) == (1200, 25, 51.9)
+    assert scooter["soc"] == 80
+
+
+def test_updates_by_other_actor_are_not_merged(writer, db):
+    writer.update(1, {"soc": 60}, actor=None, durability="buffered")
+    writer.update(1, {"soc": 70}, actor=1, durability="buffered")
+    writer.update(1, {"soc": 75}, actor=1, durability="buffered")
+    assert writer.flush(timeout=10)
+
+    assert writer.updates == 3
+    assert writer.writes == 2
+    assert _scooter(db)["soc"] == 75
+
+
+def test_committed_update_raises_for_its_caller(writer, db):
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.update(1, {"soc": -1}, durability="committed")
+    ticket = writer.update(1, {"soc": 40}, durability="committed")
+    assert ticket.found is True
+    assert writer.update(99, {"soc": 40}, durability="committed").found is False
+    assert _scooter(db)["soc"] == 40
+
+
+def test_flush_barriers_wait_for_earlier_updates(writer, db):
+    writer.update(1, {"mileage": 10}, durability="buffered")
+    assert writer.pending == 1
+    assert writer.flush(timeout=10)
+    assert writer.pending == 0
+    assert _scooter(db)["mileage"] == 10
+
+    writer.update(1, {"mileage": 20}, durability="buffered")
+    assert writer.flush(timeout=10, durable=True)
+    assert _scooter(db)["mileage"] == 20
+    assert not writer._unsynced
@@ -0,0 +1,240 @@
+from cryptography.fernet import Fernet, InvalidToken
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import hashlib
+import hmac
+import json
+import os
+from config import LOG_DIR, LOG_INDEX_CHUNK_LINES, LOG_SEARCH_WORKERS
+from utils.logging import rotated_indexes
+
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+INDEX_VERSION = 1
+# Gebruikersnamen en acties staan alleen als HMAC in de sidecar index
+TAG_LABEL = b"log-index-v1"
+
+_fernet = None
+
+def _init_worker(key):
+    global _fernet
+    _fernet = Fernet(key)
+
+def parse_entry(line):
+    parts = line.split(" | ")
+    if len(parts) < 5:
+        return None
+    return {
+        "timestamp": parts[0],
+        "username": parts[1],
+        "action": parts[2],
+        "description": " | ".join(parts[3:-1]),
+        "suspicious": parts[-1] == "SUSPICIOUS",
+    }
+
+def _epoch(timestamp):
+    return datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp()
+
+def _tag(tag_key, value):
+    return hmac.new(tag_key, value.encode(), hashlib.sha256).hexdigest()[:16]
+
+def _decrypt_chunk(path, offset, length):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    entries = []
+    for token in data.splitlines():
+        if not token:
+            continue
+        try:
+            entry = parse_entry(_fernet.decrypt(token).decode())
+        except (InvalidToken, UnicodeDecodeError):
+            entry = None
+        if entry:
+            entries.append(entry)
+    return entries
+
+def _summarize_chunk(path, offset, length, lines, tag_key):
+    """Worker: ontsleutelt één chunk en geeft de index metadata terug."""
+    entries = _decrypt_chunk(path, offset, length)
+    times = [_epoch(e["timestamp"]) for e in entries]
+    return {
+        "offset": offset,
+        "length": length,
+        "lines": lines,
+        "min_ts": min(times) if times else None,
+        "max_ts": max(times) if times else None,
+        "suspicious": sum(1 for e in entries if e["suspicious"]),
+        "users": sorted({_tag(tag_key, e["username"]) for e in entries}),
+        "actions": sorted({_tag(tag_key, e["action"].lower()) for e in entries}),
+    }
+
+def _search_chunk(path, offset, length, query):
+    """Worker: ontsleutelt één chunk en geeft de regels die aan de query voldoen."""
+    start, end, username, action, suspicious_only = query
+    matches = []
+    for entry in _decrypt_chunk(path, offset, length):
+        if suspicious_only and not entry["suspicious"]:
+            continue
+        if username and entry["username"] != username:
+            continue
+        if action and entry["action"].lower() != action.lower():
+            continue
+        if start is not None or end is not None:
+            ts = _epoch(entry["timestamp"])
+            if (start is not None and ts < start) or (end is not None and ts > end):
+                continue
+        matches.append(entry)
+    return matches
+
+def _split_chunks(path, start_offset, chunk_lines):
+    # Bepaal chunk grenzen op byte niveau, zonder iets te ontsleutelen
+    chunks = []
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        length = lines = 0
+        for line in f:
+            length += len(line)
+            lines += 1
+            if lines >= chunk_lines:
+                chunks.append((offset, length, lines))
+                offset += length
+                length = lines = 0
+        if lines:
+            chunks.append((offset, length, lines))
+    return chunks
+
+class LogReader:
+    """Doorzoekt de versleutelde system.log en de geroteerde system.log.N bestanden.
+
+    Elk bestand heeft een eigen sidecar index (`<bestand>.idx`) met per blok
+    van regels de byte offset, het tijdsbereik, het aantal SUSPICIOUS regels
+    en HMAC tags van gebruikers en acties. Een zoekopdracht ontsleutelt alleen
+    chunks die kunnen matchen, verdeeld over een process pool. Rotatie
+    hernoemt bestanden zonder het inode te wijzigen; een index verhuist dus
+    mee en wordt niet opnieuw opgebouwd.
+    """
+
+    def __init__(self, encryption_key, log_file=None, chunk_lines=LOG_INDEX_CHUNK_LINES,
+                 workers=LOG_SEARCH_WORKERS):
+        self.key = encryption_key
+        self.log_file = str(log_file or LOG_DIR / "system.log")
+        self.chunk_lines = chunk_lines
+        self.workers = workers
+        self._tag_key = hmac.new(encryption_key, TAG_LABEL, hashlib.sha256).digest()
+
+    def _map(self, fn, jobs):
+        # Kleine opdrachten in dit proces; grotere over een process pool
+        if self.workers <= 1 or len(jobs) < 2:
+            _init_worker(self.key)
+            return [fn(*job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.key,)) as pool:
+            return list(pool.map(fn, *zip(*jobs), chunksize=max(1, len(jobs) // (self.workers * 4))))
+
+    def log_files(self):
+        """Alle logbestanden, oudste eerst: system.log.N ... system.log.1, system.log."""
+        files = [f"{self.log_file}.{index}" for index in reversed(rotated_indexes(self.log_file))]
+        if os.path.exists(self.log_file):
+            files.append(self.log_file)
+        return files
+
+    @staticmethod
+    def _load_index(path):
+        try:
+            with open(path + ".idx", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _known_indexes(self, files):
+        # Na een rotatie staat de index van system.log.2 nog in system.log.1.idx
+        known = {}
+        for path in files:
+            index = self._load_index(path)
+            if index and index.get("version") == INDEX_VERSION and index.get("chunk_lines") == self.chunk_lines:
+                known[index.get("inode")] = index
+        return known
+
+    def _refresh_file(self, path, index):
+        stat = os.stat(path)
+        if not index or index.get("size", 0) > stat.st_size:
+            index = {"version": INDEX_VERSION, "inode": stat.st_ino, "chunk_lines": self.chunk_lines,
+                     "size": 0, "chunks": []}
+
+        chunks = index["chunks"]
+        # Een onvolledige laatste chunk opnieuw indexeren samen met de nieuwe regels
+        if chunks and chunks[-1]["lines"] < self.chunk_lines:
+            chunks.pop()
+        start = chunks[-1]["offset"] + chunks[-1]["length"] if chunks else 0
+        if start >= stat.st_size and index["size"] == stat.st_size:
+            return index, False
+
+        jobs = [(path, offset, length, lines, self._tag_key)
+                for offset, length, lines in _split_chunks(path, start, self.chunk_lines)]
+        chunks.extend(self._map(_summarize_chunk, jobs))
+        index["size"] = sum(c["length"] for c in chunks)
+        return index, True
+
+    @staticmethod
+    def _write_index(path, index):
+        temp_file = path + ".idx.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_file, path + ".idx")
+
+    def _remove_orphans(self, files):
+        # Indexen van bestanden die de logger bij rotatie heeft verwijderd
+        directory, name = os.path.split(self.log_file)
+        current = {os.path.basename(path) for path in files}
+        for entry in os.listdir(directory or "."):
+            log_name = entry[:-len(".idx")]
+            if entry.endswith(".idx") and log_name not in current and (
+                    log_name == name or (log_name.startswith(name + ".") and log_name[len(name) + 1:].isdigit())):
+                os.remove(os.path.join(directory, entry))
+
+    def refresh_index(self):
+        """Indexeert nieuwe regels van alle logbestanden; geeft [(bestand, index), ...], oudste eerst."""
+        files = self.log_files()
+        known = self._known_indexes(files)
+        indexes = []
+        for path in files:
+            stored = self._load_index(path)
+            index, changed = self._refresh_file(path, known.get(os.stat(path).st_ino))
+            if changed or not stored or stored.get("inode") != index["inode"]:
+                self._write_index(path, index)
+            indexes.append((path, index))
+        self._remove_orphans(files)
+        return indexes
+
+    def search(self, start=None, end=None, username=None, action=None, suspicious_only=False):
+        """Zoekt logregels in alle logbestanden, op tijd gesorteerd; `start` en `end` zijn datetimes (inclusief)."""
+        start_ts = start.timestamp() if start else None
+        end_ts = end.timestamp() if end else None
+        user_tag = _tag(self._tag_key, username) if username else None
+        action_tag = _tag(self._tag_key, action.lower()) if action else None
+
+        jobs = []
+        for path, index in self.refresh_index():
+            for chunk in index["chunks"]:
+                if chunk["min_ts"] is None:
+                    continue
+                if start_ts is not None and chunk["max_ts"] < start_ts:
+                    continue
+                if end_ts is not None and chunk["min_ts"] > end_ts:
+                    continue
+                if suspicious_only and not chunk["suspicious"]:
+                    continue
+                if user_tag and user_tag not in chunk["users"]:
+                    continue
+                if action_tag and action_tag not in chunk["actions"]:
+                    continue
+                jobs.append((path, chunk["offset"], chunk["length"],
+                             (start_ts, end_ts, username, action, suspicious_only)))
+
+        results = []
+        for matches in self._map(_search_chunk, jobs):
+            results.extend(matches)
+        # Jobs lopen al van oud naar nieuw; stabiel sorteren houdt de volgorde binnen een seconde
+        results.sort(key=lambda entry: _epoch(entry["timestamp"]))
+        return results
@@ -1,18 +1,199 @@
 from cryptography.fernet import Fernet
 from datetime import datetime
+import atexit
 import os
-from ..config import LOG_DIR
+import queue
+import sys
+import threading
+import time
+from config import (LOG_DIR, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_SIZE, LOG_MAX_BYTES,
+                    LOG_BACKUP_COUNT, LOG_ROTATE_SECONDS, LOG_FSYNC)
+
+# Fsync beleid: "always" na elke batch, "interval" hooguit eens per LOG_FLUSH_INTERVAL,
+# "never" laat het aan het besturingssysteem over
+FSYNC_POLICIES = ("always", "interval", "never")
+
+_STOP = object()
+
+def rotated_indexes(log_file):
+    """Nummers N van de geroteerde bestanden <log_file>.N, oplopend (1 is het nieuwste)."""
+    directory, name = os.path.split(str(log_file))
+    prefix = name + "."
+    indexes = []
+    for entry in os.listdir(directory or "."):
+        suffix = entry[len(prefix):]
+        if entry.startswith(prefix) and suffix.isdigit():
+            indexes.append(int(suffix))
+    return sorted(indexes)
+
+class _Barrier:
+    __slots__ = ("event",)
+
+    def __init__(self):
+        self.event = threading.Event()
 
 class SecureLogger:
-    def __init__(self, encryption_key):
+    """Versleutelde audit log met een achtergrond writer.
+
+    `log()` zet een regel alleen in een begrensde wachtrij; een aparte thread
+    versleutelt en schrijft de regels in batches, roteert het bestand op
+    grootte of leeftijd en doet fsync volgens het ingestelde beleid. Elke
+    regel blijft één Fernet token, zodat het bestandsformaat niet verandert.
+    """
+
+    def __init__(self, encryption_key, log_file=None, batch_size=LOG_BATCH_SIZE,
+                 flush_interval=LOG_FLUSH_INTERVAL, max_queue=LOG_QUEUE_SIZE,
+                 max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 rotate_seconds=LOG_ROTATE_SECONDS, fsync=LOG_FSYNC):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Onbekend fsync beleid: {fsync}")
         self.cipher = Fernet(encryption_key)
         LOG_DIR.mkdir(exist_ok=True)
-        self.log_file = LOG_DIR / "system.log"
+        self.log_file = log_file or LOG_DIR / "system.log"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.fsync = fsync
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._opened_at = None
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="secure-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
 
     def log(self, action, username, description, suspicious=False):
+        if self._closed:
+            raise RuntimeError("Logger is gesloten")
         timestamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
         log_entry = f"{timestamp} | {username} | {action} | {description} | {'SUSPICIOUS' if suspicious else 'Normal'}"
-        
-        encrypted = self.cipher.encrypt(log_entry.encode())
-        with open(self.log_file, 'ab') as f:
-            f.write(encrypted + b'\n')
\ No newline at end of file
+        # Blokkeert alleen als de writer ver achterloopt (begrensde wachtrij)
+        self._queue.put(log_entry)
+
+    def flush(self, timeout=None):
+        """Wacht tot alles wat eerder gelogd is op schijf staat."""
+        if self._closed:
+            return True
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        return barrier.event.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    # Achtergrond writer
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, barriers = [], []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                try:
+                    self._maybe_fsync(force=False)
+                except Exception as e:
+                    self._report(e)
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _Barrier):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+
+                if stop or barriers or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            try:
+                if batch:
+                    self._write(batch)
+                if barriers or stop:
+                    self._maybe_fsync(force=True)
+            except Exception as e:
+                # De writer mag niet stoppen: dan zouden flush() en close() blijven
+                # hangen en log() blokkeren zodra de wachtrij vol is
+                self._report(e)
+            finally:
+                for barrier in barriers:
+                    barrier.event.set()
+
+        if self._file:
+            try:
+                self._file.close()
+            except OSError as e:
+                self._report(e)
+            self._file = None
+
+    @staticmethod
+    def _report(error):
+        print(f"Audit log schrijffout: {type(error).__name__}: {error}", file=sys.stderr)
+
+    def _write(self, entries):
+        data = b"".join(self.cipher.encrypt(entry.encode()) + b"\n" for entry in entries)
+        self._maybe_rotate(len(data))
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync == "always":
+            self._maybe_fsync(force=True)
+        else:
+            self._maybe_fsync(force=False)
+
+    def _open(self):
+        self._file = open(self.log_file, "ab")
+        self._opened_at = time.monotonic()
+
+    def _maybe_fsync(self, force):
+        if self._file is None or (self.fsync == "never" and not force):
+            return
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.flush_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _maybe_rotate(self, incoming):
+        if self._file is None and not os.path.exists(self.log_file):
+            return
+        size = os.path.getsize(self.log_file) if os.path.exists(self.log_file) else 0
+        too_big = self.max_bytes and size + incoming > self.max_bytes and size > 0
+        too_old = (self.rotate_seconds and self._opened_at is not None
+                   and time.monotonic() - self._opened_at >= self.rotate_seconds)
+        if not (too_big or too_old):
+            return
+
+        if self._file:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+        # system.log -> system.log.1 -> ... -> system.log.<backup_count>; het oudste valt af
+        indexes = rotated_indexes(self.log_file)
+        if self.backup_count > 0:
+            for index in indexes:
+                if index >= self.backup_count:
+                    os.remove(f"{self.log_file}.{index}")
+            indexes = [index for index in indexes if index < self.backup_count]
+        for index in sorted(indexes, reverse=True):
+            os.replace(f"{self.log_file}.{index}", f"{self.log_file}.{index + 1}")
+        os.replace(self.log_file, f"{self.log_file}.1")
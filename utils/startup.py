@@ -0,0 +1,42 @@
+import logging
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Meet hoe lang elke opstartfase duurt (imports, database, ...)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, name):
+        """Sluit een fase af die bij de vorige mark (of de start) begon."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases.append((name, now - started))
+            self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        lines = [f"{name:<20} {seconds * 1000:>8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{'totaal':<20} {self.total * 1000:>8.1f} ms")
+        return "\n".join(lines)
+
+    def log(self):
+        logging.info("Opstarttijd: " + ", ".join(
+            f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.phases
+        ) + f" (totaal {self.total * 1000:.1f} ms)")